@@ -1,10 +1,18 @@
-import boto3
-import time
+import sys
 from datetime import datetime
+from pathlib import Path
+
+import boto3
 from tabulate import tabulate
 
-def assume_role_and_get_athena_client(role_arn):
-    """Assume cross-account role and return Athena client"""
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from athena_runner import RESULT_REUSE_MINUTES, QueryCache, cache_key, run_query
+
+# Athena results location for the demo queries
+RESULTS_LOCATION = 's3://wingsafe-athena-results-dev-184838390535/demo-results/'
+
+def assume_role_session(role_arn):
+    """Assume cross-account role and return a boto3 session with its credentials"""
     sts = boto3.client('sts')
     
     try:
@@ -15,8 +23,7 @@ def assume_role_and_get_athena_client(role_arn):
         
         credentials = response['Credentials']
         
-        return boto3.client(
-            'athena',
+        return boto3.Session(
             aws_access_key_id=credentials['AccessKeyId'],
             aws_secret_access_key=credentials['SecretAccessKey'],
             aws_session_token=credentials['SessionToken']
@@ -25,54 +32,6 @@ def assume_role_and_get_athena_client(role_arn):
         print(f"Failed to assume role {role_arn}: {e}")
         return None
 
-def execute_athena_query(athena_client, query, description):
-    """Execute an Athena query and return results"""
-    try:
-        print(f"{description}...")
-        
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            ResultConfiguration={
-                'OutputLocation': 's3://wingsafe-athena-results-dev-184838390535/demo-results/'
-            },
-            WorkGroup='WingSafe-DataAnalysis-dev'
-        )
-        
-        query_execution_id = response['QueryExecutionId']
-        
-        # Wait for completion
-        while True:
-            response = athena_client.get_query_execution(QueryExecutionId=query_execution_id)
-            status = response['QueryExecution']['Status']['State']
-            
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-            
-            time.sleep(2)
-        
-        if status == 'SUCCEEDED':
-            result = athena_client.get_query_results(QueryExecutionId=query_execution_id)
-            return {
-                'success': True,
-                'columns': [col['Name'] for col in result['ResultSet']['ResultSetMetadata']['ColumnInfo']],
-                'data': result['ResultSet']['Rows'][1:],  # Skip header row
-                'row_count': len(result['ResultSet']['Rows']) - 1
-            }
-        else:
-            error_msg = response['QueryExecution']['Status'].get('StateChangeReason', 'Unknown error')
-            return {
-                'success': False,
-                'error': error_msg,
-                'status': status
-            }
-            
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'status': 'EXCEPTION'
-        }
-
 def demo_flightradar_application():
     """Comprehensive demo of FlightRadar application with column-level security"""
     
@@ -131,17 +90,23 @@ def demo_flightradar_application():
         }
     ]
     
+    # Repeat runs are answered from the local cache (same SQL, role and table
+    # snapshot) or by Athena result reuse, without scanning data again
+    cache = QueryCache()
+    
     for scenario in demo_scenarios:
         print(f"\n{scenario['title']}")
         print(f"Role: {scenario['role']}")
         print(f"Role ARN: {scenario['role_arn']}")
         print("=" * 80)
         
-        # Assume role and get Athena client
-        athena_client = assume_role_and_get_athena_client(scenario['role_arn'])
-        if not athena_client:
+        # Assume role and get Athena (and Glue, for table snapshots) clients
+        session = assume_role_session(scenario['role_arn'])
+        if not session:
             print(f"Failed to assume role for {scenario['role']}")
             continue
+        athena_client = session.client('athena')
+        glue_client = session.client('glue')
         
         for i, query in enumerate(scenario['queries'], 1):
             print(f"\nTEST {i}: {query['name']}")
@@ -149,15 +114,22 @@ def demo_flightradar_application():
             print(f"SQL: {query['sql']}")
             print("-" * 60)
             
-            result = execute_athena_query(athena_client, query['sql'], f"Executing {query['name']}")
+            print(f"Executing {query['name']}...")
+            result = run_query(athena_client, query['sql'], RESULTS_LOCATION,
+                               reuse_minutes=RESULT_REUSE_MINUTES, cache=cache,
+                               cache_key=cache_key(glue_client, query['sql'], scenario['role_arn']))
+            if result.cached:
+                print("Served from local cache")
+            elif result.reused:
+                print("Athena reused an earlier result")
             
-            if result['success']:
-                print("QUERY SUCCESSFUL")
-                print(f"Columns ({len(result['columns'])}): {', '.join(result['columns'])}")
+            if result.succeeded:
+                print(f"QUERY SUCCESSFUL ({result.seconds:.1f}s, {result.bytes_scanned} bytes scanned)")
+                print(f"Columns ({len(result.columns)}): {', '.join(result.columns)}")
                 
                 # Check for restricted columns
                 restricted_columns = ['speed_knots', 'heading_degrees']
-                has_restricted = any(col in restricted_columns for col in result['columns'])
+                has_restricted = any(col in restricted_columns for col in result.columns)
                 
                 if scenario['role'] == 'DataScientist':
                     if has_restricted:
@@ -171,32 +143,22 @@ def demo_flightradar_application():
                         print("CORRECT: Restricted columns properly hidden")
                 
                 # Display sample data
-                if result['row_count'] > 0:
-                    print(f"Rows returned: {result['row_count']}")
+                if result.rows:
+                    print(f"Rows returned: {len(result.rows)}")
                     print("\nSAMPLE DATA:")
                     
-                    # Convert data to table format
-                    table_data = []
-                    for row in result['data'][:2]:  # Show max 2 rows
-                        table_row = []
-                        for field in row['Data']:
-                            if 'VarCharValue' in field:
-                                table_row.append(field['VarCharValue'])
-                            else:
-                                table_row.append('NULL')
-                        table_data.append(table_row)
-                    
-                    if table_data:
-                        print(tabulate(table_data, headers=result['columns'], tablefmt='grid', maxcolwidths=12))
+                    # Show max 2 rows, NULL for missing values
+                    table_data = [['NULL' if value is None else value for value in row] for row in result.rows[:2]]
+                    print(tabulate(table_data, headers=result.columns, tablefmt='grid', maxcolwidths=12))
             
             else:
-                print("QUERY FAILED")
-                print(f"Error: {result['error']}")
+                print(f"QUERY FAILED ({result.state})")
+                print(f"Error: {result.reason}")
                 
                 # Check if failure is expected due to column restrictions
                 if scenario['role'] == 'FlightRadarViewer':
                     restricted_keywords = ['speed_knots', 'heading_degrees']
-                    if any(keyword in result['error'].lower() for keyword in restricted_keywords):
+                    if any(keyword in result.reason.lower() for keyword in restricted_keywords):
                         print("EXPECTED: Column access denied - Security working correctly!")
             
             print("-" * 60)
@@ -215,6 +177,8 @@ def demo_flightradar_application():
     headers = ['Role', 'Database', 'Column Access', 'Access Level', 'Restrictions']
     print(tabulate(comparison_data, headers=headers, tablefmt='grid'))
     
+    cache.close()
+    
     print(f"\nFLIGHTRADAR APPLICATION DEMO COMPLETE!")
     print("\nKEY SECURITY FEATURES DEMONSTRATED:")
     print("• Role-based column access control")
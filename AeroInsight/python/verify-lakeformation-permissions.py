@@ -1,5 +1,10 @@
+import sys
+from pathlib import Path
+
 import boto3
-import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from athena_runner import run_queries
 
 def verify_lakeformation_permissions():
     """Verify LakeFormation permissions are correctly set for all roles"""
@@ -65,11 +70,9 @@ def verify_lakeformation_permissions():
         }
     }
     
+    # Assume every role first, then run all test queries at once
+    clients, errors = {}, {}
     for role_info in roles_to_test:
-        print(f"\nTesting {role_info['name']} role...")
-        print(f"Role ARN: {role_info['role_arn']}")
-        print(f"Expected Access: {role_info['expected_access']}")
-        
         try:
             # Assume the WingSafe role
             sts = boto3.client('sts', region_name='us-east-1')
@@ -81,73 +84,69 @@ def verify_lakeformation_permissions():
             credentials = response['Credentials']
             
             # Create Athena client with assumed role credentials
-            athena = boto3.client(
+            clients[role_info['name']] = boto3.client(
                 'athena',
                 region_name='us-east-1',
                 aws_access_key_id=credentials['AccessKeyId'],
                 aws_secret_access_key=credentials['SecretAccessKey'],
                 aws_session_token=credentials['SessionToken']
             )
+        except Exception as e:
+            errors[role_info['name']] = e
+    
+    tests = [(role_info['name'], database) for role_info in roles_to_test if role_info['name'] in clients
+             for database in role_info['databases'] if database in test_queries]
+    results = {}
+    for index, result in run_queries(
+        [(clients[name], test_queries[database]['query']) for name, database in tests],
+        's3://wingsafe-athena-results-dev-184838390535/test-results/'
+    ):
+        results[tests[index]] = result
+    
+    for role_info in roles_to_test:
+        print(f"\nTesting {role_info['name']} role...")
+        print(f"Role ARN: {role_info['role_arn']}")
+        print(f"Expected Access: {role_info['expected_access']}")
+        
+        if role_info['name'] in errors:
+            print(f"  ❌ Error testing {role_info['name']}: {errors[role_info['name']]}")
+            print("-" * 80)
+            continue
+        
+        # Test each database the role should have access to
+        for database in role_info['databases']:
+            print(f"\n  Testing {database}...")
             
-            # Test each database the role should have access to
-            for database in role_info['databases']:
-                print(f"\n  Testing {database}...")
-                
-                if database not in test_queries:
-                    print(f"    No test query defined for {database}")
-                    continue
-                
-                query_info = test_queries[database]
-                
-                response = athena.start_query_execution(
-                    QueryString=query_info['query'],
-                    ResultConfiguration={
-                        'OutputLocation': 's3://wingsafe-athena-results-dev-184838390535/test-results/'
-                    },
-                    WorkGroup='WingSafe-DataAnalysis-dev'
-                )
+            if database not in test_queries:
+                print(f"    No test query defined for {database}")
+                continue
+            
+            query_info = test_queries[database]
+            result = results[(role_info['name'], database)]
+            
+            if result.succeeded:
+                columns = result.columns
                 
-                query_id = response['QueryExecutionId']
+                print(f"    ✅ Query successful - {len(columns)} columns returned ({result.seconds:.1f}s)")
+                print(f"    Columns: {', '.join(columns)}")
                 
-                # Wait for completion
-                while True:
-                    result = athena.get_query_execution(QueryExecutionId=query_id)
-                    status = result['QueryExecution']['Status']['State']
-                    
-                    if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                        break
-                    
-                    time.sleep(2)
+                # Check for restricted columns
+                restricted_columns = query_info['restricted_columns']
+                has_restricted = any(col in restricted_columns for col in columns)
                 
-                if status == 'SUCCEEDED':
-                    # Get results
-                    results = athena.get_query_results(QueryExecutionId=query_id)
-                    columns = [col['Name'] for col in results['ResultSet']['ResultSetMetadata']['ColumnInfo']]
-                    
-                    print(f"    ✅ Query successful - {len(columns)} columns returned")
-                    print(f"    Columns: {', '.join(columns)}")
-                    
-                    # Check for restricted columns
-                    restricted_columns = query_info['restricted_columns']
-                    has_restricted = any(col in restricted_columns for col in columns)
-                    
-                    if role_info['expected_access'] == 'FULL':
-                        if has_restricted:
-                            print(f"    ✅ CORRECT: {role_info['name']} has full access including restricted columns")
-                        else:
-                            print(f"    ⚠️  NOTE: No restricted columns found in this query")
-                    else:  # RESTRICTED
-                        if not has_restricted:
-                            print(f"    ✅ CORRECT: {role_info['name']} has restricted access - sensitive columns hidden")
-                        else:
-                            print(f"    ❌ ISSUE: {role_info['name']} should NOT see restricted columns: {[col for col in columns if col in restricted_columns]}")
-                else:
-                    print(f"    ❌ Query failed: {status}")
-                    error_reason = result['QueryExecution']['Status'].get('StateChangeReason', 'Unknown error')
-                    print(f"    Error: {error_reason}")
-        
-        except Exception as e:
-            print(f"  ❌ Error testing {role_info['name']}: {e}")
+                if role_info['expected_access'] == 'FULL':
+                    if has_restricted:
+                        print(f"    ✅ CORRECT: {role_info['name']} has full access including restricted columns")
+                    else:
+                        print(f"    ⚠️  NOTE: No restricted columns found in this query")
+                else:  # RESTRICTED
+                    if not has_restricted:
+                        print(f"    ✅ CORRECT: {role_info['name']} has restricted access - sensitive columns hidden")
+                    else:
+                        print(f"    ❌ ISSUE: {role_info['name']} should NOT see restricted columns: {[col for col in columns if col in restricted_columns]}")
+            else:
+                print(f"    ❌ Query failed: {result.state}")
+                print(f"    Error: {result.reason}")
         
         print("-" * 80)
     
@@ -1,46 +1,35 @@
+import sys
+from pathlib import Path
+
 import boto3
-import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from athena_runner import run_query
 
 def execute_athena_query(query, description):
     """Execute an Athena query and wait for completion"""
     athena = boto3.client('athena')
     
-    try:
-        print(f"🔧 {description}...")
-        
-        response = athena.start_query_execution(
-            QueryString=query,
-            ResultConfiguration={
-                'OutputLocation': 's3://wingsafe-athena-results-dev-184838390535/setup/'
-            },
-            WorkGroup='WingSafe-DataAnalysis-dev'
-        )
-        
-        query_execution_id = response['QueryExecutionId']
-        print(f"Query execution ID: {query_execution_id}")
-        
-        # Wait for completion
-        while True:
-            response = athena.get_query_execution(QueryExecutionId=query_execution_id)
-            status = response['QueryExecution']['Status']['State']
-            
-            if status in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                break
-            
-            print(f"Status: {status}")
-            time.sleep(3)
-        
-        if status == 'SUCCEEDED':
-            print(f"✅ {description} completed successfully")
-            return True
-        else:
-            print(f"❌ {description} failed: {status}")
-            if 'StateChangeReason' in response['QueryExecution']['Status']:
-                print(f"Reason: {response['QueryExecution']['Status']['StateChangeReason']}")
-            return False
-            
-    except Exception as e:
-        print(f"Error in {description}: {e}")
+    print(f"🔧 {description}...")
+    result = run_query(
+        athena,
+        query,
+        's3://wingsafe-athena-results-dev-184838390535/setup/',
+        fetch_results=False,
+        on_state=lambda state: print(f"Status: {state}")
+    )
+    if result.query_id:
+        print(f"Query execution ID: {result.query_id}")
+    
+    if result.succeeded:
+        print(f"✅ {description} completed successfully ({result.seconds:.1f}s)")
+        return True
+    elif result.state == 'ERROR':
+        print(f"Error in {description}: {result.reason}")
+        return False
+    else:
+        print(f"❌ {description} failed: {result.state}")
+        print(f"Reason: {result.reason}")
         return False
 
 def setup_table_and_data():
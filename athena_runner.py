@@ -0,0 +1,617 @@
+"""
+Shared Athena query runner for the setup, demo and verification scripts
+
+Starts a query, waits for it and returns a QueryResult. Waiting polls
+GetQueryExecution with a delay that starts at 100 ms and grows exponentially
+to a cap, so sub-second queries return in well under a second and long ones
+cost few polls. The delay also follows what Athena reports: a query that has
+sat in the queue (or run on the engine) for a while is polled less often.
+A query still running at its deadline is stopped with StopQueryExecution.
+read_results() streams the rows of a finished query page by page;
+read_results_s3() reads the CSV Athena wrote to the output location instead,
+which is much faster for large results. Repeated queries can be answered by
+Athena result reuse or, without running at all, by a local QueryCache.
+run_queries() runs many independent queries at once and polls them together
+with BatchGetQueryExecution.
+
+Scripts in <Account>/python/ import it from the repository root:
+
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from athena_runner import run_query
+
+    result = run_query(athena_client, "SELECT 1", "s3://bucket/prefix/")
+    if result.succeeded:
+        print(result.columns, result.rows)
+    else:
+        print(result.state, result.reason)
+"""
+
+import codecs
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+# Workgroup used by the scripts that query the WingSafe catalog
+DEFAULT_WORKGROUP = "WingSafe-DataAnalysis-dev"
+
+# States after which a query no longer changes
+TERMINAL_STATES = ("SUCCEEDED", "FAILED", "CANCELLED")
+
+# Delay before the first poll, growth per poll and cap while the query runs, in seconds
+POLL_INITIAL_DELAY = 0.1
+POLL_BACKOFF = 2.0
+POLL_MAX_DELAY = 2.0
+
+# Cap while the query is still queued (it cannot finish before it starts)
+QUEUED_MAX_DELAY = 5.0
+
+# Minimum delay as a share of the time already spent queued / running on the engine
+QUEUE_WAIT_FRACTION = 0.5
+RUNNING_WAIT_FRACTION = 0.25
+
+# Seconds a query may take before it is stopped
+DEFAULT_TIMEOUT = 300.0
+
+# Rows per GetQueryResults call (the API maximum)
+RESULTS_PAGE_SIZE = 1000
+
+# Results at least this large (bytes of CSV) are read straight from the output
+# location in S3 when an S3 client is given; smaller ones through GetQueryResults
+S3_DOWNLOAD_MIN_BYTES = 1024 * 1024
+
+# Bytes per ranged GET and GETs in flight when reading results from S3
+S3_RANGE_SIZE = 4 * 1024 * 1024
+S3_DOWNLOAD_WORKERS = 8
+
+# Athena writes NULL as an empty unquoted field; Python 3.12+ can read it back as None
+CSV_QUOTING = getattr(csv, "QUOTE_NOTNULL", csv.QUOTE_MINIMAL)
+
+# Query IDs per BatchGetQueryExecution call (the API maximum)
+BATCH_GET_MAX_IDS = 50
+
+# run_queries() also polls queries due within this many seconds, so polls that
+# fall due close together share one BatchGetQueryExecution call
+POLL_BATCH_WINDOW = 0.1
+
+# Minutes Athena may answer a query with the result of an identical earlier one
+# (ResultReuseConfiguration) when a script asks for reuse
+RESULT_REUSE_MINUTES = 60
+
+# Local result cache (QueryCache): file (ATHENA_QUERY_CACHE overrides), seconds an
+# entry stays valid (the key does not see Lake Formation grant changes) and size cap
+DEFAULT_CACHE_FILE = Path(os.environ.get(
+    "ATHENA_QUERY_CACHE", Path.home() / ".cache" / "wingsafe-athena" / "query-cache.sqlite"
+))
+DEFAULT_CACHE_TTL = 3600.0
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Whatever follows FROM / JOIN: a dotted, optionally double-quoted name, or "(" for a subquery
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+(\(|"?\w+"?(?:\s*\.\s*"?\w+"?)*)', re.IGNORECASE)
+# A FROM clause up to the next clause keyword; a comma in it is an implicit (comma) join
+FROM_CLAUSE = re.compile(
+    r'\bFROM\b(.*?)(?=\b(?:WHERE|GROUP|HAVING|ORDER|WINDOW|LIMIT|OFFSET|FETCH|UNION|EXCEPT|INTERSECT)\b|;|$)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Queries run_queries() keeps running at once; lowered while Athena refuses new
+# ones with TooManyRequestsException (the workgroup / account concurrency limit)
+DEFAULT_MAX_CONCURRENT = 20
+
+
+class QueryResult(NamedTuple):
+    """Outcome of one query; columns and rows are only filled in for SUCCEEDED queries."""
+    query_id: Optional[str]
+    # SUCCEEDED, FAILED or CANCELLED as reported by Athena, TIMED_OUT when stopped
+    # at the deadline, ERROR when an API call failed
+    state: str
+    reason: str
+    seconds: float
+    queue_seconds: float
+    engine_seconds: float
+    bytes_scanned: int
+    polls: int
+    output_location: Optional[str]
+    columns: list
+    rows: list
+    # Athena answered with an earlier result (ResultReuseConfiguration)
+    reused: bool = False
+    # Served from a QueryCache without running the query
+    cached: bool = False
+
+    @property
+    def succeeded(self) -> bool:
+        return self.state == "SUCCEEDED"
+
+
+def next_poll_delay(delay: float, state: str, statistics: dict) -> float:
+    """Delay before the next poll of a query in state (QUEUED or RUNNING) after waiting delay."""
+    if state == "QUEUED":
+        floor = statistics.get("QueryQueueTimeInMillis", 0) / 1000 * QUEUE_WAIT_FRACTION
+        cap = QUEUED_MAX_DELAY
+    else:
+        floor = statistics.get("EngineExecutionTimeInMillis", 0) / 1000 * RUNNING_WAIT_FRACTION
+        cap = POLL_MAX_DELAY
+    return min(max(delay * POLL_BACKOFF, floor), cap)
+
+
+def stop_query(athena_client, execution: dict, timeout: float) -> dict:
+    """Stop a query that ran past its timeout; returns its QueryExecution in state TIMED_OUT."""
+    athena_client.stop_query_execution(QueryExecutionId=execution["QueryExecutionId"])
+    state = execution["Status"]["State"]
+    execution["Status"] = {
+        **execution["Status"],
+        "State": "TIMED_OUT",
+        "StateChangeReason": f"Stopped after {timeout:g}s ({state})",
+    }
+    return execution
+
+
+def wait_for_query(athena_client, query_id: str, timeout: float = DEFAULT_TIMEOUT,
+                   on_state: Optional[Callable[[str], None]] = None) -> tuple:
+    """
+    Poll a query until it reaches a terminal state or timeout seconds pass.
+
+    Returns (execution, polls): the last QueryExecution from GetQueryExecution
+    and the number of polls made. A query still running at the deadline is
+    stopped with StopQueryExecution and returned in state TIMED_OUT.
+    on_state(state) is called whenever a query that is still queued or running
+    changes state.
+    """
+    deadline = time.monotonic() + timeout
+    delay, polls, last_state = POLL_INITIAL_DELAY, 0, None
+    while True:
+        time.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+        execution = athena_client.get_query_execution(QueryExecutionId=query_id)["QueryExecution"]
+        polls += 1
+        state = execution["Status"]["State"]
+        if state in TERMINAL_STATES:
+            return execution, polls
+        if state != last_state and on_state:
+            on_state(state)
+
+        if time.monotonic() >= deadline:
+            return stop_query(athena_client, execution, timeout), polls
+
+        # A query that just changed state (QUEUED -> RUNNING) may finish at once
+        if state != last_state:
+            delay = POLL_INITIAL_DELAY
+        else:
+            delay = next_poll_delay(delay, state, execution.get("Statistics", {}))
+        last_state = state
+
+
+def decode_row(row: dict) -> list:
+    """An Athena result row as a list of strings, None for NULL."""
+    return [field.get("VarCharValue") for field in row["Data"]]
+
+
+def iter_result_rows(athena_client, query_id: str, page: dict, page_size: int = RESULTS_PAGE_SIZE):
+    """Decoded rows from page (the first GetQueryResults response) on, fetching later pages via NextToken."""
+    rows = iter(page["ResultSet"]["Rows"])
+    # Only the first page starts with the header row
+    next(rows, None)
+    while True:
+        for row in rows:
+            yield decode_row(row)
+        next_token = page.get("NextToken")
+        if not next_token:
+            return
+        page = athena_client.get_query_results(QueryExecutionId=query_id, MaxResults=page_size, NextToken=next_token)
+        rows = iter(page["ResultSet"]["Rows"])
+
+
+def read_results(athena_client, query_id: str, page_size: int = RESULTS_PAGE_SIZE) -> tuple:
+    """
+    Columns and rows of a SUCCEEDED query: (column names, generator of rows).
+
+    Only the first page is read up front. Later pages are requested as the rows
+    are consumed, so a result of any size streams in constant memory (one page
+    of page_size rows at a time):
+
+        columns, rows = read_results(athena_client, result.query_id)
+        for row in rows:
+            writer.writerow(row)
+    """
+    page = athena_client.get_query_results(QueryExecutionId=query_id, MaxResults=page_size)
+    columns = [column["Name"] for column in page["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]]
+    return columns, iter_result_rows(athena_client, query_id, page, page_size)
+
+
+def split_s3_uri(uri: str) -> tuple:
+    """(bucket, key) of an s3://bucket/key URI."""
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def iter_s3_ranges(s3_client, bucket: str, key: str, size: int,
+                   range_size: int = S3_RANGE_SIZE, workers: int = S3_DOWNLOAD_WORKERS):
+    """Bytes of an S3 object in order, downloaded as ranged GETs with up to workers in flight."""
+    def fetch(start):
+        end = min(start + range_size, size) - 1
+        return s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")["Body"].read()
+
+    starts = iter(range(0, size, range_size))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(fetch, start) for _, start in zip(range(workers), starts))
+        while pending:
+            chunk = pending.popleft().result()
+            start = next(starts, None)
+            if start is not None:
+                pending.append(executor.submit(fetch, start))
+            yield chunk
+
+
+def iter_lines(chunks):
+    """UTF-8 text lines (newline kept) from byte chunks that may split lines and characters."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def read_results_s3(s3_client, output_location: str, size: Optional[int] = None,
+                    range_size: int = S3_RANGE_SIZE, workers: int = S3_DOWNLOAD_WORKERS) -> tuple:
+    """
+    Columns and rows of a SELECT query from its result CSV: (column names, generator of rows).
+
+    The file is downloaded as parallel ranged GETs and parsed as it arrives, so
+    memory stays at a few ranges however large the result. Rows are lists of
+    strings like read_results(); NULL is None on Python 3.12+ and an empty
+    string before that (Athena's CSV only tells them apart by quoting).
+    """
+    bucket, key = split_s3_uri(output_location)
+    if size is None:
+        size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    rows = csv.reader(iter_lines(iter_s3_ranges(s3_client, bucket, key, size, range_size, workers)), quoting=CSV_QUOTING)
+    return next(rows, []), rows
+
+
+def stream_results(athena_client, execution: dict, s3_client=None) -> tuple:
+    """
+    Columns and rows of a SUCCEEDED QueryExecution, from S3 when that is worthwhile.
+
+    With an s3_client, a CSV result of S3_DOWNLOAD_MIN_BYTES or more is read
+    straight from the output location (read_results_s3()). Smaller results,
+    non-CSV output (DDL) and output the caller may not read from S3 go through
+    GetQueryResults (read_results()).
+    """
+    output_location = execution.get("ResultConfiguration", {}).get("OutputLocation", "")
+    if s3_client and output_location.endswith(".csv"):
+        bucket, key = split_s3_uri(output_location)
+        try:
+            size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        except Exception:
+            size = 0
+        if size >= S3_DOWNLOAD_MIN_BYTES:
+            return read_results_s3(s3_client, output_location, size)
+    return read_results(athena_client, execution["QueryExecutionId"])
+
+
+def query_result(athena_client, execution: dict, seconds: float, polls: int, fetch_results: bool,
+                 s3_client=None) -> QueryResult:
+    """QueryResult for a finished QueryExecution, reading all result rows if asked."""
+    status = execution["Status"]
+    statistics = execution.get("Statistics", {})
+    columns, rows = [], []
+    if status["State"] == "SUCCEEDED" and fetch_results:
+        columns, rows = stream_results(athena_client, execution, s3_client)
+        rows = list(rows)
+    return QueryResult(
+        query_id=execution["QueryExecutionId"],
+        state=status["State"],
+        reason=status.get("StateChangeReason", "" if status["State"] == "SUCCEEDED" else "Unknown error"),
+        seconds=seconds,
+        queue_seconds=statistics.get("QueryQueueTimeInMillis", 0) / 1000,
+        engine_seconds=statistics.get("EngineExecutionTimeInMillis", 0) / 1000,
+        bytes_scanned=statistics.get("DataScannedInBytes", 0),
+        polls=polls,
+        output_location=execution.get("ResultConfiguration", {}).get("OutputLocation"),
+        columns=columns,
+        rows=rows,
+        reused=statistics.get("ResultReuseInformation", {}).get("ReusedPreviousResult", False),
+    )
+
+
+def error_result(query_id: Optional[str], error: Exception, seconds: float, polls: int) -> QueryResult:
+    """QueryResult in state ERROR for a failed API call."""
+    return QueryResult(
+        query_id=query_id, state="ERROR", reason=str(error), seconds=seconds,
+        queue_seconds=0.0, engine_seconds=0.0, bytes_scanned=0, polls=polls, output_location=None,
+        columns=[], rows=[],
+    )
+
+
+def normalise_sql(query: str) -> str:
+    """query with whitespace outside string literals collapsed and trailing semicolons dropped."""
+    parts = re.split(r"('(?:[^']|'')*')", query)
+    parts[::2] = [re.sub(r"\s+", " ", part) for part in parts[::2]]
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def cache_key(glue_client, query: str, role_arn: str, workgroup: str = DEFAULT_WORKGROUP) -> Optional[str]:
+    """
+    QueryCache key for query run as role_arn, None when the result must not be cached.
+
+    The key covers the normalised SQL, role, workgroup and the current version
+    of every table the query reads. For Iceberg tables the Glue catalog's
+    metadata_location changes with every commit (new snapshot or schema
+    change), so it stands in for the snapshot id without reading table
+    metadata from S3. Only queries whose every FROM / JOIN names a
+    database.table are cached: comma joins, subqueries, unqualified or
+    catalog-qualified names, non-Iceberg tables and tables glue_client cannot
+    describe all return None, so no table read can be left out of the key.
+    """
+    references = TABLE_REFERENCE.findall(query)
+    if not references or any("," in clause for clause in FROM_CLAUSE.findall(query)):
+        return None
+    tables = set()
+    for reference in references:
+        parts = [part.strip().strip('"') for part in reference.split(".")]
+        if len(parts) != 2:
+            return None
+        tables.add(tuple(parts))
+    tables = sorted(tables)
+    versions = []
+    for database, table in tables:
+        try:
+            parameters = glue_client.get_table(DatabaseName=database, Name=table)["Table"].get("Parameters", {})
+        except Exception:
+            return None
+        if "metadata_location" not in parameters:
+            return None
+        versions.append([database, table, parameters["metadata_location"]])
+    key = json.dumps([normalise_sql(query), role_arn, workgroup, versions])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """
+    On-disk cache of SUCCEEDED query results (SQLite), keyed by cache_key().
+
+    Entries expire ttl seconds after they were stored. When the stored results
+    pass max_bytes, the least recently used ones are dropped. A hit is a
+    QueryResult with cached=True, no bytes scanned and the lookup time as
+    seconds. The file is readable by its owner only: results can hold columns
+    other users may not see.
+    """
+
+    def __init__(self, file_path: Path = DEFAULT_CACHE_FILE, ttl: float = DEFAULT_CACHE_TTL,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(file_path))
+        os.chmod(file_path, 0o600)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, stored_at REAL, used_at REAL, size INTEGER, result TEXT)"
+            )
+
+    def get(self, key: str) -> Optional[QueryResult]:
+        """Cached result for key, None when missing or expired."""
+        start = time.monotonic()
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT result FROM results WHERE key = ? AND stored_at >= ?", (key, now - self.ttl)
+        ).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._conn:
+            self._conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+        return QueryResult(**{
+            **json.loads(row[0]),
+            "seconds": time.monotonic() - start, "queue_seconds": 0.0, "engine_seconds": 0.0,
+            "bytes_scanned": 0, "polls": 0, "reused": False, "cached": True,
+        })
+
+    def put(self, key: str, result: QueryResult) -> None:
+        """Store a SUCCEEDED result, then drop expired and least recently used entries."""
+        data = json.dumps(result._asdict())
+        now = time.time()
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, now, now, len(data), data))
+            self._conn.execute("DELETE FROM results WHERE stored_at < ?", (now - self.ttl,))
+            total, evict = 0, []
+            for entry_key, size in self._conn.execute("SELECT key, size FROM results ORDER BY used_at DESC"):
+                total += size
+                if total > self.max_bytes:
+                    evict.append((entry_key,))
+            self._conn.executemany("DELETE FROM results WHERE key = ?", evict)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def start_query(athena_client, query: str, output_location: str, workgroup: str,
+                reuse_minutes: Optional[int]) -> str:
+    """Start a query and return its QueryExecutionId; reuse_minutes enables Athena result reuse."""
+    params = {
+        "QueryString": query,
+        "ResultConfiguration": {"OutputLocation": output_location},
+        "WorkGroup": workgroup,
+    }
+    if reuse_minutes:
+        params["ResultReuseConfiguration"] = {
+            "ResultReuseByAgeConfiguration": {"Enabled": True, "MaxAgeInMinutes": reuse_minutes}
+        }
+    return athena_client.start_query_execution(**params)["QueryExecutionId"]
+
+
+def run_query(athena_client, query: str, output_location: str, workgroup: str = DEFAULT_WORKGROUP,
+              timeout: float = DEFAULT_TIMEOUT, fetch_results: bool = True,
+              on_state: Optional[Callable[[str], None]] = None, s3_client=None,
+              reuse_minutes: Optional[int] = None, cache: Optional[QueryCache] = None,
+              cache_key: Optional[str] = None) -> QueryResult:
+    """
+    Run a query to completion and return a QueryResult; never raises for API errors.
+
+    With fetch_results every result row of a SUCCEEDED query is read into
+    QueryResult.rows (all pages, header dropped). Statement queries (DDL,
+    INSERT) can pass fetch_results=False; so can large queries, which then
+    stream their rows with read_results(athena_client, result.query_id).
+    Given an s3_client (same credentials), large results are downloaded from
+    the output location instead; see stream_results().
+
+    Repeated queries can skip work at two levels: with reuse_minutes Athena may
+    answer with an identical query's result of that age (no data scanned,
+    QueryResult.reused), and with a cache and cache_key the query does not run
+    at all while an earlier result is cached (QueryResult.cached).
+    """
+    if cache and cache_key:
+        cached = cache.get(cache_key)
+        if cached:
+            return cached
+    start = time.monotonic()
+    query_id, polls = None, 0
+    try:
+        query_id = start_query(athena_client, query, output_location, workgroup, reuse_minutes)
+        execution, polls = wait_for_query(athena_client, query_id, timeout, on_state)
+        result = query_result(athena_client, execution, time.monotonic() - start, polls, fetch_results, s3_client)
+    except Exception as e:
+        return error_result(query_id, e, time.monotonic() - start, polls)
+    if cache and cache_key and result.succeeded and fetch_results:
+        cache.put(cache_key, result)
+    return result
+
+
+def error_code(error: Exception) -> Optional[str]:
+    """AWS error code of a botocore ClientError, None for other exceptions."""
+    return getattr(error, "response", {}).get("Error", {}).get("Code")
+
+
+def run_queries(queries: list, output_location: str, workgroup: str = DEFAULT_WORKGROUP,
+                timeout: float = DEFAULT_TIMEOUT, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                fetch_results: bool = True, s3_clients: Optional[dict] = None,
+                reuse_minutes: Optional[int] = None, cache: Optional[QueryCache] = None,
+                cache_keys: Optional[list] = None):
+    """
+    Run independent queries concurrently, yielding (index, QueryResult) as each finishes.
+
+    queries are (athena_client, query) pairs and index is a pair's position, so
+    the queries of several roles (clients) run side by side. At most
+    max_concurrent queries run at once. When StartQueryExecution is refused with
+    TooManyRequestsException the limit drops to what is running (and creeps back
+    up as queries finish), so extra queries wait here instead of failing.
+
+    Running queries are polled together: each round sleeps until the next query
+    is due for a poll (its own backoff, as in wait_for_query()) or reaches its
+    timeout, then polls the queries due within POLL_BATCH_WINDOW with one
+    BatchGetQueryExecution call per client and 50 query IDs. Each query's timeout counts from its own
+    start. s3_clients maps an Athena client to the S3
+    client with the same credentials, for reading large results from S3.
+
+    reuse_minutes and cache work as in run_query(); cache_keys holds a key (or
+    None) per query. Cached results are yielded before any query starts.
+    Queries still running when the generator is closed early are stopped.
+    """
+    waiting = deque()
+    for index, pair in enumerate(queries):
+        key = cache_keys[index] if cache and cache_keys else None
+        cached = cache.get(key) if key else None
+        if cached:
+            yield index, cached
+        else:
+            waiting.append((index, pair))
+    # query_id -> [index, client, started, polls, last_state, delay, next_poll]
+    running = {}
+    limit = max_concurrent
+    delay = POLL_INITIAL_DELAY
+    try:
+        while waiting or running:
+            while waiting and len(running) < limit:
+                index, (athena_client, query) = waiting[0]
+                start = time.monotonic()
+                try:
+                    query_id = start_query(athena_client, query, output_location, workgroup, reuse_minutes)
+                except Exception as e:
+                    if error_code(e) == "TooManyRequestsException":
+                        limit = max(1, len(running))
+                        break
+                    waiting.popleft()
+                    yield index, error_result(None, e, time.monotonic() - start, 0)
+                    continue
+                waiting.popleft()
+                delay = POLL_INITIAL_DELAY
+                running[query_id] = [index, athena_client, start, 0, None, POLL_INITIAL_DELAY, start + POLL_INITIAL_DELAY]
+
+            if running:
+                # Wake for the next query due a poll, or sooner if one reaches its timeout
+                wake = min(min(entry[6], entry[2] + timeout) for entry in running.values())
+                time.sleep(max(0.0, wake - time.monotonic()))
+            else:
+                # Refused with nothing of ours running: other work holds the slots
+                delay = min(delay * POLL_BACKOFF, QUEUED_MAX_DELAY)
+                time.sleep(delay)
+
+            now = time.monotonic()
+            batches = {}
+            for query_id, entry in running.items():
+                if entry[6] <= now + POLL_BATCH_WINDOW or now - entry[2] >= timeout:
+                    # Provisional: IDs left out (UnprocessedQueryExecutionIds) wait their own delay
+                    entry[6] = now + entry[5]
+                    batches.setdefault(id(entry[1]), (entry[1], []))[1].append(query_id)
+            for athena_client, query_ids in batches.values():
+                for offset in range(0, len(query_ids), BATCH_GET_MAX_IDS):
+                    chunk = query_ids[offset:offset + BATCH_GET_MAX_IDS]
+                    try:
+                        executions = athena_client.batch_get_query_execution(QueryExecutionIds=chunk)["QueryExecutions"]
+                    except Exception as e:
+                        for query_id in chunk:
+                            index, _, start, polls, _, _, _ = running.pop(query_id)
+                            limit = min(max_concurrent, limit + 1)
+                            yield index, error_result(query_id, e, time.monotonic() - start, polls)
+                        continue
+
+                    for execution in executions:
+                        entry = running[execution["QueryExecutionId"]]
+                        index, _, start, polls, last_state, query_delay, _ = entry
+                        entry[3] = polls = polls + 1
+                        state = execution["Status"]["State"]
+                        elapsed = time.monotonic() - start
+                        if state not in TERMINAL_STATES and elapsed < timeout:
+                            if state != last_state:
+                                entry[5] = POLL_INITIAL_DELAY
+                            else:
+                                entry[5] = next_poll_delay(query_delay, state, execution.get("Statistics", {}))
+                            entry[4] = state
+                            entry[6] = time.monotonic() + entry[5]
+                            continue
+
+                        del running[execution["QueryExecutionId"]]
+                        limit = min(max_concurrent, limit + 1)
+                        try:
+                            if state not in TERMINAL_STATES:
+                                execution = stop_query(athena_client, execution, timeout)
+                            s3_client = (s3_clients or {}).get(athena_client)
+                            result = query_result(athena_client, execution, elapsed, polls, fetch_results, s3_client)
+                        except Exception as e:
+                            result = error_result(execution["QueryExecutionId"], e, elapsed, polls)
+                        if cache and cache_keys and cache_keys[index] and result.succeeded and fetch_results:
+                            cache.put(cache_keys[index], result)
+                        yield index, result
+    finally:
+        # Closed early (the consumer stopped iterating): do not leave queries running in Athena
+        for query_id, entry in running.items():
+            try:
+                stop_query(entry[1], {"QueryExecutionId": query_id, "Status": {"State": entry[4] or "QUEUED"}}, timeout)
+            except Exception:
+                pass
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for validate-read-only-aws-permissions.py
+
+Runs the validator's startup path (module import, config load, plan compile,
+client creation for every client in the plan) in fresh Python processes and
+prints the median time of each phase. No AWS calls are made, so it runs
+offline and without credentials.
+
+Each script is measured without and with the marshalled model cache
+(--model-cache); caches are warmed by one uncounted run first.
+
+Usage:
+    python benchmark-validator-startup.py                          # EC2 only, 5 runs
+    python benchmark-validator-startup.py -s ec2 s3 logs -n 10     # Other services, more runs
+    python benchmark-validator-startup.py --baseline old-validator.py  # Compare with another version
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Validator next to this script
+DEFAULT_SCRIPT = "validate-read-only-aws-permissions.py"
+
+# Phases reported by the driver, in order
+PHASES = ("import", "config", "plan", "clients")
+
+# Startup path run inside each measured process
+DRIVER = r'''
+import importlib.util, json, sys, time
+from pathlib import Path
+
+start = time.perf_counter()
+script, permissions_file, output_dir, model_cache = sys.argv[1], sys.argv[2], Path(sys.argv[3]), sys.argv[4] == "1"
+services = sys.argv[5:]
+
+spec = importlib.util.spec_from_file_location("validator", script)
+v = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(v)
+imported = time.perf_counter()
+
+if model_cache:
+    v.MODEL_LOADER.configure(output_dir / v.DEFAULT_MODEL_CACHE_DIR)
+if hasattr(v, "PARAM_SYNTHESIZER"):
+    v.PARAM_SYNTHESIZER.configure(output_dir / v.DEFAULT_PARAM_CACHE)
+config, permissions = v.load_config(Path(permissions_file))
+configured = time.perf_counter()
+
+plan = v.compile_plan({s: permissions[s] for s in services}, [config.get("region", "us-east-1")], "123456789012")
+if hasattr(v, "PARAM_SYNTHESIZER"):
+    v.PARAM_SYNTHESIZER.save()
+planned = time.perf_counter()
+
+for specs in plan.values():
+    for call in specs:
+        v.CLIENT_REGISTRY.get(call.client_name, call.region)
+finished = time.perf_counter()
+
+print(json.dumps({
+    "import": imported - start,
+    "config": configured - imported,
+    "plan": planned - configured,
+    "clients": finished - planned,
+}))
+'''
+
+
+def run_once(script: Path, permissions_file: Path, output_dir: Path, model_cache: bool, services: list) -> dict:
+    """Run the startup path in a fresh process. Returns seconds per phase plus process wall time."""
+    env = {
+        **os.environ,
+        # Offline: dummy credentials, no instance metadata lookups, no profile from the YAML
+        "AWS_ACCESS_KEY_ID": "AKIABENCHMARK",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "AWS_EC2_METADATA_DISABLED": "true",
+    }
+    env.pop("AWS_PROFILE", None)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", DRIVER, str(script), str(permissions_file), str(output_dir),
+         "1" if model_cache else "0", *services],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    wall = time.perf_counter() - start
+    return {**json.loads(output.strip().splitlines()[-1]), "process": wall}
+
+
+def benchmark(variants: list, permissions_file: Path, services: list, runs: int) -> list:
+    """
+    Median seconds per phase for each (label, script, model_cache) variant.
+
+    Runs are interleaved across variants so machine noise hits all of them
+    alike; every variant has its own cache directory.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_dirs = [Path(tmp_dir) / str(i) for i in range(len(variants))]
+        # Warm-up run fills the parameter (and model) caches like an earlier CI run would
+        for (_, script, model_cache), output_dir in zip(variants, output_dirs):
+            output_dir.mkdir()
+            run_once(script, permissions_file, output_dir, model_cache, services)
+        samples = [[] for _ in variants]
+        for _ in range(runs):
+            for (_, script, model_cache), output_dir, variant_samples in zip(variants, output_dirs, samples):
+                variant_samples.append(run_once(script, permissions_file, output_dir, model_cache, services))
+    return [{key: statistics.median(s[key] for s in variant_samples) for key in variant_samples[0]}
+            for variant_samples in samples]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validator cold-start time")
+    parser.add_argument("--service", "-s", nargs="+", default=["ec2"], help="Services to plan (default: ec2)")
+    parser.add_argument("--runs", "-n", type=int, default=5, help="Measured runs per variant (default: 5)")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help=f"Validator to measure (default: {DEFAULT_SCRIPT})")
+    parser.add_argument("--baseline", help="Another validator version to measure for comparison")
+    parser.add_argument(
+        "--permissions-file", "-f",
+        default="permissions-list.yaml",
+        help="Permissions YAML file (default: permissions-list.yaml)",
+    )
+    args = parser.parse_args()
+
+    script_dir = Path(__file__).parent
+    permissions_file = Path(args.permissions_file)
+    if not permissions_file.is_absolute():
+        permissions_file = script_dir / permissions_file
+
+    variants = []
+    for label, script in (("baseline", args.baseline), ("current", args.script)):
+        if not script:
+            continue
+        script = Path(script)
+        if not script.is_absolute():
+            script = script_dir / script
+        variants.append((label, script, False))
+        if "MODEL_LOADER" in script.read_text():
+            variants.append((f"{label} --model-cache", script, True))
+
+    print(f"Services: {', '.join(args.service)}  Runs: {args.runs}")
+    print()
+    print(f"| Variant | {' | '.join(PHASES)} | total | process |")
+    print(f"|---------|{'|'.join('---:' for _ in PHASES)}|---:|---:|")
+    for (label, _, _), timings in zip(variants, benchmark(variants, permissions_file, args.service, args.runs)):
+        phases = " | ".join(f"{timings[p] * 1000:.0f} ms" for p in PHASES)
+        total = sum(timings[p] for p in PHASES)
+        print(f"| {label} | {phases} | {total * 1000:.0f} ms | {timings['process'] * 1000:.0f} ms |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for validate-read-only-aws-permissions.py
+
+Validates a synthetic list of read-only permissions (real botocore operations,
+1k-10k of them) against a local stand-in for AWS, in fresh Python processes,
+and prints permissions/second, peak RSS and client creations per scenario.
+No AWS account or credentials are needed.
+
+The stand-in answers every request at the HTTP layer (botocore's before-send
+event), so parameter building, serialization, signing, response parsing, the
+rate limiter and the report writer all run as they do against AWS. Each
+response is delayed by --latency-ms; a --throttle-rate share of them are the
+service's throttling error instead.
+
+With --synthetic-results no API calls are made at all: each probe returns a
+made-up result (mostly PASSED, some DENIED and NOT_TESTED) at once, so the
+numbers measure result handling alone (ordering, report, memory). Use it for
+100k-permission runs, where peak RSS is the figure of interest.
+
+Usage:
+    python benchmark-validator.py                                   # 1000 permissions, 8 workers
+    python benchmark-validator.py -n 10000 -w 1 8 32 --latency-ms 20
+    python benchmark-validator.py --throttle-rate 0 0.05 0.2        # Throttling scenarios
+    python benchmark-validator.py --baseline old-validator.py       # Compare with another version
+    python benchmark-validator.py --min-rate 150                    # Exit 1 below 150 perms/s (CI gate)
+    python benchmark-validator.py -n 100000 --synthetic-results     # Peak memory of a 100k-result run
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Validator next to this script
+DEFAULT_SCRIPT = "validate-read-only-aws-permissions.py"
+
+# Regions added when the synthetic list needs more probes than there are read-only operations
+BENCHMARK_REGIONS = (
+    "us-east-1", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-1", "ap-northeast-1", "us-east-2",
+    "us-west-1", "eu-west-2", "eu-west-3", "eu-north-1", "ap-southeast-2", "ap-northeast-2", "ap-south-1",
+    "ca-central-1", "sa-east-1",
+)
+
+# --synthetic-results: status of each made-up result, drawn uniformly
+SYNTHETIC_STATUSES = ("PASSED",) * 8 + ("DENIED", "NOT_TESTED")
+
+# Validation run inside each measured process
+DRIVER = r'''
+import contextlib, importlib.util, io, json, math, os, random, resource, sys, threading, time
+from pathlib import Path
+
+script, cache_dir, output_dir = sys.argv[1], Path(sys.argv[2]), Path(sys.argv[3])
+count, workers, latency, throttle_rate, rate_limit, seed = (
+    int(sys.argv[4]), int(sys.argv[5]), float(sys.argv[6]), float(sys.argv[7]), float(sys.argv[8]), int(sys.argv[9]))
+synthetic_statuses = json.loads(sys.argv[10])
+regions = sys.argv[11:]
+
+spec = importlib.util.spec_from_file_location("validator", script)
+v = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(v)
+
+# Synthetic permission list: read-only operations of every botocore service, in name order
+index = v.OperationIndex(cache_dir / v.DEFAULT_OPERATION_INDEX)
+botocore_session = v.MODEL_LOADER.botocore_session()
+pool = []
+for client_name in botocore_session.get_available_services():
+    pool.extend((client_name, op) for op in sorted(index.operations(client_name)) if v.is_readonly_permission(op))
+    if len(pool) >= count:
+        break
+index.save()
+regions = regions[:math.ceil(count / len(pool))]
+permissions = {}
+for client_name, op in pool[:math.ceil(count / len(regions))]:
+    permissions.setdefault(client_name, []).append(op)
+
+v.PARAM_SYNTHESIZER.configure(cache_dir / v.DEFAULT_PARAM_CACHE)
+plan, remaining = {}, count
+for group, specs in v.compile_plan(permissions, regions, "123456789012").items():
+    if remaining > 0:
+        plan[group] = specs[:remaining]
+        remaining -= len(plan[group])
+v.PARAM_SYNTHESIZER.save()
+
+# Stand-in for AWS: answer at before-send with the protocol's empty result or throttling error
+THROTTLE = {
+    "json": (400, {}, b'{"__type": "ThrottlingException", "message": "Rate exceeded"}'),
+    "rest-json": (429, {"x-amzn-ErrorType": "ThrottlingException"}, b'{"message": "Rate exceeded"}'),
+    "query": (400, {}, b"<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>"
+                       b"<Message>Rate exceeded</Message></Error></ErrorResponse>"),
+    "ec2": (503, {}, b"<Response><Errors><Error><Code>RequestLimitExceeded</Code>"
+                     b"<Message>Rate exceeded</Message></Error></Errors></Response>"),
+    "rest-xml": (503, {}, b"<Error><Code>SlowDown</Code><Message>Rate exceeded</Message></Error>"),
+}
+local = threading.local()
+rng = random.Random(seed)
+rng_lock = threading.Lock()
+counts = {"requests": 0, "throttled": 0}
+
+class RawBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+def remember_operation(model, **kwargs):
+    local.model = model
+
+def respond(request, **kwargs):
+    from botocore.awsrequest import AWSResponse
+    model = local.model
+    protocol = model.service_model.resolved_protocol
+    with rng_lock:
+        throttled = protocol in THROTTLE and rng.random() < throttle_rate
+        counts["requests"] += 1
+        counts["throttled"] += throttled
+    if latency:
+        time.sleep(latency)
+    if throttled:
+        status, headers, body = THROTTLE[protocol]
+    elif protocol in ("json", "rest-json"):
+        status, headers, body = 200, {}, b"{}"
+    elif protocol in ("query", "ec2"):
+        status, headers, body = 200, {}, f"<{model.name}Response/>".encode()
+    else:
+        status, headers, body = 200, {}, b""
+    return AWSResponse(request.url, status, {"content-length": str(len(body)), **headers}, RawBody(body))
+
+session = v.MODEL_LOADER.boto3_session(
+    aws_access_key_id="AKIABENCHMARK", aws_secret_access_key="benchmark", region_name=regions[0])
+session.events.register("before-call", remember_operation)
+session.events.register("before-send", respond)
+v.CLIENT_REGISTRY.register_session("benchmark", session)
+v.RATE_LIMITER.configure(rate_limit, v.MAX_RETRIES)
+
+# --synthetic-results: no calls at all, a made-up result in run_call_spec's shape per probe
+MESSAGES = {"PASSED": "Permission validated successfully", "DENIED": "AccessDeniedException: User is not authorized",
+            "NOT_TESTED": "Requires parameters not in mapping"}
+
+def synthesize(call, profile=None):
+    with rng_lock:
+        status = rng.choice(synthetic_statuses)
+        counts["requests"] += 1
+        items = rng.randrange(50)
+        call_latency = rng.uniform(0.005, 0.5)
+    return {
+        "service": call.service, "permission": call.permission, "region": call.region, "status": status,
+        "message": MESSAGES[status], "error_code": "AccessDeniedException" if status == "DENIED" else None,
+        "data": {"count": items, "sample": None, "details": f"{items} items" if status == "PASSED" else ""},
+        "latency": call_latency, "attempts": 1, "bytes": 100 + items * 200,
+    }
+
+if synthetic_statuses:
+    v.run_call_spec = synthesize
+
+report = v.ReportWriter(output_dir, multi_region=len(regions) > 1)
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    v.validate_services(plan, "benchmark", workers=workers, on_result=lambda group, r: report.add(r))
+    report.finish({"arn": "arn:aws:iam::123456789012:user/benchmark", "account": "123456789012",
+                   "user_id": "AIDABENCHMARK"}, {})
+elapsed = time.perf_counter() - start
+
+print(json.dumps({
+    "permissions": sum(report.totals.values()),
+    "statuses": dict(report.totals),
+    "regions": len(regions),
+    "seconds": elapsed,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "retries": sum(s["retries"] for s in v.RATE_LIMITER.stats().values()),
+    **counts,
+    **v.CLIENT_REGISTRY.stats(),
+}))
+'''
+
+
+def run_once(script: Path, cache_dir: Path, count: int, workers: int, latency_ms: float,
+             throttle_rate: float, rate_limit: float, seed: int, synthetic: bool = False) -> dict:
+    """Validate the synthetic list in a fresh process. Returns the driver's measurements."""
+    env = {
+        **os.environ,
+        # Offline: no instance metadata lookups, no profile from the environment
+        "AWS_EC2_METADATA_DISABLED": "true",
+    }
+    env.pop("AWS_PROFILE", None)
+    with tempfile.TemporaryDirectory() as output_dir:
+        output = subprocess.run(
+            [sys.executable, "-c", DRIVER, str(script), str(cache_dir), output_dir, str(count), str(workers),
+             str(latency_ms / 1000), str(throttle_rate), str(rate_limit), str(seed),
+             json.dumps(SYNTHETIC_STATUSES if synthetic else []), *BENCHMARK_REGIONS],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark validator throughput against a stubbed AWS endpoint")
+    parser.add_argument("--permissions", "-n", type=int, default=1000,
+                        help="Size of the synthetic permission list (default: 1000)")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=[8],
+                        help="Worker thread counts to measure (default: 8)")
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[10.0],
+                        help="Simulated response latency in ms (default: 10)")
+    parser.add_argument("--throttle-rate", type=float, nargs="+", default=[0.0],
+                        help="Share of requests answered with a throttling error (default: 0)")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Validator --rate-limit per service, 0 = off (default: 0, measures the client path)")
+    parser.add_argument("--runs", "-r", type=int, default=1, help="Measured runs per scenario, best kept (default: 1)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for throttle injection (default: 1)")
+    parser.add_argument("--synthetic-results", action="store_true",
+                        help="Make no API calls; probes return made-up results at once (measures result handling)")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help=f"Validator to measure (default: {DEFAULT_SCRIPT})")
+    parser.add_argument("--baseline", help="Another validator version to measure for comparison")
+    parser.add_argument("--min-rate", type=float,
+                        help="Exit with status 1 if any scenario of --script is below this many permissions/second")
+    args = parser.parse_args()
+
+    script_dir = Path(__file__).parent
+    scripts = []
+    for label, script in (("baseline", args.baseline), ("current", args.script)):
+        if script:
+            script = Path(script)
+            scripts.append((label, script if script.is_absolute() else script_dir / script))
+
+    scenarios = list(itertools.product(args.workers, args.latency_ms, args.throttle_rate))
+    print(f"Permissions: {args.permissions}  Rate limit: {args.rate_limit or 'off'}  Runs: {args.runs}"
+          + ("  Results: synthetic (no API calls)" if args.synthetic_results else ""))
+    print()
+    print("| Variant | Workers | Latency | Throttled | Time (s) | Perms/s | Peak RSS (MB) | Clients | Requests | Retries |")
+    print("|---------|--------:|--------:|----------:|---------:|--------:|--------------:|--------:|---------:|--------:|")
+
+    slow = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Warm-up run fills the operation index and parameter cache, so setup stays out of peak RSS
+        for _, script in scripts:
+            run_once(script, Path(cache_dir), args.permissions, max(args.workers), 0.0, 0.0, 0.0, args.seed,
+                     args.synthetic_results)
+
+        for workers, latency_ms, throttle_rate in scenarios:
+            for label, script in scripts:
+                best = min(
+                    (run_once(script, Path(cache_dir), args.permissions, workers, latency_ms, throttle_rate,
+                              args.rate_limit, args.seed, args.synthetic_results) for _ in range(args.runs)),
+                    key=lambda m: m["seconds"],
+                )
+                rate = best["permissions"] / best["seconds"]
+                print(f"| {label} | {workers} | {latency_ms:g} ms | {best['throttled'] / max(1, best['requests']):.1%} "
+                      f"| {best['seconds']:.2f} | {rate:.0f} | {best['peak_rss_kb'] / 1024:.0f} "
+                      f"| {best['clients_created']} | {best['requests']} | {best['retries']} |", flush=True)
+                if label == "current" and args.min_rate and rate < args.min_rate:
+                    slow.append(f"{workers} workers, {latency_ms:g} ms, {throttle_rate:.0%} throttled: {rate:.0f}/s")
+
+    if slow:
+        print()
+        print(f"Below --min-rate {args.min_rate:g} permissions/second:")
+        for line in slow:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for the tests of the repository-root scripts.
+
+AWS is never called: clients are stubbed with botocore's Stubber, and dummy
+credentials keep botocore from looking any up.
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# athena_runner.py is imported from the repository root, like the scripts do
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "AKIATESTING")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ["AWS_EC2_METADATA_DISABLED"] = "true"
+
+
+@pytest.fixture(scope="session")
+def validator():
+    """validate-read-only-aws-permissions.py loaded as a module (its file name has hyphens)."""
+    spec = importlib.util.spec_from_file_location("validator", ROOT / "validate-read-only-aws-permissions.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
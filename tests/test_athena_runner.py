@@ -0,0 +1,164 @@
+"""Tests for athena_runner.py against a stubbed Athena endpoint."""
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import athena_runner
+
+QUERY_ID = "11111111-2222-3333-4444-555555555555"
+COLUMNS = ["waypoint_id", "frequency_mhz"]
+
+
+def page(rows, next_token=None, header=False):
+    """A GetQueryResults response; rows are lists of strings, None for NULL."""
+    data = [[{"VarCharValue": value} if value is not None else {} for value in row] for row in rows]
+    if header:
+        data.insert(0, [{"VarCharValue": name} for name in COLUMNS])
+    response = {
+        "ResultSet": {
+            "ResultSetMetadata": {"ColumnInfo": [{"Name": name, "Type": "varchar"} for name in COLUMNS]},
+            "Rows": [{"Data": row} for row in data],
+        },
+    }
+    if next_token:
+        response["NextToken"] = next_token
+    return response
+
+
+@pytest.fixture
+def athena():
+    client = boto3.client("athena", region_name="us-east-1")
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_read_results_follows_next_token(athena):
+    client, stubber = athena
+    stubber.add_response("get_query_results", page([["WP1", "1.5"], ["WP2", None]], "token-2", header=True),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 1000})
+    # A later page starts straight with data, even a row that looks like the header
+    stubber.add_response("get_query_results", page([COLUMNS, ["WP3", "2.5"]], "token-3"),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 1000, "NextToken": "token-2"})
+    stubber.add_response("get_query_results", page([["WP4", None]]),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 1000, "NextToken": "token-3"})
+
+    columns, rows = athena_runner.read_results(client, QUERY_ID)
+
+    assert columns == COLUMNS
+    assert list(rows) == [["WP1", "1.5"], ["WP2", None], COLUMNS, ["WP3", "2.5"], ["WP4", None]]
+
+
+def test_read_results_fetches_pages_as_rows_are_consumed(athena):
+    client, stubber = athena
+    stubber.add_response("get_query_results", page([["WP1", "1.5"]], "token-2", header=True),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 2})
+    stubber.add_response("get_query_results", page([["WP2", "2.5"]]),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 2, "NextToken": "token-2"})
+
+    calls = []
+    client.meta.events.register("before-parameter-build.athena.GetQueryResults", lambda **kwargs: calls.append(1))
+    _, rows = athena_runner.read_results(client, QUERY_ID, page_size=2)
+
+    assert next(rows) == ["WP1", "1.5"]
+    assert len(calls) == 1
+    assert list(rows) == [["WP2", "2.5"]]
+    assert len(calls) == 2
+
+
+def test_read_results_header_only(athena):
+    client, stubber = athena
+    stubber.add_response("get_query_results", page([], header=True),
+                         {"QueryExecutionId": QUERY_ID, "MaxResults": 1000})
+
+    columns, rows = athena_runner.read_results(client, QUERY_ID)
+
+    assert columns == COLUMNS
+    assert list(rows) == []
+
+
+def test_run_query_reads_every_page(athena, monkeypatch):
+    client, stubber = athena
+    monkeypatch.setattr(athena_runner.time, "sleep", lambda seconds: None)
+    stubber.add_response("start_query_execution", {"QueryExecutionId": QUERY_ID})
+    stubber.add_response("get_query_execution", {"QueryExecution": {
+        "QueryExecutionId": QUERY_ID,
+        "Status": {"State": "SUCCEEDED"},
+        "Statistics": {"DataScannedInBytes": 42},
+        "ResultConfiguration": {"OutputLocation": f"s3://bucket/{QUERY_ID}.csv"},
+    }})
+    stubber.add_response("get_query_results", page([["WP1", "1.5"]], "token-2", header=True))
+    stubber.add_response("get_query_results", page([["WP2", None]]))
+
+    result = athena_runner.run_query(client, "SELECT * FROM aeronav_db.navigation_waypoints", "s3://bucket/")
+
+    assert result.succeeded
+    assert result.columns == COLUMNS
+    assert result.rows == [["WP1", "1.5"], ["WP2", None]]
+    assert result.bytes_scanned == 42
+
+
+@pytest.fixture
+def glue():
+    client = boto3.client("glue", region_name="us-east-1")
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+def iceberg_table(database, name):
+    return {"Table": {"Name": name, "DatabaseName": database,
+                      "Parameters": {"metadata_location": f"s3://warehouse/{database}/{name}/00001.metadata.json"}}}
+
+
+def test_cache_key_covers_every_joined_table(glue):
+    client, stubber = glue
+    query = 'SELECT * FROM aeronav_db.navigation_waypoints w JOIN "aeronav_db"."flight_routes" r ON w.id = r.id'
+    for table in ("flight_routes", "navigation_waypoints"):
+        stubber.add_response("get_table", iceberg_table("aeronav_db", table),
+                             {"DatabaseName": "aeronav_db", "Name": table})
+
+    assert athena_runner.cache_key(client, query, "arn:aws:iam::123456789012:role/DataScientist") is not None
+    stubber.assert_no_pending_responses()
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM aeronav_db.a, aeronav_db.b",
+    "SELECT * FROM aeronav_db.a x, aeronav_db.b y WHERE x.id = y.id",
+    "SELECT * FROM aeronav_db.a JOIN b ON a.id = b.id",
+    "SELECT * FROM aeronav_db.a JOIN aeronav_db.b ON a.id = b.id, aeronav_db.c",
+    "SELECT * FROM awsdatacatalog.aeronav_db.a",
+    "SELECT * FROM (SELECT * FROM aeronav_db.a) s",
+    "SELECT 1",
+])
+def test_cache_key_skips_queries_with_unkeyed_tables(glue, query):
+    client, _ = glue
+    calls = []
+    client.meta.events.register("before-parameter-build.glue.GetTable", lambda **kwargs: calls.append(1))
+
+    assert athena_runner.cache_key(client, query, "arn:aws:iam::123456789012:role/DataScientist") is None
+    assert calls == []
+
+
+def execution(query_id, state):
+    return {"QueryExecutionId": query_id, "Status": {"State": state}, "Statistics": {}}
+
+
+def test_run_queries_stops_running_queries_when_closed_early(athena, monkeypatch):
+    client, stubber = athena
+    monkeypatch.setattr(athena_runner.time, "sleep", lambda seconds: None)
+    other_id = QUERY_ID.replace("1", "9")
+    stubber.add_response("start_query_execution", {"QueryExecutionId": QUERY_ID})
+    stubber.add_response("start_query_execution", {"QueryExecutionId": other_id})
+    stubber.add_response("batch_get_query_execution", {
+        "QueryExecutions": [execution(QUERY_ID, "SUCCEEDED"), execution(other_id, "RUNNING")],
+        "UnprocessedQueryExecutionIds": [],
+    })
+    stubber.add_response("stop_query_execution", {}, {"QueryExecutionId": other_id})
+
+    results = athena_runner.run_queries([(client, "SELECT 1"), (client, "SELECT 2")], "s3://bucket/",
+                                        fetch_results=False)
+    index, result = next(results)
+    results.close()
+
+    assert (index, result.state) == (0, "SUCCEEDED")
@@ -0,0 +1,27 @@
+"""Tests for the regex sampler behind synthesized string parameters."""
+
+import re
+
+import pytest
+
+
+@pytest.mark.parametrize("pattern", [
+    r"^[a-zA-Z0-9_-]{1,64}$",
+    r"arn:aws(-cn|-us-gov)?:iam::\d{12}:role/[\w+=,.@-]+",
+    r"^([!-\u007F]+/)?[\w+=,.@-]+$",
+    r"(?s).+",
+    r"[^\u0000-\u007F]+",
+    r"^(?!.*?(.)\1{3})[-_!@#$a-zA-Z0-9]*$",
+    r"[0-9a-fA-F]{8}\b-[0-9a-fA-F]{4}\b-[0-9a-fA-F]{12}",
+    r"(?:sg|subnet)-[0-9a-f]{8,17}",
+])
+def test_sample_matches_pattern(validator, pattern):
+    sample = validator.sample_from_pattern(pattern)
+
+    assert sample is not None
+    assert re.fullmatch(pattern, sample)
+
+
+@pytest.mark.parametrize("pattern", [r"\p{L}+", r"[a-z", r"a)b", r"(?<name>x)", r"*a"])
+def test_unsupported_or_invalid_pattern_gives_none(validator, pattern):
+    assert validator.sample_from_pattern(pattern) is None
@@ -0,0 +1,78 @@
+"""Tests for the --simulate path of validate-read-only-aws-permissions.py against a stubbed IAM endpoint."""
+
+import pytest
+from botocore.stub import Stubber
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/ReadOnlyAuditor"
+
+
+def evaluation(action, decision="allowed", policy="ReadOnlyAccess"):
+    return {
+        "EvalActionName": action,
+        "EvalResourceName": "*",
+        "EvalDecision": decision,
+        "MatchedStatements": [{"SourcePolicyId": policy}] if policy else [],
+    }
+
+
+@pytest.fixture
+def iam(validator):
+    client = validator.get_boto3_client("iam", "us-east-1")
+    with Stubber(client) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_simulate_actions_batches_and_follows_markers(validator, iam):
+    actions = ["s3:ListAllMyBuckets", "ec2:DescribeInstances", "lambda:ListFunctions"]
+    iam.add_response("simulate_principal_policy",
+                     {"EvaluationResults": [evaluation(actions[0])], "IsTruncated": True, "Marker": "page-2"},
+                     {"PolicySourceArn": ROLE_ARN, "ActionNames": actions[:2]})
+    iam.add_response("simulate_principal_policy",
+                     {"EvaluationResults": [evaluation(actions[1], "implicitDeny", None)], "IsTruncated": False},
+                     {"PolicySourceArn": ROLE_ARN, "ActionNames": actions[:2], "Marker": "page-2"})
+    iam.add_response("simulate_principal_policy",
+                     {"EvaluationResults": [evaluation(actions[2])], "IsTruncated": False},
+                     {"PolicySourceArn": ROLE_ARN, "ActionNames": actions[2:]})
+
+    evaluations, calls = validator.simulate_actions(actions, ROLE_ARN, "us-east-1", batch_size=2)
+
+    assert calls == 3
+    assert sorted(evaluations) == sorted(actions)
+    assert evaluations["ec2:DescribeInstances"]["EvalDecision"] == "implicitDeny"
+
+
+def test_simulate_services_uses_assumed_role_arn(validator, iam):
+    spec = validator.CallSpec
+    plan = {
+        "s3": [spec("s3", "ListBuckets", "us-east-1", "s3", "list_buckets", {})],
+        "ec2": [spec("ec2", "DescribeInstances", "us-east-1", "ec2", "describe_instances", {})],
+    }
+    # A role assumed with --assume-roles is simulated as the role itself, not the session
+    identity = {
+        "account": "123456789012",
+        "arn": "arn:aws:sts::123456789012:assumed-role/ReadOnlyAuditor/session",
+        "role_arn": ROLE_ARN,
+    }
+    iam.add_response("simulate_principal_policy",
+                     {"EvaluationResults": [evaluation("s3:ListAllMyBuckets"),
+                                            evaluation("ec2:DescribeInstances", "explicitDeny", "DenyEc2")],
+                      "IsTruncated": False},
+                     {"PolicySourceArn": ROLE_ARN, "ActionNames": ["s3:ListAllMyBuckets", "ec2:DescribeInstances"]})
+
+    results = validator.simulate_services(plan, identity, "us-east-1")
+
+    assert [(r["permission"], r["status"]) for r in results] == [("ListBuckets", "PASSED"),
+                                                                  ("DescribeInstances", "DENIED")]
+    assert results[0]["data"]["details"] == "Allowed by ReadOnlyAccess"
+    assert results[1]["error_code"] == "explicitDeny"
+
+
+def test_simulate_services_reports_simulation_failure(validator, iam):
+    plan = {"s3": [validator.CallSpec("s3", "ListBuckets", "us-east-1", "s3", "list_buckets", {})]}
+    iam.add_client_error("simulate_principal_policy", "AccessDenied", "not authorized to iam:SimulatePrincipalPolicy")
+
+    results = validator.simulate_services(plan, {"role_arn": ROLE_ARN}, "us-east-1")
+
+    assert results[0]["status"] == "ERROR"
+    assert results[0]["message"].startswith("AccessDenied")
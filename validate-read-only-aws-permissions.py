@@ -10,6 +10,7 @@ Features:
 - Tests permissions by calling AWS APIs with test resource names
 - "Not found" errors prove the permission exists (API was authorized)
 - Optionally queries CloudTrail for denied permission diagnostics
+- Optionally evaluates policies with iam:SimulatePrincipalPolicy instead (--mode simulate)
 - Generates markdown report with results matrix
 
 Usage:
@@ -17,19 +18,56 @@ Usage:
     python validate-read-only-aws-permissions.py --profile my-profile # Override profile
     python validate-read-only-aws-permissions.py --service ec2        # Validate only EC2
     python validate-read-only-aws-permissions.py --service ec2 s3     # Validate EC2 and S3
+    python validate-read-only-aws-permissions.py --workers 16         # Validate on 16 threads
+    python validate-read-only-aws-permissions.py --plan plan.json     # Reuse compiled call plan
+    python validate-read-only-aws-permissions.py --mode simulate      # Batched policy simulation
+    python validate-read-only-aws-permissions.py --regions us-east-1 eu-west-1 -w 16  # Several regions
+    python validate-read-only-aws-permissions.py --assume-roles RoleA RoleB          # Compare roles
+    python validate-read-only-aws-permissions.py --incremental        # Re-probe only stale/failed/new
+    python validate-read-only-aws-permissions.py --resume validation-journal-<ts>.jsonl  # Continue a run
+    python validate-read-only-aws-permissions.py -f validate.txt      # Expand List*/GET entries and validate
+    python validate-read-only-aws-permissions.py -s ec2 --model-cache --timings  # Fast start for CI
+    python validate-read-only-aws-permissions.py -s ec2 --profile-out run.prof   # Profile with cProfile
+    python validate-read-only-aws-permissions.py --shard 2/4          # Validate one quarter of the list
+    python validate-read-only-aws-permissions.py merge validation-shard-*-of-4.jsonl  # One report from shards
+    python validate-read-only-aws-permissions.py --watch 300 -w 8     # Re-validate every 5 min, serve metrics
+    python validate-read-only-aws-permissions.py --fail-fast          # CI: riskiest first, stop at first DENIED
 """
 
 import argparse
+import atexit
+import fnmatch
+import gzip
+import hashlib
+import heapq
+import json
+import marshal
 import os
+import queue
+import random
 import re
+import sqlite3
 import sys
+import threading
+import time
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Any, Optional
-
-import boto3
-import yaml
-from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError, ParamValidationError
+from types import MappingProxyType
+from typing import Any, Mapping, NamedTuple, Optional
+
+# Start of module load, for --timings
+MODULE_START = time.perf_counter()
+
+# boto3, botocore.session/config and yaml are imported where first needed,
+# so runs that never reach them (--help, --expand, fully cached runs) start fast
+import botocore
+from botocore.exceptions import (
+    BotoCoreError, ClientError, NoCredentialsError, EndpointConnectionError, ParamValidationError,
+    UnknownServiceError,
+)
 
 
 # Map of AWS service names to boto3 client names (where they differ)
@@ -205,6 +243,237 @@ PERMISSION_REQUIRED_PARAMS = {
     ("cloudwatch", "DescribeAlarmsForMetric"): {"MetricName": "CPUUtilization", "Namespace": "AWS/EC2"},
 }
 
+# Parameters for permissions that need them in any service without a specific mapping above
+# Format: permission -> {param_name: param_value}, same placeholders as PERMISSION_REQUIRED_PARAMS
+# plus "REGION", replaced with the region being validated
+PERMISSION_DEFAULT_PARAMS = {
+    # S3 bucket permissions - use test bucket name
+    "GetBucketLocation": {"Bucket": "TEST_RESOURCE"},
+    "GetBucketVersioning": {"Bucket": "TEST_RESOURCE"},
+    "GetBucketTagging": {"Bucket": "TEST_RESOURCE"},
+    # Lambda
+    "GetFunction": {"FunctionName": "TEST_RESOURCE"},
+    # Secrets Manager
+    "DescribeSecret": {"SecretId": "TEST_RESOURCE"},
+    # KMS
+    "DescribeKey": {"KeyId": "TEST_RESOURCE"},
+    # DynamoDB
+    "DescribeTable": {"TableName": "TEST_RESOURCE"},
+    # SQS - needs a URL format
+    "GetQueueAttributes": {"QueueUrl": "https://sqs.REGION.amazonaws.com/ACCOUNT_ID/TEST_RESOURCE", "AttributeNames": ["All"]},
+    # CloudTrail
+    "GetTrailStatus": {"Name": "TEST_RESOURCE"},
+    # IAM
+    "GetRole": {"RoleName": "TEST_RESOURCE"},
+    # CloudWatch Logs
+    "DescribeLogStreams": {"logGroupName": "TEST_RESOURCE", "limit": 1},
+    # Glue
+    "GetTables": {"DatabaseName": "TEST_RESOURCE"},
+    # Permissions with special parameters
+    "DescribeSnapshots": {"OwnerIds": ["self"]},
+    "DescribeImages": {"Owners": ["self"]},
+}
+
+# IAM action names for --mode simulate where they differ from "<service>:<Permission>"
+# None means the API needs no IAM permission at all
+IAM_ACTION_OVERRIDE = {
+    ("s3", "ListBuckets"): "s3:ListAllMyBuckets",
+    ("s3", "ListObjectsV2"): "s3:ListBucket",
+    ("sts", "GetCallerIdentity"): None,
+}
+
+# API operation names for IAM actions listed in validate.txt (reverse of IAM_ACTION_OVERRIDE)
+IAM_ACTION_API = {
+    (service, action.split(":", 1)[1]): permission
+    for (service, permission), action in IAM_ACTION_OVERRIDE.items()
+    if action
+}
+
+# Services whose IAM actions are HTTP verbs rather than API operation names
+SERVICE_IAM_ACTION = {
+    "apigateway": "apigateway:GET",
+}
+
+# Action names sent per SimulatePrincipalPolicy call in --mode simulate
+SIMULATE_BATCH_SIZE = 100
+
+# Services whose APIs are global - probed once per run, not once per region (--regions)
+GLOBAL_SERVICES = ("iam", "sts", "organizations", "route53", "cloudfront")
+
+# Individual permissions that are global in otherwise regional services
+GLOBAL_PERMISSIONS = {
+    ("s3", "ListBuckets"),
+    ("s3", "ListMultiRegionAccessPoints"),
+}
+
+# Session name used when assuming roles for --assume-roles
+ROLE_SESSION_NAME = "perm-validator"
+
+# Account ID used in placeholders when the caller identity could not be resolved
+FALLBACK_ACCOUNT_ID = "000000000000"
+
+# Version of the serialized plan format written by save_plan()
+PLAN_FORMAT_VERSION = 1
+
+# Cache of parameters synthesized from botocore input shapes (in the output directory)
+DEFAULT_PARAM_CACHE = "synthesized-params.json"
+
+# Version of the synthesized parameter cache format; bump when synthesis rules change
+SYNTH_FORMAT_VERSION = 2
+
+# Nesting depth at which synthesis stops descending into required structures
+SYNTH_MAX_DEPTH = 8
+
+# Fixed value for required timestamp members
+SYNTH_TIMESTAMP = "2020-01-01T00:00:00Z"
+
+# Characters sample_from_pattern() uses for regex escapes, in and outside [...]
+ESCAPE_SAMPLES = {"d": "0", "D": "a", "w": "a", "W": "-", "s": " ", "S": "a", "n": "\n", "r": "\r", "t": "\t",
+                  "f": "\f", "v": "\v"}
+# Characters sample_from_pattern() tries, in order, for a negated class ([^...])
+NEGATED_CLASS_SAMPLES = "a0A-_.x\u00e9"
+
+# Marshalled copies of parsed botocore JSON models for --model-cache (in the output directory)
+DEFAULT_MODEL_CACHE_DIR = "model-cache"
+
+# botocore data file extensions, in the order botocore tries them
+MODEL_FILE_EXTENSIONS = (".json", ".json.gz")
+
+# Slowest calls listed in the report's Performance section
+SLOWEST_CALLS_REPORTED = 20
+
+# Functions shown on the console after --profile-out (the full data is in the file)
+PROFILE_SUMMARY_LINES = 25
+
+# Result store file for --incremental (relative to the output directory)
+DEFAULT_RESULTS_DB = "validation-results.db"
+
+# How long a stored result stays fresh for --incremental
+DEFAULT_CACHE_TTL_HOURS = 24
+
+# On-disk botocore operation index used to expand wildcard entries (in the output directory)
+DEFAULT_OPERATION_INDEX = "botocore-operation-index.json"
+
+# HTTP methods that mark an operation as read-only regardless of its name
+READONLY_HTTP_METHODS = ("GET", "HEAD")
+
+# Version of the JSON Lines journal format written by ResultJournal
+JOURNAL_FORMAT_VERSION = 1
+
+# Version of the JSON Lines shard output written by --shard and read by merge
+SHARD_FORMAT_VERSION = 1
+
+# How far back the CloudTrail scan looks for the caller's denied calls
+CLOUDTRAIL_LOOKBACK_MINUTES = 60
+
+# Events per LookupEvents page (the API maximum) and pages read per scan at most
+CLOUDTRAIL_PAGE_SIZE = 50
+CLOUDTRAIL_MAX_PAGES = 40
+
+# Results written to the result store per transaction
+RESULT_STORE_BATCH_SIZE = 500
+
+# Statuses that are always re-probed by --incremental (and every --watch cycle), however fresh
+REPROBE_STATUSES = ("DENIED", "ERROR")
+
+# --fail-fast: workers when --workers is not given (probes run concurrently, riskiest first)
+FAIL_FAST_WORKERS = 16
+
+# --fail-fast: newest journals in the output directory read for denial history
+FAIL_FAST_JOURNALS = 10
+
+# --watch: share of the interval each wait is shortened or stretched by at random
+WATCH_JITTER = 0.1
+
+# --watch: cycles a permission whose status changed keeps being re-probed every cycle
+WATCH_CHANGE_CYCLES = 3
+
+# --watch: cycles a full sweep of the remaining (steady) permissions is spread over
+WATCH_SWEEP_CYCLES = 12
+
+# --watch: local port for the Prometheus metrics endpoint (served on 127.0.0.1 only)
+DEFAULT_METRICS_PORT = 9473
+
+# Upper bounds of the probe latency histogram in the --watch metrics, in seconds
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# IAM calls that change what a principal may do; --watch re-probes everything after one
+POLICY_CHANGE_EVENTS = frozenset({
+    "AttachUserPolicy", "DetachUserPolicy", "PutUserPolicy", "DeleteUserPolicy",
+    "AttachRolePolicy", "DetachRolePolicy", "PutRolePolicy", "DeleteRolePolicy",
+    "AttachGroupPolicy", "DetachGroupPolicy", "PutGroupPolicy", "DeleteGroupPolicy",
+    "AddUserToGroup", "RemoveUserFromGroup",
+    "CreatePolicyVersion", "DeletePolicyVersion", "SetDefaultPolicyVersion",
+    "PutUserPermissionsBoundary", "DeleteUserPermissionsBoundary",
+    "PutRolePermissionsBoundary", "DeleteRolePermissionsBoundary",
+})
+
+# IAM is global; CloudTrail records its events in us-east-1
+IAM_EVENTS_REGION = "us-east-1"
+
+# How far back --watch looks for IAM policy changes (CloudTrail delivers events minutes late)
+POLICY_CHANGE_LOOKBACK_MINUTES = 30
+
+# Error codes that mean the service is throttling us - slow down and retry
+THROTTLING_ERROR_CODES = (
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "SlowDown",
+    "ProvisionedThroughputExceededException",
+)
+
+# Transient server-side error codes that are retried without slowing down
+TRANSIENT_ERROR_CODES = (
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "PriorRequestNotComplete",
+)
+
+# Starting (and maximum) request rate per service and region, in requests/second
+DEFAULT_RATE_PER_SERVICE = 10.0
+
+# Floor the adaptive rate never drops below, in requests/second
+MIN_RATE_PER_SERVICE = 0.5
+
+# Per-service ceilings on the probe rate (CloudTrail LookupEvents allows about 2 TPS)
+SERVICE_RATE_LIMITS = {
+    "cloudtrail": 2.0,
+}
+
+# Rate regained per successful call after throttling (additive increase)
+RATE_RECOVERY_STEP = 0.5
+
+# Retries for throttled/transient calls, and the exponential backoff base/cap in seconds
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 8.0
+
+# Default cap on concurrent calls to any single service when --workers > 1
+DEFAULT_MAX_PER_SERVICE = 4
+
+# Default HTTP connection pool size per client (botocore default is 10)
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+# Status symbols for inline console output
+STATUS_SYMBOLS = {
+    "PASSED": "[OK]",
+    "DENIED": "[X]",
+    "NOT_TESTED": "[N/T]",
+    "SKIPPED": "[--]",
+    "ERROR": "[!]",
+}
+
+# Status labels used in report tables
+STATUS_ICONS = {"PASSED": "OK", "DENIED": "DENIED", "NOT_TESTED": "N/T", "SKIPPED": "SKIP", "ERROR": "ERR"}
+
 # Read-only permission prefixes (safety check)
 READONLY_PREFIXES = ("Describe", "List", "Get", "Lookup", "Search")
 
@@ -278,13 +547,882 @@ def is_readonly_permission(permission: str) -> bool:
     return permission.startswith(READONLY_PREFIXES)
 
 
-def get_boto3_client(service: str, region: str, profile: Optional[str] = None):
-    """Get boto3 client for the specified service."""
+def is_global_permission(service: str, permission: str) -> bool:
+    """Check if a permission belongs to a global (non-regional) API."""
+    return service in GLOBAL_SERVICES or (service, permission) in GLOBAL_PERMISSIONS
+
+
+class CallSpec(NamedTuple):
+    """A fully resolved API call that proves one permission."""
+    service: str
+    permission: str
+    region: str
+    client_name: str
+    method_name: str
+    params: Mapping[str, Any]
+
+
+def materialize_param(value: Any, test_resource: str, account_id: str, region: str) -> Any:
+    """Replace TEST_RESOURCE/ACCOUNT_ID/REGION placeholders in a parameter value."""
+    if isinstance(value, str):
+        return value.replace("TEST_RESOURCE", test_resource).replace("ACCOUNT_ID", account_id).replace("REGION", region)
+    if isinstance(value, list):
+        return [materialize_param(v, test_resource, account_id, region) for v in value]
+    if isinstance(value, dict):
+        return {k: materialize_param(v, test_resource, account_id, region) for k, v in value.items()}
+    return value
+
+
+def get_client_name(service: str, permission: str) -> str:
+    """Return the boto3 client name that serves a permission."""
+    client_service = PERMISSION_CLIENT_OVERRIDE.get((service, permission), service)
+    return SERVICE_CLIENT_MAP.get(client_service, client_service)
+
+
+def sample_from_pattern(pattern: str) -> Optional[str]:
+    """
+    Build a short string matching a (simple) regex pattern, or None if it can't.
+
+    Best effort over the pattern shapes botocore models use: literals, escapes,
+    [...] classes, groups with alternation (first branch) and quantifiers
+    (minimum count). Lookarounds are skipped; anything else gives None, and
+    the sample is only returned if the pattern really matches it.
+    """
+    pos = 0
+
+    def parse_escape() -> str:
+        nonlocal pos
+        escaped = pattern[pos]
+        pos += 1
+        if escaped in "ux":
+            digits = 4 if escaped == "u" else 2
+            code = pattern[pos:pos + digits]
+            pos += digits
+            return chr(int(code, 16))
+        if escaped.isdigit() or escaped in "AbBZz":
+            # Back-references and anchors (\b is a backspace in a class, but no model uses one)
+            return ""
+        if escaped.isalnum() and escaped not in ESCAPE_SAMPLES:
+            raise ValueError(f"unsupported escape \\{escaped}")
+        return ESCAPE_SAMPLES.get(escaped, escaped)
+
+    def parse_class() -> str:
+        nonlocal pos
+        start = pos - 1
+        negate = pattern[pos] == "^"
+        pos += negate
+        first = None
+        while pattern[pos] != "]" or pos == start + 1 + negate:
+            ch = pattern[pos]
+            pos += 1
+            if ch == "\\":
+                ch = parse_escape()
+            first = first if first is not None else ch
+        pos += 1
+        if not negate:
+            return first
+        return next(ch for ch in NEGATED_CLASS_SAMPLES if re.fullmatch(pattern[start:pos], ch))
+
+    def parse_group() -> str:
+        nonlocal pos
+        assertion = False
+        if pattern[pos] == "?":
+            if pattern.startswith("?:", pos):
+                pos += 2
+            elif pattern.startswith("?P<", pos):
+                pos = pattern.index(">", pos) + 1
+            elif pattern.startswith(("?=", "?!"), pos):
+                pos, assertion = pos + 2, True
+            elif pattern.startswith(("?<=", "?<!"), pos):
+                pos, assertion = pos + 3, True
+            elif re.match(r"\?[aiLmsux]+\)", pattern[pos:]):
+                # Inline flags such as (?s): the sample is checked against the full pattern
+                pos = pattern.index(")", pos) + 1
+                return ""
+            else:
+                raise ValueError(f"unsupported group at {pos}")
+        sample = parse_alternation()
+        if pattern[pos] != ")":
+            raise ValueError(f"missing ) at {pos}")
+        pos += 1
+        return "" if assertion else sample
+
+    def parse_atom() -> str:
+        nonlocal pos
+        ch = pattern[pos]
+        pos += 1
+        if ch == "(":
+            return parse_group()
+        if ch == "[":
+            return parse_class()
+        if ch == "\\":
+            return parse_escape()
+        if ch in "^$":
+            return ""
+        if ch == ".":
+            return "a"
+        if ch in "*+?{":
+            raise ValueError(f"nothing to repeat at {pos}")
+        return ch
+
+    def parse_count() -> int:
+        nonlocal pos
+        if pos < len(pattern) and pattern[pos] in "*+?":
+            low = 1 if pattern[pos] == "+" else 0
+            pos += 1
+        else:
+            match = re.match(r"\{(\d*)(?:,\d*)?\}", pattern[pos:])
+            if not match:
+                return 1
+            low = int(match.group(1) or 0)
+            pos += match.end()
+        if pos < len(pattern) and pattern[pos] in "?+":
+            pos += 1
+        return low
+
+    def parse_alternation() -> str:
+        nonlocal pos
+        branches = [parse_sequence()]
+        while pos < len(pattern) and pattern[pos] == "|":
+            pos += 1
+            branches.append(parse_sequence())
+        return branches[0]
+
+    def parse_sequence() -> str:
+        out = []
+        while pos < len(pattern) and pattern[pos] not in "|)":
+            atom = parse_atom()
+            out.append(atom * parse_count())
+        return "".join(out)
+
+    try:
+        sample = parse_alternation()
+        if pos != len(pattern):
+            raise ValueError(f"unbalanced ) at {pos}")
+        return sample if re.fullmatch(pattern, sample) else None
+    except (re.error, ValueError, IndexError, StopIteration, RecursionError):
+        return None
+
+
+class ParamSynthesizer:
+    """
+    Minimal dummy parameters for read-only operations whose required members are
+    not in PERMISSION_REQUIRED_PARAMS, built from the botocore input shapes.
+
+    Templates keep the TEST_RESOURCE/ACCOUNT_ID/REGION placeholders and are
+    cached in a file tied to the botocore version, so each operation is
+    synthesized once per botocore release.
+    """
+
+    def __init__(self):
+        self.file_path = None
+        self.synthesized = 0
+        self._templates = None
+        self._session = None
+        self._models = {}
+        self._dirty = False
+
+    def configure(self, file_path: Optional[Path]) -> None:
+        """Set the cache file (None keeps synthesized templates in memory only)."""
+        self.file_path = file_path
+        self._templates = None
+
+    def _load(self) -> dict:
+        if self._templates is None:
+            self._templates = {}
+            if self.file_path:
+                try:
+                    data = json.loads(self.file_path.read_text())
+                    if (data.get("format") == SYNTH_FORMAT_VERSION
+                            and data.get("botocore_version") == botocore.__version__):
+                        self._templates = data["params"]
+                except (OSError, ValueError, KeyError):
+                    pass
+        return self._templates
+
+    def template(self, service: str, permission: str) -> dict:
+        """Return the synthesized parameter template for a permission ({} if none is needed)."""
+        if not is_readonly_permission(permission):
+            return {}
+        client_name = get_client_name(service, permission)
+        templates = self._load()
+        key = f"{client_name}.{permission}"
+        if key not in templates:
+            templates[key] = self._synthesize(client_name, service, permission)
+            self._dirty = True
+        if templates[key]:
+            self.synthesized += 1
+        return templates[key] or {}
+
+    def save(self) -> None:
+        """Write the cache back if new operations were synthesized."""
+        if not self._dirty or not self.file_path:
+            return
+        tmp_path = self.file_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "format": SYNTH_FORMAT_VERSION,
+            "botocore_version": botocore.__version__,
+            "params": self._templates,
+        }, indent=1, sort_keys=True))
+        tmp_path.replace(self.file_path)
+        self._dirty = False
+
+    def _synthesize(self, client_name: str, service: str, permission: str) -> Optional[dict]:
+        if client_name not in self._models:
+            if self._session is None:
+                self._session = MODEL_LOADER.botocore_session()
+            try:
+                self._models[client_name] = self._session.get_service_model(client_name)
+            except UnknownServiceError:
+                self._models[client_name] = None
+        model = self._models[client_name]
+        if model is None or permission not in model.operation_names:
+            return None
+        input_shape = model.operation_model(permission).input_shape
+        if input_shape is None or not input_shape.required_members:
+            return None
+        arn_service = model.metadata.get("signingName") or model.endpoint_prefix
+        test_resource = generate_test_resource_name(service, permission)
+        return self._value(input_shape, "", arn_service, test_resource, 0)
+
+    def _value(self, shape, member_name: str, arn_service: str, test_resource: str, depth: int) -> Any:
+        type_name = shape.type_name
+        if type_name == "structure":
+            if depth >= SYNTH_MAX_DEPTH:
+                return {}
+            return {
+                name: self._value(shape.members[name], name, arn_service, test_resource, depth + 1)
+                for name in shape.required_members
+            }
+        if type_name == "list":
+            item = self._value(shape.member, member_name, arn_service, test_resource, depth + 1)
+            return [item] * max(shape.metadata.get("min", 0), 1)
+        if type_name == "map":
+            return {}
+        if type_name == "string":
+            return self._string(shape, member_name, arn_service, test_resource)
+        if type_name in ("integer", "long"):
+            value = shape.metadata.get("min", 1)
+            return min(value, shape.metadata.get("max", value))
+        if type_name in ("float", "double"):
+            return float(shape.metadata.get("min", 1))
+        if type_name == "boolean":
+            return False
+        if type_name == "timestamp":
+            return SYNTH_TIMESTAMP
+        return "test"
+
+    @staticmethod
+    def _string(shape, member_name: str, arn_service: str, test_resource: str) -> str:
+        if shape.enum:
+            return shape.enum[0]
+        pattern = shape.metadata.get("pattern")
+        min_length = shape.metadata.get("min", 1)
+        max_length = shape.metadata.get("max")
+
+        candidates = []
+        if member_name.lower().rstrip("s").endswith("arn") or shape.name.lower().endswith("arn"):
+            candidates.append(f"arn:aws:{arn_service}:REGION:ACCOUNT_ID:TEST_RESOURCE")
+        candidates.append("TEST_RESOURCE")
+        if pattern:
+            sample = sample_from_pattern(pattern)
+            if sample:
+                candidates.append(sample)
+                candidates.append(sample + sample[-1] * (min_length - len(sample)))
+        if max_length:
+            candidates.append(test_resource[:max_length])
+
+        for candidate in candidates:
+            value = materialize_param(candidate, test_resource, FALLBACK_ACCOUNT_ID, "us-east-1")
+            if len(value) < min_length or (max_length and len(value) > max_length):
+                continue
+            try:
+                if pattern and not re.fullmatch(pattern, value):
+                    continue
+            except re.error:
+                pass
+            return candidate
+        return candidates[0]
+
+
+# Shared synthesizer; main() points it at the cache file in the output directory
+PARAM_SYNTHESIZER = ParamSynthesizer()
+
+
+def get_param_template(service: str, permission: str) -> dict:
+    """
+    Return the parameter mapping (with placeholders) for a permission, or {} if none.
+
+    Hand-maintained mappings win; otherwise required members are synthesized
+    from the botocore input shape and PERMISSION_DEFAULT_PARAMS are layered on top.
+    """
+    mapped = PERMISSION_REQUIRED_PARAMS.get((service, permission))
+    if mapped:
+        return mapped
+    defaults = PERMISSION_DEFAULT_PARAMS.get(permission) or {}
+    synthesized = PARAM_SYNTHESIZER.template(service, permission)
+    return {**synthesized, **defaults} if synthesized else defaults
+
+
+def compile_call_spec(service: str, permission: str, region: str, account_id: Optional[str] = None) -> CallSpec:
+    """Resolve client, method name and final parameters for a single permission."""
+    mapped_params = get_param_template(service, permission)
+
+    test_resource = generate_test_resource_name(service, permission)
+    params = {
+        key: materialize_param(value, test_resource, account_id or FALLBACK_ACCOUNT_ID, region)
+        for key, value in mapped_params.items()
+    }
+
+    return CallSpec(
+        service=service,
+        permission=permission,
+        region=region,
+        client_name=get_client_name(service, permission),
+        method_name=to_snake_case(permission),
+        params=MappingProxyType(params),
+    )
+
+
+def plan_layout(services_to_check: dict, regions: list) -> dict:
+    """
+    Decide which (service, permission, region) probes a run makes, grouped for output.
+
+    A single region is grouped by service name. With several regions each group
+    is "<service> (<region>)", and global permissions are probed only in the
+    first region under "<service> (global)".
+    Returns {group: [(service, permission, region), ...]}.
+    """
+    if len(regions) == 1:
+        return {
+            service: [(service, permission, regions[0]) for permission in permissions]
+            for service, permissions in services_to_check.items()
+        }
+
+    layout = {}
+    for service, permissions in services_to_check.items():
+        global_permissions = [p for p in permissions if is_global_permission(service, p)]
+        if global_permissions:
+            layout[f"{service} (global)"] = [(service, p, regions[0]) for p in global_permissions]
+        regional_permissions = [p for p in permissions if not is_global_permission(service, p)]
+        if regional_permissions:
+            for region in regions:
+                layout[f"{service} ({region})"] = [(service, p, region) for p in regional_permissions]
+    return layout
+
+
+def compile_plan(services_to_check: dict, regions: list, account_id: Optional[str] = None) -> dict:
+    """
+    Compile the permissions from the YAML into call specs, once, before validation.
+
+    Returns {group: [CallSpec, ...]} in YAML order (see plan_layout()).
+    """
+    return {
+        group: [compile_call_spec(service, permission, region, account_id) for service, permission, region in entries]
+        for group, entries in plan_layout(services_to_check, regions).items()
+    }
+
+
+def param_mappings_digest() -> str:
+    """Fingerprint of the parameter/client mapping tables a plan was compiled from."""
+    tables = (SERVICE_CLIENT_MAP, PERMISSION_CLIENT_OVERRIDE, PERMISSION_REQUIRED_PARAMS, PERMISSION_DEFAULT_PARAMS,
+              SYNTH_FORMAT_VERSION, botocore.__version__)
+    return hashlib.sha256(repr(tables).encode("utf-8")).hexdigest()[:16]
+
+
+def save_plan(plan: dict, file_path: Path, account_id: Optional[str]) -> None:
+    """Write a compiled plan to JSON so later runs can skip compilation."""
+    data = {
+        "format": PLAN_FORMAT_VERSION,
+        "mappings": param_mappings_digest(),
+        "account_id": account_id,
+        "services": {
+            service: [{**spec._asdict(), "params": dict(spec.params)} for spec in specs]
+            for service, specs in plan.items()
+        },
+    }
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def load_plan(file_path: Path) -> tuple[dict, Optional[str]]:
+    """Load a plan written by save_plan(). Returns (plan, account_id)."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("format") != PLAN_FORMAT_VERSION:
+        raise ValueError(f"Unsupported plan format: {data.get('format')}")
+    if data.get("mappings") != param_mappings_digest():
+        raise ValueError("Plan was compiled from different parameter mappings")
+
+    plan = {
+        service: [CallSpec(**{**spec, "params": MappingProxyType(spec["params"])}) for spec in specs]
+        for service, specs in data["services"].items()
+    }
+    # The file may be stale or edited: each spec must call the operation its permission names
+    for specs in plan.values():
+        for spec in specs:
+            if (spec.method_name != to_snake_case(spec.permission)
+                    or spec.client_name != get_client_name(spec.service, spec.permission)):
+                raise ValueError(f"Spec for {spec.service}:{spec.permission} calls "
+                                 f"{spec.client_name}.{spec.method_name}")
+    return plan, data.get("account_id")
+
+
+def prepare_plan(services_to_check: dict, regions: list, account_id: Optional[str],
+                 plan_file: Optional[Path] = None) -> dict:
+    """
+    Return the compiled plan for this run.
+
+    Reuses plan_file when it matches the account, regions and permission lists;
+    otherwise compiles a fresh plan and writes it back to plan_file (if given).
+    """
+    if plan_file and plan_file.exists():
+        try:
+            saved_plan, saved_account_id = load_plan(plan_file)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"WARNING: Could not load plan {plan_file}: {e}")
+        else:
+            saved_layout = {
+                group: [(spec.service, spec.permission, spec.region) for spec in specs]
+                for group, specs in saved_plan.items()
+            }
+            if saved_account_id == account_id and saved_layout == plan_layout(services_to_check, regions):
+                print(f"Loaded plan from: {plan_file}")
+                return saved_plan
+            print(f"Plan {plan_file} does not match this account/regions/permissions - recompiling")
+
+    plan = compile_plan(services_to_check, regions, account_id)
+    if plan_file:
+        save_plan(plan, plan_file, account_id)
+        print(f"Plan saved to: {plan_file}")
+    return plan
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """argparse type for --shard i/N (1-based)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, e.g. 2/4, not {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, not {index}")
+    return index, count
+
+
+def shard_permissions(services_to_check: dict, index: int, count: int) -> tuple[dict, dict]:
+    """
+    Deterministic, service-balanced slice of the permissions for shard index of count.
+
+    Services stay whole where possible, so each one is rate limited by a single
+    process; a service larger than an even share is cut into share-sized chunks.
+    Chunks go largest first to the least loaded shard (ties to the lowest), so
+    every shard computes the same assignment from the same list. Returns
+    (permissions, positions) where positions maps each service in the shard to
+    (service index, first chunk index) in the full list, for merge ordering.
+    """
+    total = sum(len(permissions or []) for permissions in services_to_check.values())
+    share = max(1, -(-total // count))
+    chunks = []
+    for service_index, (service, permissions) in enumerate(services_to_check.items()):
+        permissions = permissions or []
+        for chunk_index, start in enumerate(range(0, max(1, len(permissions)), share)):
+            chunks.append((service_index, chunk_index, service, permissions[start:start + share]))
+
+    loads = [(0, shard) for shard in range(count)]
+    assigned = []
+    for chunk in sorted(chunks, key=lambda c: (-len(c[3]), c[0], c[1])):
+        load, shard = heapq.heappop(loads)
+        if shard == index - 1:
+            assigned.append(chunk)
+        heapq.heappush(loads, (load + len(chunk[3]), shard))
+
+    permissions, positions = {}, {}
+    for service_index, chunk_index, service, chunk in sorted(assigned, key=lambda c: (c[0], c[1])):
+        permissions.setdefault(service, []).extend(chunk)
+        positions.setdefault(service, (service_index, chunk_index))
+    return permissions, positions
+
+
+def permissions_digest(services_to_check: dict) -> str:
+    """Fingerprint of a permissions list, so merge only combines shards of the same list."""
+    return hashlib.sha256(json.dumps(services_to_check, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ModelLoader:
+    """
+    One botocore data loader shared by every session the validator creates.
+
+    Service models are parsed once per process, however many profiles and
+    assumed-role sessions use them. With a cache directory (--model-cache)
+    every JSON file parsed is also kept in marshal form, which loads several
+    times faster than json.loads. Counts files and load time for --timings.
+    This object is the loader's file_loader (exists/load_file, as in
+    botocore.loaders.JSONFileLoader).
+    """
+
+    def __init__(self):
+        self.cache_dir = None
+        self.files_loaded = 0
+        self.cache_hits = 0
+        self.load_seconds = 0.0
+        self._loader = None
+        self._lock = threading.Lock()
+
+    def configure(self, cache_dir: Optional[Path]) -> None:
+        """Enable the marshal cache in cache_dir (None disables it)."""
+        self.cache_dir = cache_dir
+        if cache_dir:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def botocore_session(self):
+        """Return a new botocore session that uses the shared data loader."""
+        import botocore.loaders
+        import botocore.session
+
+        with self._lock:
+            if self._loader is None:
+                # Built from AWS_DATA_PATH directly: asking a session would resolve its profile
+                self._loader = botocore.loaders.create_loader(os.environ.get("AWS_DATA_PATH"))
+                self._loader.file_loader = self
+        session = botocore.session.get_session()
+        session.register_component("data_loader", self._loader)
+        return session
+
+    def boto3_session(self, botocore_session=None, **kwargs):
+        """Return a new boto3 Session (same arguments) that uses the shared data loader."""
+        import boto3
+
+        return boto3.Session(botocore_session=botocore_session or self.botocore_session(), **kwargs)
+
+    def exists(self, file_path: str) -> bool:
+        return any(os.path.isfile(file_path + ext) for ext in MODEL_FILE_EXTENSIONS)
+
+    def load_file(self, file_path: str) -> Optional[dict]:
+        for ext in MODEL_FILE_EXTENSIONS:
+            source = file_path + ext
+            try:
+                mtime = os.stat(source).st_mtime_ns
+            except OSError:
+                continue
+            start = time.perf_counter()
+            cache_path = None
+            data = None
+            if self.cache_dir:
+                # marshal data is tied to the Python version; the mtime covers botocore upgrades
+                key = f"{source}:{mtime}:{sys.version_info[0]}.{sys.version_info[1]}"
+                cache_path = self.cache_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.marshal"
+                try:
+                    with open(cache_path, "rb") as f:
+                        data = marshal.loads(f.read())
+                except (OSError, EOFError, ValueError, TypeError):
+                    data = None
+            hit = data is not None
+            if data is None:
+                with (gzip.open if ext.endswith(".gz") else open)(source, "rb") as f:
+                    data = json.loads(f.read().decode("utf-8"))
+                if cache_path:
+                    tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+                    with open(tmp_path, "wb") as f:
+                        f.write(marshal.dumps(data))
+                    tmp_path.replace(cache_path)
+            with self._lock:
+                self.files_loaded += 1
+                self.cache_hits += hit
+                self.load_seconds += time.perf_counter() - start
+            return data
+        return None
+
+
+# Shared loader; main() enables the marshal cache with --model-cache
+MODEL_LOADER = ModelLoader()
+
+
+class CallMetrics:
+    """
+    Latency, HTTP attempts and bytes received per probe, recorded by botocore
+    event hooks (before-parameter-build / needs-retry / after-call) on every
+    registry client, so latency includes request serialization and signing.
+
+    Calls are attributed to the probe running on the same thread: wrap the
+    probe's API calls in start() / finish(result), which adds the totals to
+    the result. Calls made outside a probe (identity, CloudTrail) are ignored.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def register(self, client) -> None:
+        events = client.meta.events
+        events.register("before-parameter-build", self._before_parameter_build)
+        events.register("needs-retry", self._needs_retry)
+        events.register("after-call", self._after_call)
+
+    def start(self) -> None:
+        self._local.probe = {"latency": 0.0, "calls": 0, "attempts": 0, "bytes": 0}
+
+    def finish(self, result: dict) -> None:
+        """Stop recording for this thread and add latency/attempts/bytes to result."""
+        probe = getattr(self._local, "probe", None)
+        self._local.probe = None
+        if probe and probe["calls"]:
+            result["latency"] = probe["latency"]
+            result["attempts"] = max(probe["attempts"], probe["calls"])
+            result["bytes"] = probe["bytes"]
+
+    def _before_parameter_build(self, context: dict, **kwargs) -> None:
+        context["perf_start"] = time.perf_counter()
+
+    def _needs_retry(self, **kwargs) -> None:
+        probe = getattr(self._local, "probe", None)
+        if probe is not None:
+            probe["attempts"] += 1
+
+    def _after_call(self, http_response, context: dict, **kwargs) -> None:
+        probe = getattr(self._local, "probe", None)
+        start = context.get("perf_start")
+        if probe is None or start is None:
+            return
+        probe["latency"] += time.perf_counter() - start
+        probe["calls"] += 1
+        size = http_response.headers.get("content-length")
+        if size is None:
+            try:
+                size = len(http_response.content or b"")
+            except (AttributeError, TypeError):
+                size = 0
+        probe["bytes"] += int(size)
+
+
+class ClientRegistry:
+    """
+    Thread-safe cache of boto3 clients keyed by (client_name, region, profile).
+
+    Clients are created once per key and reused for the whole run, so service
+    model loading, endpoint resolution and TLS handshakes happen once per client
+    instead of once per permission. Clients share a botocore Config (connection
+    pool size, TCP keep-alive). Probe clients, whose calls go through
+    RateLimiter, make a single attempt per call so every throttle reaches the
+    limiter; support clients (STS, IAM simulation, ...) keep botocore's standard
+    retries. Also counts clients created and API calls made through them.
+    """
+
+    def __init__(self, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS, tcp_keepalive: bool = True):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._clients = {}
+        self.configure(max_pool_connections, tcp_keepalive)
+        self.clients_created = 0
+        self.api_calls = 0
+
+    def register_session(self, key: str, session) -> None:
+        """Build clients requested with profile=key from an existing session (e.g. assumed-role credentials)."""
+        with self._lock:
+            self._sessions[key] = session
+
+    def configure(self, max_pool_connections: int, tcp_keepalive: bool) -> None:
+        """Set the botocore Configs used for clients created from now on."""
+        self.config_options = {
+            "max_pool_connections": max_pool_connections,
+            "tcp_keepalive": tcp_keepalive,
+        }
+        self.configs = {}
+
+    def _config(self, probe: bool):
+        """Return the botocore Config for probe or support clients (hold the lock)."""
+        config = self.configs.get(probe)
+        if config is None:
+            from botocore.config import Config
+            # Probe retries are owned by RateLimiter so throttling is visible to it
+            retries = {"mode": "standard", "total_max_attempts": 1} if probe else {"mode": "standard"}
+            config = self.configs[probe] = Config(**self.config_options, retries=retries)
+        return config
+
+    def get(self, client_name: str, region: str, profile: Optional[str] = None, probe: bool = False):
+        """Return the cached client for this key, creating it on first use (probe: calls go through RateLimiter)."""
+        if profile == "default":
+            profile = None
+        key = (client_name, region, profile, probe)
+
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                session = self._session(profile)
+                client = session.client(client_name, region_name=region, config=self._config(probe))
+                client.meta.events.register("before-parameter-build", self._count_call)
+                CALL_METRICS.register(client)
+                self._clients[key] = client
+                self.clients_created += 1
+        return client
+
+    def _session(self, profile: Optional[str]):
+        """Return the session for a profile/session key, creating it on first use (hold the lock)."""
+        session = self._sessions.get(profile)
+        if session is None:
+            session = MODEL_LOADER.boto3_session(profile_name=profile)
+            self._sessions[profile] = session
+        return session
+
+    def access_key(self, profile: Optional[str] = None) -> Optional[str]:
+        """Access key ID of the credentials behind a profile/session key, or None if unresolvable."""
+        if profile == "default":
+            profile = None
+        try:
+            with self._lock:
+                session = self._session(profile)
+            credentials = session.get_credentials()
+        except BotoCoreError:
+            return None
+        return credentials.access_key if credentials else None
+
+    def _count_call(self, **kwargs) -> None:
+        with self._lock:
+            self.api_calls += 1
+
+    def stats(self) -> dict:
+        """Return client creation and API call counters."""
+        with self._lock:
+            return {"clients_created": self.clients_created, "api_calls": self.api_calls}
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to throttling.
+
+    The rate halves on every throttle (down to min_rate) and climbs back by
+    RATE_RECOVERY_STEP per successful call (up to max_rate).
+    """
+
+    def __init__(self, max_rate: float, min_rate: float = MIN_RATE_PER_SERVICE):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max_rate
+        self.tokens = max(1.0, max_rate)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is available. Returns seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + RATE_RECOVERY_STEP)
+
+
+class RateLimiter:
+    """
+    Per-(service, region) adaptive rate limiting with a retry policy for throttled calls.
+
+    Owns retries for validation probes (clients are created with botocore retries
+    off) so every throttle is seen, slows its service down, and is counted.
+    A rate of 0 disables limiting but keeps the retry policy.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE_PER_SERVICE, max_retries: int = MAX_RETRIES):
+        self.configure(rate, max_retries)
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    def configure(self, rate: float, max_retries: int) -> None:
+        self.rate = rate
+        self.max_retries = max_retries
+
+    def _bucket(self, key: tuple) -> Optional[TokenBucket]:
+        if self.rate <= 0:
+            return None
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                rate = min(self.rate, SERVICE_RATE_LIMITS.get(key[0], self.rate))
+                bucket = self._buckets.setdefault(key, TokenBucket(rate))
+        return bucket
+
+    def _record(self, service: str, throttled: bool, delay: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(service, {"throttles": 0, "retries": 0, "retry_delay": 0.0})
+            stats["throttles"] += int(throttled)
+            stats["retries"] += 1
+            stats["retry_delay"] += delay
+
+    def call(self, spec: CallSpec, method, result: dict) -> Any:
+        """
+        Call method(**spec.params) under the (service, region) rate limit.
+
+        Throttled and transient errors are retried with exponential backoff and
+        full jitter; retries and time spent backing off are recorded on result.
+        """
+        bucket = self._bucket((spec.service, spec.region))
+        attempt = 0
+        while True:
+            if bucket:
+                bucket.acquire()
+            try:
+                response = method(**spec.params)
+            except ClientError as e:
+                error_code = e.response.get("Error", {}).get("Code", "Unknown")
+                throttled = error_code in THROTTLING_ERROR_CODES
+                if not throttled and bucket:
+                    bucket.on_success()
+                if attempt >= self.max_retries or not (throttled or error_code in TRANSIENT_ERROR_CODES):
+                    raise
+                if throttled and bucket:
+                    bucket.on_throttle()
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                self._record(spec.service, throttled, delay)
+                result["retries"] = result.get("retries", 0) + 1
+                result["throttles"] = result.get("throttles", 0) + int(throttled)
+                result["retry_delay"] = result.get("retry_delay", 0.0) + delay
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if bucket:
+                bucket.on_success()
+            return response
+
+    def stats(self) -> dict:
+        """Return {service: {"throttles", "retries", "retry_delay", "rate"}} for services that retried."""
+        with self._lock:
+            stats = {service: dict(values) for service, values in self._stats.items()}
+            for (service, region), bucket in self._buckets.items():
+                if service in stats:
+                    stats[service]["rate"] = min(bucket.rate, stats[service].get("rate", bucket.rate))
+        return stats
+
+
+# Shared rate limiter for validation probes
+RATE_LIMITER = RateLimiter()
+
+# Shared per-call instrumentation (hooks are added to every registry client)
+CALL_METRICS = CallMetrics()
+
+# Shared client registry for the whole run
+CLIENT_REGISTRY = ClientRegistry()
+
+
+def get_boto3_client(service: str, region: str, profile: Optional[str] = None, probe: bool = False):
+    """Get a (cached) boto3 client for the specified service (see ClientRegistry.get)."""
     client_name = SERVICE_CLIENT_MAP.get(service, service)
-    if profile and profile != "default":
-        session = boto3.Session(profile_name=profile)
-        return session.client(client_name, region_name=region)
-    return boto3.client(client_name, region_name=region)
+    return CLIENT_REGISTRY.get(client_name, region, profile, probe)
 
 
 def extract_meaningful_data(service: str, permission: str, response: Any) -> dict:
@@ -348,130 +1486,47 @@ def extract_meaningful_data(service: str, permission: str, response: Any) -> dic
     return data
 
 
-def validate_permission(service: str, permission: str, region: str, profile: Optional[str] = None) -> dict:
+def run_call_spec(spec: CallSpec, profile: Optional[str] = None) -> dict:
     """
-    Validate a single permission by attempting to call the corresponding API.
+    Validate a single permission by making the API call described by a compiled spec.
     Uses test resource names for resource-specific calls.
     A "not found" error proves the permission exists.
     """
+    service = spec.service
+    permission = spec.permission
     result = {
         "service": service,
         "permission": permission,
+        "region": spec.region,
         "status": "UNKNOWN",
         "message": "",
         "error_code": None,
         "data": {"count": 0, "sample": None, "details": ""},
     }
 
-    # Safety check: only test read-only permissions
-    if not is_readonly_permission(permission):
+    # Safety check: only test read-only permissions, and only call the operation they name
+    if not is_readonly_permission(permission) or spec.method_name != to_snake_case(permission):
         result["status"] = "SKIPPED"
         result["message"] = "Not a read-only permission (safety check)"
         return result
 
-    test_resource = generate_test_resource_name(service, permission)
-
     try:
-        # Check if this permission uses a different client
-        client_service = PERMISSION_CLIENT_OVERRIDE.get((service, permission), service)
-        client = get_boto3_client(client_service, region, profile)
-        method_name = to_snake_case(permission)
+        client = CLIENT_REGISTRY.get(spec.client_name, spec.region, profile, probe=True)
+        method = getattr(client, spec.method_name, None)
 
         # Check if method exists
-        if not hasattr(client, method_name):
+        if method is None:
             result["status"] = "ERROR"
-            result["message"] = f"Method '{method_name}' not found on {service} client"
+            result["message"] = f"Method '{spec.method_name}' not found on {service} client"
             return result
 
-        method = getattr(client, method_name)
-        response = None
-
-        # Build parameters from mapping if available
-        param_key = (service, permission)
-        mapped_params = PERMISSION_REQUIRED_PARAMS.get(param_key)
-
-        # Call the method with appropriate parameters
+        # Call the method with its compiled parameters (rate limited, throttles retried)
         try:
-            # First check if we have mapped parameters for this permission
-            if mapped_params:
-                # Get account ID for ACCOUNT_ID placeholder if needed
-                account_id = None
-                if any(v == "ACCOUNT_ID" or (isinstance(v, str) and "ACCOUNT_ID" in v) for v in mapped_params.values()):
-                    sts_client = get_boto3_client("sts", region, profile)
-                    account_id = sts_client.get_caller_identity().get("Account", "000000000000")
-
-                # Replace placeholders with actual values
-                params = {}
-                for key, value in mapped_params.items():
-                    if value == "TEST_RESOURCE":
-                        params[key] = test_resource
-                    elif value == "ACCOUNT_ID":
-                        params[key] = account_id
-                    elif isinstance(value, str) and "TEST_RESOURCE" in value:
-                        params[key] = value.replace("TEST_RESOURCE", test_resource)
-                    elif isinstance(value, str) and "ACCOUNT_ID" in value:
-                        params[key] = value.replace("ACCOUNT_ID", account_id)
-                    else:
-                        params[key] = value
-                response = method(**params)
-
-            # Permissions that work without parameters
-            elif permission == "GetCallerIdentity":
-                response = method()
-            elif permission == "GetUser":
-                response = method()
-
-            # S3 bucket permissions - use test bucket name
-            elif permission in ("GetBucketLocation", "GetBucketVersioning", "GetBucketTagging"):
-                response = method(Bucket=test_resource)
-
-            # Lambda
-            elif permission == "GetFunction":
-                response = method(FunctionName=test_resource)
-
-            # Secrets Manager
-            elif permission == "DescribeSecret":
-                response = method(SecretId=test_resource)
-
-            # KMS
-            elif permission == "DescribeKey":
-                response = method(KeyId=test_resource)
-
-            # DynamoDB
-            elif permission == "DescribeTable":
-                response = method(TableName=test_resource)
-
-            # SQS - needs a URL format
-            elif permission == "GetQueueAttributes":
-                # SQS queue URL format
-                sts_client = get_boto3_client("sts", region, profile)
-                account_id = sts_client.get_caller_identity().get("Account", "000000000000")
-                test_queue_url = f"https://sqs.{region}.amazonaws.com/{account_id}/{test_resource}"
-                response = method(QueueUrl=test_queue_url, AttributeNames=["All"])
-
-            # CloudTrail
-            elif permission == "GetTrailStatus":
-                response = method(Name=test_resource)
-
-            # IAM
-            elif permission == "GetRole":
-                response = method(RoleName=test_resource)
-
-            # CloudWatch Logs
-            elif permission == "DescribeLogStreams":
-                response = method(logGroupName=test_resource, limit=1)
-
-            # Glue
-            elif permission == "GetTables":
-                response = method(DatabaseName=test_resource)
-
-            # Permissions with special parameters
-            elif permission == "DescribeSnapshots":
-                response = method(OwnerIds=["self"])
-            elif permission == "DescribeImages":
-                response = method(Owners=["self"])
-            else:
-                response = method()
+            CALL_METRICS.start()
+            try:
+                response = RATE_LIMITER.call(spec, method, result)
+            finally:
+                CALL_METRICS.finish(result)
 
             result["status"] = "PASSED"
             result["message"] = "Permission validated successfully"
@@ -536,237 +1591,1931 @@ def validate_permission(service: str, permission: str, region: str, profile: Opt
     return result
 
 
-def query_cloudtrail(service: str, permission: str, region: str, profile: Optional[str], minutes_back: int = 60) -> Optional[dict]:
-    """Query CloudTrail for recent events related to the permission."""
-    try:
-        client = get_boto3_client("cloudtrail", region, profile)
+def validate_permission(service: str, permission: str, region: str, profile: Optional[str] = None) -> dict:
+    """
+    Validate a single permission by attempting to call the corresponding API.
 
-        end_time = datetime.now(timezone.utc)
-        start_time = end_time - timedelta(minutes=minutes_back)
-
-        response = client.lookup_events(
-            LookupAttributes=[
-                {"AttributeKey": "EventName", "AttributeValue": permission}
-            ],
-            StartTime=start_time,
-            EndTime=end_time,
-            MaxResults=5,
-        )
+    Compiles a one-off call spec; bulk runs should use compile_plan() so the
+    caller identity is resolved once rather than per permission.
+    """
+    account_id = None
+    if "ACCOUNT_ID" in json.dumps(get_param_template(service, permission)):
+        account_id = get_caller_identity(region, profile).get("account")
+    return run_call_spec(compile_call_spec(service, permission, region, account_id), profile)
 
-        events = response.get("Events", [])
 
-        if not events:
-            return {"message": "No recent events", "count": 0}
+def get_iam_action(service: str, permission: str) -> Optional[str]:
+    """Return the IAM action that authorizes a permission, or None if none is needed."""
+    if (service, permission) in IAM_ACTION_OVERRIDE:
+        return IAM_ACTION_OVERRIDE[(service, permission)]
+    return SERVICE_IAM_ACTION.get(service, f"{service}:{permission}")
 
-        latest = events[0]
-        return {
-            "event_name": latest.get("EventName"),
-            "event_time": str(latest.get("EventTime")),
-            "username": latest.get("Username"),
-            "error_code": latest.get("ErrorCode"),
-            "count": len(events),
-            "message": f"{len(events)} events in last {minutes_back}min"
-        }
 
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code", "Unknown")
-        if error_code in ("AccessDenied", "AccessDeniedException"):
-            return {"error": "Access denied to CloudTrail", "count": 0}
-        return {"error": str(e)[:50], "count": 0}
-    except Exception as e:
-        return {"error": str(e)[:50], "count": 0}
+def resolve_principal_arn(identity: dict, region: str, profile: Optional[str] = None) -> str:
+    """
+    Turn the caller identity ARN into a principal ARN SimulatePrincipalPolicy accepts.
 
+    Roles assumed with --assume-roles use the ARN they were assumed by. Other
+    assumed-role session ARNs are mapped back to the IAM role, looking up the
+    role's real ARN (SSO roles live under a path) and falling back to the
+    path-less form if iam:GetRole is not allowed.
+    """
+    if identity.get("role_arn"):
+        return identity["role_arn"]
+    arn = identity.get("arn", "")
+    if ":assumed-role/" not in arn:
+        return arn
 
-def get_caller_identity(region: str, profile: Optional[str] = None) -> dict:
-    """Get the current AWS caller identity."""
+    role_name = arn.split(":assumed-role/")[-1].split("/")[0]
     try:
-        client = get_boto3_client("sts", region, profile)
-        identity = client.get_caller_identity()
-        return {
-            "account": identity.get("Account"),
-            "arn": identity.get("Arn"),
-            "user_id": identity.get("UserId"),
-        }
-    except Exception as e:
-        return {"error": str(e)}
+        return get_boto3_client("iam", region, profile).get_role(RoleName=role_name)["Role"]["Arn"]
+    except ClientError:
+        return f"arn:aws:iam::{identity.get('account')}:role/{role_name}"
 
 
-def generate_report(results: list, identity: dict, config: dict, output_dir: Path) -> Path:
-    """Generate a markdown report with matrix view."""
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    output_file = output_dir / f"validation-report-{timestamp}.md"
-
-    # Count results by status
-    passed = sum(1 for r in results if r["status"] == "PASSED")
-    denied = sum(1 for r in results if r["status"] == "DENIED")
-    skipped = sum(1 for r in results if r["status"] == "SKIPPED")
-    not_tested = sum(1 for r in results if r["status"] == "NOT_TESTED")
-    errors = sum(1 for r in results if r["status"] == "ERROR")
-    total = len(results)
-
-    # Group by service
-    services = {}
-    for r in results:
-        if r["service"] not in services:
-            services[r["service"]] = []
-        services[r["service"]].append(r)
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("# AWS Permissions Validation Report\n\n")
-        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-
-        # Configuration & Identity section (combined)
-        f.write("## Configuration\n\n")
-        f.write(f"| Setting | Value |\n")
-        f.write(f"|---------|-------|\n")
-        f.write(f"| Region | {config.get('region', 'us-east-1')} |\n")
-        f.write(f"| Profile | {config.get('profile', 'default')} |\n")
-        if config.get('description'):
-            f.write(f"| Description | {config.get('description')} |\n")
-        f.write(f"\n")
-
-        # Identity section - shows actual user/role from credentials
-        f.write("## AWS Identity (Detected)\n\n")
-        if "error" in identity:
-            f.write(f"Error getting identity: {identity['error']}\n\n")
-        else:
-            # Parse ARN to determine if it's a user or role
-            arn = identity.get('arn', '')
-            if ':user/' in arn:
-                identity_type = "IAM User"
-                identity_name = arn.split(':user/')[-1]
-            elif ':assumed-role/' in arn:
-                identity_type = "Assumed Role"
-                identity_name = arn.split(':assumed-role/')[-1].split('/')[0]
-            elif ':role/' in arn:
-                identity_type = "IAM Role"
-                identity_name = arn.split(':role/')[-1]
-            else:
-                identity_type = "Unknown"
-                identity_name = arn
-
-            f.write(f"| Property | Value |\n")
-            f.write(f"|----------|-------|\n")
-            f.write(f"| Account | {identity.get('account')} |\n")
-            f.write(f"| Identity Type | {identity_type} |\n")
-            f.write(f"| Identity Name | {identity_name} |\n")
-            f.write(f"| Full ARN | {arn} |\n")
-            f.write(f"| User ID | {identity.get('user_id')} |\n\n")
-
-        # Summary section
-        f.write("## Summary\n\n")
-        f.write(f"| Status | Count | Percentage |\n")
-        f.write(f"|--------|-------|------------|\n")
-        f.write(f"| PASSED | {passed} | {passed*100//total if total else 0}% |\n")
-        f.write(f"| DENIED | {denied} | {denied*100//total if total else 0}% |\n")
-        f.write(f"| NOT_TESTED | {not_tested} | {not_tested*100//total if total else 0}% |\n")
-        f.write(f"| SKIPPED | {skipped} | {skipped*100//total if total else 0}% |\n")
-        f.write(f"| ERROR | {errors} | {errors*100//total if total else 0}% |\n")
-        f.write(f"| **Total** | **{total}** | **100%** |\n\n")
-
-        # Service Matrix
-        f.write("## Service Permission Matrix\n\n")
-        f.write("| Service | Total | Passed | Denied | NotTested | Skipped | Error | Status |\n")
-        f.write("|---------|-------|--------|--------|-----------|---------|-------|--------|\n")
-
-        for svc_name in sorted(services.keys()):
-            svc_results = services[svc_name]
-            svc_passed = sum(1 for r in svc_results if r["status"] == "PASSED")
-            svc_denied = sum(1 for r in svc_results if r["status"] == "DENIED")
-            svc_not_tested = sum(1 for r in svc_results if r["status"] == "NOT_TESTED")
-            svc_skipped = sum(1 for r in svc_results if r["status"] == "SKIPPED")
-            svc_errors = sum(1 for r in svc_results if r["status"] == "ERROR")
-            svc_total = len(svc_results)
-
-            if svc_denied > 0:
-                status = "ISSUES"
-            elif svc_errors > 0:
-                status = "ERRORS"
-            elif svc_not_tested > 0:
-                status = "PARTIAL"
-            elif svc_passed == svc_total - svc_skipped:
-                status = "OK"
-            else:
-                status = "PARTIAL"
+def simulate_actions(actions: list, principal_arn: str, region: str, profile: Optional[str] = None,
+                     batch_size: int = SIMULATE_BATCH_SIZE) -> tuple[dict, int]:
+    """
+    Evaluate IAM actions for a principal with iam:SimulatePrincipalPolicy.
 
-            f.write(f"| {svc_name} | {svc_total} | {svc_passed} | {svc_denied} | {svc_not_tested} | {svc_skipped} | {svc_errors} | {status} |\n")
+    Sends the actions in batches of batch_size and follows pagination within
+    each batch. Returns ({action: evaluation_result}, number_of_api_calls).
+    """
+    client = get_boto3_client("iam", region, profile)
+    paginator = client.get_paginator("simulate_principal_policy")
+    evaluations = {}
+    calls = 0
 
-        f.write("\n")
+    for i in range(0, len(actions), batch_size):
+        batch = actions[i:i + batch_size]
+        for page in paginator.paginate(PolicySourceArn=principal_arn, ActionNames=batch):
+            calls += 1
+            for evaluation in page.get("EvaluationResults", []):
+                evaluations[evaluation["EvalActionName"]] = evaluation
 
-        # Denied permissions (most important)
-        if denied > 0:
-            f.write("## Denied Permissions\n\n")
-            f.write("These permissions were denied and may need to be added to your role/policy.\n\n")
-            f.write("| Service | Permission | Error Code | CloudTrail |\n")
-            f.write("|---------|------------|------------|------------|\n")
+    return evaluations, calls
 
-            for r in results:
-                if r["status"] == "DENIED":
-                    ct = r.get("cloudtrail", {})
-                    ct_info = ct.get("message", ct.get("error", "N/A"))
-                    f.write(f"| {r['service']} | {r['permission']} | {r.get('error_code', 'N/A')} | {ct_info} |\n")
-            f.write("\n")
 
-        # Not Tested section (needs parameter mapping)
-        if not_tested > 0:
-            f.write("## Not Tested (Needs Parameter Mapping)\n\n")
-            f.write("These permissions require parameters but don't have mappings. Add to PERMISSION_REQUIRED_PARAMS.\n\n")
-            f.write("| Service | Permission | Reason |\n")
-            f.write("|---------|------------|--------|\n")
-            for r in results:
-                if r["status"] == "NOT_TESTED":
-                    f.write(f"| {r['service']} | {r['permission']} | {r['message'][:80]} |\n")
-            f.write("\n")
+def simulation_result(spec: CallSpec, action: Optional[str], evaluations: dict, error: Optional[str] = None) -> dict:
+    """Map a SimulatePrincipalPolicy decision onto the standard result schema."""
+    result = {
+        "service": spec.service,
+        "permission": spec.permission,
+        "region": spec.region,
+        "status": "UNKNOWN",
+        "message": "",
+        "error_code": None,
+        "data": {"count": 0, "sample": None, "details": ""},
+    }
 
-        # Errors section
-        if errors > 0:
-            f.write("## Errors\n\n")
-            f.write("| Service | Permission | Error |\n")
-            f.write("|---------|------------|-------|\n")
-            for r in results:
-                if r["status"] == "ERROR":
-                    f.write(f"| {r['service']} | {r['permission']} | {r['message'][:60]} |\n")
-            f.write("\n")
+    if not is_readonly_permission(spec.permission):
+        result["status"] = "SKIPPED"
+        result["message"] = "Not a read-only permission (safety check)"
+        return result
 
-        # Detailed Results with Data
-        f.write("## Detailed Results\n\n")
-        f.write("| Service | Permission | Status | Details |\n")
-        f.write("|---------|------------|--------|--------|\n")
-
-        for r in results:
-            status_icon = {"PASSED": "OK", "DENIED": "DENIED", "NOT_TESTED": "N/T", "SKIPPED": "SKIP", "ERROR": "ERR"}.get(r["status"], "?")
-            data = r.get("data", {})
-            if r["status"] == "PASSED":
-                details = data.get("details", "")
-                if data.get("sample"):
-                    details = f"{details} ({data.get('sample')})" if details else data.get("sample")
-            elif r["status"] == "SKIPPED":
-                details = r.get("message", "")[:100]
-            else:
-                details = r.get("message", "")[:100]
-            f.write(f"| {r['service']} | {r['permission']} | {status_icon} | {details} |\n")
+    if action is None:
+        result["status"] = "PASSED"
+        result["message"] = "No IAM permission required"
+        result["data"]["details"] = "No IAM permission required"
+        return result
 
-        f.write("\n")
+    if error:
+        result["status"] = "ERROR"
+        result["message"] = error
+        result["error_code"] = "SimulationFailed"
+        return result
 
-    return output_file
+    evaluation = evaluations.get(action)
+    if evaluation is None:
+        result["status"] = "ERROR"
+        result["message"] = f"No simulation result for {action}"
+        result["error_code"] = "NoEvaluationResult"
+        return result
 
+    decision = evaluation.get("EvalDecision")
+    statements = [s.get("SourcePolicyId", "?") for s in evaluation.get("MatchedStatements", [])]
+    if decision == "allowed":
+        result["status"] = "PASSED"
+        result["message"] = f"{action} allowed by policy simulation"
+        result["data"]["count"] = len(statements)
+        result["data"]["details"] = f"Allowed by {', '.join(statements)}" if statements else "Allowed"
+    else:
+        result["status"] = "DENIED"
+        result["message"] = f"{action}: {decision}" + (f" by {', '.join(statements)}" if statements else "")
+        result["error_code"] = decision
+    return result
 
-def load_config(file_path: Path) -> tuple[dict, dict]:
-    """Load config and permissions from YAML file."""
-    with open(file_path, "r") as f:
-        data = yaml.safe_load(f)
 
-    config = data.get("config", {})
-    permissions = data.get("permissions", data)  # Fallback for old format
+def simulate_services(plan: dict, identity: dict, region: str, profile: Optional[str] = None,
+                      batch_size: int = SIMULATE_BATCH_SIZE, on_result=None) -> list:
+    """
+    Validate a compiled plan with batched policy simulation instead of live API calls.
 
-    # Remove config from permissions if it exists
-    if "config" in permissions:
-        del permissions["config"]
+    Prints and returns results in YAML order, like validate_services() (including
+    the on_result streaming behaviour).
+    """
+    actions_by_permission = {
+        (spec.service, spec.permission): get_iam_action(spec.service, spec.permission)
+        for specs in plan.values() for spec in specs
+        if is_readonly_permission(spec.permission)
+    }
+    actions = list(dict.fromkeys(a for a in actions_by_permission.values() if a))
 
-    return config, permissions
+    error = None
+    evaluations = {}
+    try:
+        principal_arn = resolve_principal_arn(identity, region, profile)
+        print(f"Simulating {len(actions)} IAM actions for {principal_arn}...")
+        evaluations, calls = simulate_actions(actions, principal_arn, region, profile, batch_size)
+        print(f"Used {calls} SimulatePrincipalPolicy call(s)")
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code", "Unknown")
+        error = f"{error_code}: {e.response.get('Error', {}).get('Message', str(e))}"[:100]
+    except Exception as e:
+        error = str(e)[:100]
+    if error:
+        print(f"WARNING: Policy simulation failed: {error}")
+    print()
+
+    results = []
+    for group, specs in plan.items():
+        print(f"[{group}]")
+        for spec in specs:
+            result = simulation_result(spec, actions_by_permission.get((spec.service, spec.permission)),
+                                       evaluations, error)
+            print_result(spec.permission, result)
+            if on_result:
+                on_result(group, result)
+            else:
+                results.append(result)
+        print()
+    return results
+
+
+class CloudTrailIndex:
+    """
+    One caller's recent CloudTrail events in one region, read with a single
+    paginated LookupEvents scan and indexed by EventName and ErrorCode.
+
+    Every DENIED permission is answered from the index, so a run makes a few
+    LookupEvents calls per region instead of one per denial.
+    """
+
+    def __init__(self, region: str, minutes_back: int = CLOUDTRAIL_LOOKBACK_MINUTES):
+        self.region = region
+        self.minutes_back = minutes_back
+        self.lookup_attribute = None
+        self.events = {}
+        self.error_codes = {}
+        self.pages = 0
+        self.event_count = 0
+        self.elapsed = 0.0
+        self.truncated = False
+        self.error = None
+
+    def scan(self, profile: Optional[str], lookup_attribute: Optional[tuple] = None) -> "CloudTrailIndex":
+        """
+        Page through LookupEvents for the last minutes_back minutes, filtered by
+        lookup_attribute (("AccessKeyId" | "Username", value)), and index the events.
+        """
+        start = time.perf_counter()
+        self.lookup_attribute = lookup_attribute
+        end_time = datetime.now(timezone.utc)
+        params = {
+            "StartTime": end_time - timedelta(minutes=self.minutes_back),
+            "EndTime": end_time,
+            "MaxResults": CLOUDTRAIL_PAGE_SIZE,
+        }
+        if lookup_attribute:
+            params["LookupAttributes"] = [{"AttributeKey": lookup_attribute[0], "AttributeValue": lookup_attribute[1]}]
+
+        try:
+            client = get_boto3_client("cloudtrail", self.region, profile, probe=True)
+            while True:
+                spec = CallSpec("cloudtrail", "LookupEvents", self.region, "cloudtrail", "lookup_events",
+                                MappingProxyType(params))
+                response = RATE_LIMITER.call(spec, client.lookup_events, {})
+                self.pages += 1
+                for event in response.get("Events", []):
+                    self._add(event)
+                next_token = response.get("NextToken")
+                if not next_token:
+                    break
+                if self.pages >= CLOUDTRAIL_MAX_PAGES:
+                    self.truncated = True
+                    break
+                params = {**params, "NextToken": next_token}
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "Unknown")
+            if error_code in ("AccessDenied", "AccessDeniedException"):
+                self.error = "Access denied to CloudTrail"
+            else:
+                self.error = str(e)[:50]
+        except Exception as e:
+            self.error = str(e)[:50]
+
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def _add(self, event: dict) -> None:
+        # The error code is only in the raw event record
+        try:
+            error_code = json.loads(event.get("CloudTrailEvent") or "{}").get("errorCode")
+        except ValueError:
+            error_code = None
+        name = event.get("EventName")
+        # botocore parses EventTime in the host's local timezone; keep it in UTC
+        event_time = event.get("EventTime")
+        if isinstance(event_time, datetime):
+            event_time = event_time.astimezone(timezone.utc)
+        self.events.setdefault(name, []).append({
+            "event_time": str(event_time),
+            "username": event.get("Username"),
+            "error_code": error_code,
+        })
+        self.error_codes.setdefault(name, Counter())[error_code or "Success"] += 1
+        self.event_count += 1
+
+    def lookup(self, permission: str) -> dict:
+        """CloudTrail diagnostics for one permission (newest event first), as stored on results."""
+        if self.error:
+            return {"error": self.error, "count": 0}
+        events = self.events.get(permission)
+        if not events:
+            return {"message": "No recent events", "count": 0}
+
+        latest = events[0]
+        codes = ", ".join(f"{code}: {count}" for code, count in self.error_codes[permission].most_common())
+        return {
+            "event_name": permission,
+            "event_time": latest["event_time"],
+            "username": latest["username"],
+            "error_code": latest["error_code"],
+            "count": len(events),
+            "message": f"{len(events)} events in last {self.minutes_back}min ({codes})",
+        }
+
+    def summary(self) -> dict:
+        """The scan's figures for the report's CloudTrail table (events are not kept)."""
+        return {
+            "region": self.region,
+            "minutes_back": self.minutes_back,
+            "lookup_attribute": self.lookup_attribute,
+            "pages": self.pages,
+            "event_count": self.event_count,
+            "elapsed": self.elapsed,
+            "truncated": self.truncated,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_summary(cls, summary: dict) -> "CloudTrailIndex":
+        """Rebuild a scan from summary() for the report (lookup() finds no events)."""
+        scan = cls(summary["region"], summary["minutes_back"])
+        for name in ("pages", "event_count", "elapsed", "truncated", "error"):
+            setattr(scan, name, summary[name])
+        scan.lookup_attribute = tuple(summary["lookup_attribute"]) if summary["lookup_attribute"] else None
+        return scan
+
+
+def cloudtrail_lookup_attribute(profile: Optional[str], identity_arn: Optional[str]) -> Optional[tuple]:
+    """Filter for the caller's own events: its access key if known, else the name at the end of its ARN."""
+    access_key = CLIENT_REGISTRY.access_key(profile)
+    if access_key:
+        return ("AccessKeyId", access_key)
+    if identity_arn:
+        return ("Username", identity_arn.rsplit("/", 1)[-1])
+    return None
+
+
+class ResultTable:
+    """
+    Compact, append-only store of result dicts, one array column per field.
+
+    Text fields are interned (each distinct string is kept once) and stored as
+    4-byte codes; numbers go into typed arrays with a sentinel for "absent".
+    A result costs about 80 bytes instead of two dicts of 1-2 KB, which is what
+    large multi-role, multi-region runs hold on to. Values the columns cannot
+    represent (data samples that are not strings, CloudTrail diagnostics,
+    unknown keys) are kept per row as they are.
+
+    Indexing and iteration rebuild plain result dicts, so the table can stand
+    in for a list of results. Rows appended with keep=True are kept as the
+    original dict (by reference) and returned as is, so later changes to the
+    dict (CloudTrail diagnostics on DENIED results) are seen.
+    """
+
+    # Columns in the order fields appear in a rebuilt result; "data" is count/sample/details
+    TEXT_FIELDS = ("service", "permission", "region", "status", "message", "error_code")
+    INT_FIELDS = ("attempts", "bytes", "retries", "throttles")
+    FLOAT_FIELDS = ("latency", "retry_delay")
+    TRAILING_TEXT_FIELDS = ("role", "checked_at")
+
+    _COLUMNS = frozenset(TEXT_FIELDS + INT_FIELDS + FLOAT_FIELDS + TRAILING_TEXT_FIELDS + ("data", "cached"))
+    _ABSENT = object()
+    _NO_INT = -1
+    _NAN = float("nan")
+    _INT_MAX = 2 ** 31 - 1
+
+    def __init__(self):
+        # Text code 0 is "field absent"; other codes index _values
+        self._values = [self._ABSENT]
+        self._codes = {}
+        self._text = {name: array("I") for name in self.TEXT_FIELDS + ("sample", "details") + self.TRAILING_TEXT_FIELDS}
+        self._ints = {name: array("i") for name in ("count",) + self.INT_FIELDS}
+        self._floats = {name: array("d") for name in self.FLOAT_FIELDS}
+        self._cached = array("b")
+        self._extras = {}
+        self._kept = {}
+        self._text_columns = [(name, self._text[name]) for name in self.TEXT_FIELDS + self.TRAILING_TEXT_FIELDS]
+        self._int_columns = [(name, self._ints[name]) for name in self.INT_FIELDS]
+        self._float_columns = [(name, self._floats[name]) for name in self.FLOAT_FIELDS]
+
+    def __len__(self) -> int:
+        return len(self._cached)
+
+    def __getitem__(self, row: int) -> dict:
+        if not -len(self) <= row < len(self):
+            raise IndexError("result row out of range")
+        return self.row(row % len(self))
+
+    def __iter__(self):
+        return (self.row(row) for row in range(len(self)))
+
+    def _intern(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def append(self, result: dict, keep: bool = False) -> int:
+        """Store one result and return its row number. Not thread-safe."""
+        row = len(self._cached)
+        absent, codes, extras = self._ABSENT, self._codes, {}
+        get = result.get
+
+        for name, column in self._text_columns:
+            value = get(name, absent)
+            if value is absent:
+                column.append(0)
+            elif value is None or value.__class__ is str:
+                code = codes.get(value)
+                column.append(self._intern(value) if code is None else code)
+            else:
+                column.append(0)
+                extras[name] = value
+
+        data = get("data", absent)
+        if (data.__class__ is dict and len(data) == 3 and data.get("count").__class__ is int
+                and 0 <= data["count"] <= self._INT_MAX and data.get("details").__class__ is str
+                and "sample" in data and (data["sample"] is None or data["sample"].__class__ is str)):
+            self._ints["count"].append(data["count"])
+            for name in ("sample", "details"):
+                code = codes.get(data[name])
+                self._text[name].append(self._intern(data[name]) if code is None else code)
+        else:
+            self._ints["count"].append(self._NO_INT)
+            self._text["sample"].append(0)
+            self._text["details"].append(0)
+            if data is not absent:
+                extras["data"] = data
+
+        for name, column in self._int_columns:
+            value = get(name, absent)
+            if value.__class__ is int and 0 <= value <= self._INT_MAX:
+                column.append(value)
+            else:
+                column.append(self._NO_INT)
+                if value is not absent:
+                    extras[name] = value
+
+        for name, column in self._float_columns:
+            value = get(name, absent)
+            if value.__class__ is float and value == value:
+                column.append(value)
+            else:
+                column.append(self._NAN)
+                if value is not absent:
+                    extras[name] = value
+
+        cached = get("cached", absent)
+        if cached is True or cached is False:
+            self._cached.append(cached)
+        else:
+            self._cached.append(-1)
+            if cached is not absent:
+                extras["cached"] = cached
+
+        if not self._COLUMNS.issuperset(result):
+            for key in result.keys() - self._COLUMNS:
+                extras[key] = result[key]
+        if extras:
+            self._extras[row] = extras
+        if keep:
+            self._kept[row] = result
+        return row
+
+    def row(self, row: int) -> dict:
+        """The result at a row number as a dict (a new dict unless the row was kept)."""
+        kept = self._kept.get(row)
+        if kept is not None:
+            return kept
+        values, text = self._values, self._text
+        result = {}
+        for name in self.TEXT_FIELDS:
+            code = text[name][row]
+            if code:
+                result[name] = values[code]
+        count = self._ints["count"][row]
+        if count != self._NO_INT:
+            result["data"] = {"count": count, "sample": values[text["sample"][row]], "details": values[text["details"][row]]}
+        for name, column in self._int_columns:
+            if column[row] != self._NO_INT:
+                result[name] = column[row]
+        for name, column in self._float_columns:
+            if column[row] == column[row]:
+                result[name] = column[row]
+        for name in self.TRAILING_TEXT_FIELDS:
+            code = text[name][row]
+            if code:
+                result[name] = values[code]
+        if self._cached[row] >= 0:
+            result["cached"] = self._cached[row] == 1
+        if row in self._extras:
+            result.update(self._extras[row])
+        return result
+
+    def column(self, name: str) -> list:
+        """
+        One field of every row, None where absent. name is a column name;
+        data fields are "count", "sample" and "details".
+        """
+        if name in self._text:
+            values = self._values
+            return [None if code == 0 else values[code] for code in self._text[name]]
+        if name in self._ints:
+            return [None if value == self._NO_INT else value for value in self._ints[name]]
+        if name in self._floats:
+            return [value if value == value else None for value in self._floats[name]]
+        if name == "cached":
+            return [None if value < 0 else bool(value) for value in self._cached]
+        raise KeyError(name)
+
+    def where(self, name: str, value: str) -> list:
+        """Row numbers whose text column name equals value, in insertion order."""
+        code = self._codes.get(value)
+        if code is None:
+            return []
+        return [row for row, row_code in enumerate(self._text[name]) if row_code == code]
+
+
+def print_result(permission: str, result: dict) -> None:
+    """Print inline status with data for a single result."""
+    status_symbol = STATUS_SYMBOLS.get(result["status"], "[?]")
+
+    details = result.get("data", {}).get("details", "")
+    if result.get("cached"):
+        details = f"{details} (cached)" if details else "(cached)"
+    if details:
+        print(f"  {status_symbol} {permission}: {result['status']} - {details}")
+    else:
+        print(f"  {status_symbol} {permission}: {result['status']}")
+
+
+def validate_services(plan: dict, profile: Optional[str],
+                      workers: int = 1, max_per_service: int = DEFAULT_MAX_PER_SERVICE,
+                      group_profiles: Optional[dict] = None, cached_results: Optional[dict] = None,
+                      on_result=None, on_complete=None, quiet: bool = False) -> ResultTable:
+    """
+    Validate all call specs in a compiled plan, printing results as they arrive
+    (unless quiet).
+
+    With workers > 1 the probes run on a bounded thread pool. Each plan group
+    (a service, or a service in one region) gets at most max_per_service "lanes"
+    that drain its permissions, so no group has more than max_per_service calls
+    in flight and no pool thread sits blocked waiting for a busy service. Results
+    are printed and returned in plan order regardless of completion order;
+    results that complete early wait in a compact ResultTable, not as dicts.
+
+    group_profiles optionally maps plan groups to a different credential source
+    (profile name or registry session key) than profile. cached_results maps
+    (group, permission) to a stored result that is reused instead of probing.
+
+    Results are returned as a ResultTable (a sequence of result dicts). If
+    on_result is given, each result is passed to on_result(group, result) as
+    soon as it is printed and is not kept, and an empty table is returned.
+    on_complete(group, result) is called for every freshly probed result the
+    moment it completes, from the worker thread that produced it.
+    """
+    group_profiles = group_profiles or {}
+    cached_results = cached_results or {}
+    results = ResultTable()
+
+    if workers <= 1:
+        for group, specs in plan.items():
+            if not quiet:
+                print(f"[{group}]")
+            for spec in specs:
+                result = cached_results.get((group, spec.permission))
+                if result is None:
+                    result = run_call_spec(spec, group_profiles.get(group, profile))
+                    if on_complete:
+                        on_complete(group, result)
+                if not quiet:
+                    print_result(spec.permission, result)
+                if on_result:
+                    on_result(group, result)
+                else:
+                    results.append(result)
+            if not quiet:
+                print()
+        return results
+
+    # Results land in one compact table as they complete; rows[position] is the
+    # table row of the plan's position-th permission (-1 until it completes)
+    table = ResultTable()
+    rows = array("l", [-1]) * sum(len(specs) for specs in plan.values())
+    failures = {}
+    ready = threading.Condition()
+
+    def run_lane(work: queue.SimpleQueue, group: str, lane_profile: Optional[str]) -> None:
+        while True:
+            try:
+                position, spec = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = run_call_spec(spec, lane_profile)
+                if on_complete:
+                    on_complete(group, result)
+                with ready:
+                    rows[position] = table.append(result)
+                    ready.notify_all()
+            except Exception as e:
+                with ready:
+                    failures[position] = e
+                    ready.notify_all()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validator") as executor:
+        position = 0
+        for group, specs in plan.items():
+            work = queue.SimpleQueue()
+            queued = 0
+            for spec in specs:
+                cached = cached_results.get((group, spec.permission))
+                if cached is not None:
+                    # Lanes of earlier groups are already appending to the table
+                    with ready:
+                        rows[position] = table.append(cached)
+                else:
+                    work.put((position, spec))
+                    queued += 1
+                position += 1
+            for _ in range(min(max_per_service, queued)):
+                executor.submit(run_lane, work, group, group_profiles.get(group, profile))
+
+        position = 0
+        for group, specs in plan.items():
+            if not quiet:
+                print(f"[{group}]")
+            for spec in specs:
+                with ready:
+                    while rows[position] < 0 and position not in failures:
+                        ready.wait()
+                    if position in failures:
+                        raise failures[position]
+                    result = table.row(rows[position])
+                position += 1
+                if not quiet:
+                    print_result(spec.permission, result)
+                if on_result:
+                    on_result(group, result)
+                else:
+                    results.append(result)
+            if not quiet:
+                print()
+
+    return results
+
+
+def fail_fast_services(plan: dict, profile: Optional[str], likelihood: dict,
+                      workers: int = FAIL_FAST_WORKERS, max_per_service: int = DEFAULT_MAX_PER_SERVICE,
+                      group_profiles: Optional[dict] = None, cached_results: Optional[dict] = None,
+                      on_result=None, on_complete=None) -> int:
+    """
+    Validate a plan riskiest first and stop starting probes at the first DENIED.
+
+    likelihood maps (service, permission) to a denial likelihood (see
+    denial_likelihood()). Workers always take the most likely permission among
+    groups with fewer than max_per_service calls in flight, so the risky probes
+    of every service run concurrently. Once a probe is DENIED no new probes
+    start; those in flight finish and are reported. Results are printed and
+    passed to on_result(group, result) as they complete; on_complete is called
+    as in validate_services(). Returns the number of permissions not probed.
+    """
+    group_profiles = group_profiles or {}
+    cached_results = cached_results or {}
+    queues = {}
+    for group, specs in plan.items():
+        for spec in specs:
+            cached = cached_results.get((group, spec.permission))
+            if cached is not None:
+                print_result(f"{group}: {spec.permission}", cached)
+                if on_result:
+                    on_result(group, cached)
+            else:
+                score = likelihood.get((spec.service, spec.permission), denial_likelihood(None))
+                queues.setdefault(group, []).append((score, spec))
+    for group, entries in queues.items():
+        # Stable sort: equally likely permissions keep their YAML order
+        queues[group] = deque(sorted(entries, key=lambda entry: -entry[0]))
+
+    condition = threading.Condition()
+    in_flight = Counter()
+    completed = queue.SimpleQueue()
+    state = {"stop": False}
+
+    def take() -> Optional[tuple]:
+        # Caller holds condition: the likeliest head among groups with a free slot
+        best = None
+        for group, entries in queues.items():
+            if entries and in_flight[group] < max_per_service and (
+                    best is None or entries[0][0] > queues[best][0][0]):
+                best = group
+        if best is None:
+            return None
+        in_flight[best] += 1
+        return best, queues[best].popleft()[1]
+
+    def worker() -> None:
+        try:
+            while True:
+                with condition:
+                    item = None
+                    while not state["stop"]:
+                        item = take()
+                        if item or not any(queues.values()):
+                            break
+                        condition.wait()
+                    if item is None:
+                        return
+                group, spec = item
+                try:
+                    result = run_call_spec(spec, group_profiles.get(group, profile))
+                    if on_complete:
+                        on_complete(group, result)
+                except Exception as e:
+                    result = {"service": spec.service, "permission": spec.permission, "region": spec.region,
+                              "status": "ERROR", "message": f"Probe failed: {e}", "error_code": None,
+                              "data": {"count": 0, "sample": None, "details": ""}}
+                with condition:
+                    in_flight[group] -= 1
+                    if result["status"] == "DENIED":
+                        state["stop"] = True
+                    condition.notify_all()
+                completed.put((group, spec, result))
+        finally:
+            # Tells the reporting loop this worker is done
+            completed.put(None)
+
+    # Workers probe; this thread prints and reports (on_result need not be thread-safe)
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validator") as executor:
+        for _ in range(workers):
+            executor.submit(worker)
+        finished = 0
+        while finished < workers:
+            item = completed.get()
+            if item is None:
+                finished += 1
+                continue
+            group, spec, result = item
+            print_result(f"{group}: {spec.permission}", result)
+            if on_result:
+                on_result(group, result)
+    return sum(len(entries) for entries in queues.values())
+
+
+class WatchMetrics:
+    """
+    Counters and gauges of a --watch run, rendered in the Prometheus text format.
+
+    Probe counts by status and the latency histogram are updated as results
+    arrive; throttling, client and API call figures are read from the shared
+    rate limiter and client registry when scraped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.probes = Counter()
+        self.latency_buckets = [0] * len(METRICS_LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.cycles = 0
+        self.cycle_seconds = 0.0
+        self.last_cycle = 0.0
+        self.denied = 0
+        self.policy_changes = 0
+
+    def observe(self, result: dict) -> None:
+        """Count one freshly probed result."""
+        with self._lock:
+            self.probes[result["status"]] += 1
+            latency = result.get("latency")
+            if latency is not None:
+                self.latency_sum += latency
+                self.latency_count += 1
+                for i, bound in enumerate(METRICS_LATENCY_BUCKETS):
+                    if latency <= bound:
+                        self.latency_buckets[i] += 1
+
+    def end_cycle(self, seconds: float, denied: int, policy_changes: int) -> None:
+        with self._lock:
+            self.cycles += 1
+            self.cycle_seconds = seconds
+            self.last_cycle = time.time()
+            self.denied = denied
+            self.policy_changes += policy_changes
+
+    def render(self) -> str:
+        throttle_stats = RATE_LIMITER.stats()
+        client_stats = CLIENT_REGISTRY.stats()
+        with self._lock:
+            lines = [
+                "# HELP permissions_validator_probes_total Permissions probed, by result status.",
+                "# TYPE permissions_validator_probes_total counter",
+            ]
+            for status in STATUS_ICONS:
+                lines.append(f'permissions_validator_probes_total{{status="{status}"}} {self.probes[status]}')
+            lines += [
+                "# HELP permissions_validator_denied Permissions DENIED as of the last probe of each.",
+                "# TYPE permissions_validator_denied gauge",
+                f"permissions_validator_denied {self.denied}",
+                "# HELP permissions_validator_probe_latency_seconds API latency per probe, including retries.",
+                "# TYPE permissions_validator_probe_latency_seconds histogram",
+            ]
+            for bound, count in zip(METRICS_LATENCY_BUCKETS, self.latency_buckets):
+                lines.append(f'permissions_validator_probe_latency_seconds_bucket{{le="{bound:g}"}} {count}')
+            lines += [
+                f'permissions_validator_probe_latency_seconds_bucket{{le="+Inf"}} {self.latency_count}',
+                f"permissions_validator_probe_latency_seconds_sum {self.latency_sum:.6f}",
+                f"permissions_validator_probe_latency_seconds_count {self.latency_count}",
+                "# HELP permissions_validator_cycles_total Watch cycles completed.",
+                "# TYPE permissions_validator_cycles_total counter",
+                f"permissions_validator_cycles_total {self.cycles}",
+                "# HELP permissions_validator_cycle_duration_seconds Duration of the last watch cycle.",
+                "# TYPE permissions_validator_cycle_duration_seconds gauge",
+                f"permissions_validator_cycle_duration_seconds {self.cycle_seconds:.3f}",
+                "# HELP permissions_validator_last_cycle_timestamp_seconds When the last watch cycle ended.",
+                "# TYPE permissions_validator_last_cycle_timestamp_seconds gauge",
+                f"permissions_validator_last_cycle_timestamp_seconds {self.last_cycle:.0f}",
+                "# HELP permissions_validator_policy_changes_total IAM policy changes seen in CloudTrail.",
+                "# TYPE permissions_validator_policy_changes_total counter",
+                f"permissions_validator_policy_changes_total {self.policy_changes}",
+            ]
+        lines += [
+            "# HELP permissions_validator_throttles_total Throttled probe calls.",
+            "# TYPE permissions_validator_throttles_total counter",
+            f"permissions_validator_throttles_total {sum(s['throttles'] for s in throttle_stats.values())}",
+            "# HELP permissions_validator_api_calls_total API calls made through the client registry.",
+            "# TYPE permissions_validator_api_calls_total counter",
+            f"permissions_validator_api_calls_total {client_stats['api_calls']}",
+            "# HELP permissions_validator_clients Clients created (kept warm across cycles).",
+            "# TYPE permissions_validator_clients gauge",
+            f"permissions_validator_clients {client_stats['clients_created']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics: WatchMetrics, port: int):
+    """Serve metrics at http://127.0.0.1:<port>/metrics from a daemon thread. Returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+class PolicyChangeWatch:
+    """
+    Spots IAM policy changes in CloudTrail between --watch cycles.
+
+    Each check() scans the account's recent IAM events (one paginated LookupEvents
+    scan in IAM_EVENTS_REGION) and returns the successful POLICY_CHANGE_EVENTS
+    newer than any seen before, as (event time, event name, username), newest first.
+    """
+
+    def __init__(self, profile: Optional[str]):
+        self.profile = profile
+        self.since = datetime.now(timezone.utc)
+        self.error = None
+
+    def check(self) -> list:
+        scan = CloudTrailIndex(IAM_EVENTS_REGION, POLICY_CHANGE_LOOKBACK_MINUTES).scan(
+            self.profile, ("EventSource", "iam.amazonaws.com"))
+        if scan.error and scan.error != self.error:
+            print(f"WARNING: Cannot check CloudTrail for policy changes: {scan.error}")
+        self.error = scan.error
+        # Compared as aware datetimes: the strings may carry different UTC offsets
+        changes = sorted(
+            ((datetime.fromisoformat(event["event_time"]), name, event["username"])
+             for name in POLICY_CHANGE_EVENTS.intersection(scan.events)
+             for event in scan.events[name]
+             if not event["error_code"] and event["event_time"] != "None"
+             and datetime.fromisoformat(event["event_time"]) > self.since),
+            reverse=True,
+        )
+        if changes:
+            self.since = changes[0][0]
+        return changes
+
+
+def watch_services(plan: dict, profile: Optional[str], interval: float, batch: int, metrics: WatchMetrics,
+                   workers: int = 1, max_per_service: int = DEFAULT_MAX_PER_SERVICE,
+                   group_profiles: Optional[dict] = None, cached_results: Optional[dict] = None,
+                   on_result=None, on_cycle=None, change_check=None) -> None:
+    """
+    Re-validate a compiled plan every interval seconds (+/- WATCH_JITTER) until interrupted.
+
+    Clients stay in the registry between cycles, so a cycle costs only its API
+    calls. The first cycle validates everything (reusing cached_results). Later
+    cycles re-probe what is DENIED/ERROR or changed status in the last
+    WATCH_CHANGE_CYCLES cycles, plus the batch least recently probed others.
+    If change_check() returns IAM policy changes, that cycle re-probes everything.
+    Status changes are printed; on_result(group, result) sees every fresh result
+    and on_cycle() is called after each cycle.
+    """
+    specs = {(group, spec.permission): spec for group, group_specs in plan.items() for spec in group_specs}
+    state = {}  # (group, permission) -> [status, cycle probed, cycle status last changed or None]
+    cycle = 0
+
+    while True:
+        cycle += 1
+        started = time.monotonic()
+        changes = change_check() if change_check and cycle > 1 else []
+        for event_time, event_name, username in changes:
+            print(f"  Policy change: {event_name} by {username} at {event_time}")
+
+        if cycle == 1 or changes:
+            priority, due = [], set(specs)
+        else:
+            priority = {key for key, (status, _, changed) in state.items()
+                        if status in REPROBE_STATUSES or (changed and cycle - changed <= WATCH_CHANGE_CYCLES)}
+            steady = sorted((key for key in state if key not in priority), key=lambda key: state[key][1])
+            due = priority | set(steady[:batch])
+
+        flips = []
+
+        def record(group: str, result: dict) -> None:
+            key = (group, result["permission"])
+            previous = state.get(key)
+            changed = previous[2] if previous else None
+            if previous and previous[0] != result["status"]:
+                flips.append(f"  {group}: {result['permission']} {previous[0]} -> {result['status']}")
+                changed = cycle
+            state[key] = [result["status"], cycle, changed]
+            if not result.get("cached"):
+                metrics.observe(result)
+                if on_result:
+                    on_result(group, result)
+
+        cycle_plan = {}
+        for group, group_specs in plan.items():
+            due_specs = [spec for spec in group_specs if (group, spec.permission) in due]
+            if due_specs:
+                cycle_plan[group] = due_specs
+        validate_services(
+            cycle_plan, profile, workers=workers, max_per_service=max_per_service, group_profiles=group_profiles,
+            cached_results=cached_results if cycle == 1 else None, on_result=record, quiet=True,
+        )
+
+        elapsed = time.monotonic() - started
+        denied = sum(1 for status, _, _ in state.values() if status == "DENIED")
+        metrics.end_cycle(elapsed, denied, len(changes))
+        if on_cycle:
+            on_cycle()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Cycle {cycle}: {len(due)} probed "
+              f"({len(priority)} prioritised) in {elapsed:.1f}s - {denied} DENIED, {len(flips)} changed")
+        for line in flips:
+            print(line)
+
+        time.sleep(max(0.0, interval * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER) - elapsed))
+
+
+def assume_roles(roles: list, account_id: Optional[str], region: str, profile: Optional[str] = None) -> dict:
+    """
+    Assume each role once (in parallel) and register its credentials with the client registry.
+
+    Roles may be full ARNs or role names in the caller's account. Returns
+    {label: identity} where label is the role name (prefixed with the account,
+    "<account>:<name>", when two requested roles share a name) and identity
+    matches get_caller_identity() plus "role_arn" and the registry credential
+    key under "key"; roles that could not be assumed map to {"error": ...}.
+    The registered credentials re-assume the role before they expire, so long
+    runs (--watch) keep working past the STS session duration.
+    """
+    from botocore.credentials import CredentialProvider, CredentialResolver, RefreshableCredentials
+
+    role_arns = list(dict.fromkeys(
+        role if role.startswith("arn:") else f"arn:aws:iam::{account_id}:role/{role}" for role in roles
+    ))
+    name_counts = Counter(role_arn.split("/")[-1] for role_arn in role_arns)
+
+    def label(role_arn: str) -> str:
+        role_name = role_arn.split("/")[-1]
+        return role_name if name_counts[role_name] == 1 else f"{role_arn.split(':')[4]}:{role_name}"
+
+    def assume(role_arn: str) -> tuple[str, dict]:
+        def fetch() -> tuple[dict, dict]:
+            """Assume the role; returns (credential metadata for botocore, AssumedRoleUser)."""
+            response = get_boto3_client("sts", region, profile).assume_role(
+                RoleArn=role_arn,
+                RoleSessionName=ROLE_SESSION_NAME,
+            )
+            credentials = response["Credentials"]
+            return {
+                "access_key": credentials["AccessKeyId"],
+                "secret_key": credentials["SecretAccessKey"],
+                "token": credentials["SessionToken"],
+                "expiry_time": credentials["Expiration"].isoformat(),
+            }, response["AssumedRoleUser"]
+
+        try:
+            metadata, assumed_user = fetch()
+        except Exception as e:
+            return label(role_arn), {"error": str(e)[:100]}
+
+        refreshable = RefreshableCredentials.create_from_metadata(
+            metadata=metadata,
+            refresh_using=lambda: fetch()[0],
+            method="assume-role",
+        )
+        provider = CredentialProvider()
+        provider.load = lambda: refreshable
+        botocore_session = MODEL_LOADER.botocore_session()
+        botocore_session.register_component("credential_provider", CredentialResolver([provider]))
+        key = f"role:{role_arn}"
+        CLIENT_REGISTRY.register_session(key, MODEL_LOADER.boto3_session(botocore_session=botocore_session))
+        assumed_arn = assumed_user["Arn"]
+        return label(role_arn), {
+            "account": assumed_arn.split(":")[4],
+            "arn": assumed_arn,
+            "user_id": assumed_user["AssumedRoleId"],
+            "role_arn": role_arn,
+            "key": key,
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, len(role_arns)), thread_name_prefix="assume-role") as executor:
+        return dict(executor.map(assume, role_arns))
+
+
+class ResultStore:
+    """
+    SQLite store of validation results keyed by (identity ARN, region, service, permission).
+
+    Lets --incremental reuse results from earlier runs that are still within the
+    TTL, so only stale, failed or new permissions are probed again. Also keeps
+    probe and denial counts per permission, which --fail-fast orders probes by.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self._pending = []
+        self._conn = sqlite3.connect(str(file_path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                identity_arn TEXT NOT NULL,
+                region TEXT NOT NULL,
+                service TEXT NOT NULL,
+                permission TEXT NOT NULL,
+                status TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (identity_arn, region, service, permission)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS probe_history (
+                identity_arn TEXT NOT NULL,
+                service TEXT NOT NULL,
+                permission TEXT NOT NULL,
+                probes INTEGER NOT NULL,
+                denials INTEGER NOT NULL,
+                PRIMARY KEY (identity_arn, service, permission)
+            )
+            """
+        )
+
+    def load_fresh(self, identity_arn: str, ttl_seconds: float) -> dict:
+        """
+        Return reusable results for an identity: {(region, service, permission): result}.
+
+        Skips results older than ttl_seconds and those in REPROBE_STATUSES.
+        Returned results are flagged with "cached" and "checked_at".
+        """
+        placeholders = ", ".join("?" for _ in REPROBE_STATUSES)
+        rows = self._conn.execute(
+            f"SELECT region, service, permission, checked_at, result FROM results "
+            f"WHERE identity_arn = ? AND checked_at >= ? AND status NOT IN ({placeholders})",
+            (identity_arn, time.time() - ttl_seconds, *REPROBE_STATUSES),
+        )
+        fresh = {}
+        for region, service, permission, checked_at, result_json in rows:
+            result = json.loads(result_json)
+            result["cached"] = True
+            result["checked_at"] = datetime.fromtimestamp(checked_at, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            fresh[(region, service, permission)] = result
+        return fresh
+
+    def add(self, identity_arn: str, result: dict) -> None:
+        """Queue a freshly probed result for storage (cached ones keep their original timestamp)."""
+        if result.get("cached"):
+            return
+        self._pending.append((identity_arn, result["region"], result["service"], result["permission"],
+                              result["status"], time.time(), json.dumps(result, default=str)))
+        if len(self._pending) >= RESULT_STORE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write queued results (and their probe history) in one transaction."""
+        if self._pending:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending)
+                self._conn.executemany(
+                    "INSERT INTO probe_history VALUES (?, ?, ?, 1, ?) ON CONFLICT (identity_arn, service, permission) "
+                    "DO UPDATE SET probes = probes + 1, denials = denials + excluded.denials",
+                    [(arn, service, permission, int(status == "DENIED"))
+                     for arn, _, service, permission, status, _, _ in self._pending],
+                )
+            self._pending = []
+
+    def denial_counts(self, identity_arns: set) -> dict:
+        """
+        Return {(service, permission): [probes, denials]} from the probe history.
+
+        Counts of the given identities are used where they have any; other
+        permissions fall back to the counts of every identity in the store.
+        """
+        own, others = {}, {}
+        for arn, service, permission, probes, denials in self._conn.execute(
+                "SELECT identity_arn, service, permission, probes, denials FROM probe_history"):
+            counts = (own if arn in identity_arns else others).setdefault((service, permission), [0, 0])
+            counts[0] += probes
+            counts[1] += denials
+        return {**others, **own}
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+class ResultJournal:
+    """
+    Append-only JSON Lines journal of results, written as each probe completes.
+
+    The first line is a header naming the identity; every following line is
+    {"group": ..., "result": {...}}. Each line is flushed immediately, so an
+    interrupted run can be continued with --resume without redoing work.
+    """
+
+    def __init__(self, file_path: Path, identity_arn: Optional[str]):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        is_new = not file_path.exists() or file_path.stat().st_size == 0
+        torn = False
+        if not is_new:
+            with open(file_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self._file = open(file_path, "a", encoding="utf-8")
+        if torn:
+            # Terminate a line cut short by a crash so the next record stays parseable
+            self._file.write("\n")
+        if is_new:
+            self._write({
+                "journal": JOURNAL_FORMAT_VERSION,
+                "identity_arn": identity_arn,
+                "started": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def _write(self, entry: dict) -> None:
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def record(self, group: str, result: dict) -> None:
+        """Append one completed result (safe to call from worker threads)."""
+        self._write({"group": group, "result": result})
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def load_journal(file_path: Path, identity_arn: Optional[str]) -> dict:
+    """
+    Read a journal written by ResultJournal. Returns {(group, permission): result}.
+
+    A torn last line from a crash is ignored. Raises ValueError if the journal
+    belongs to a different identity.
+    """
+    entries = {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "journal" in entry:
+                if entry.get("journal") != JOURNAL_FORMAT_VERSION:
+                    raise ValueError(f"Unsupported journal format: {entry.get('journal')}")
+                if entry.get("identity_arn") != identity_arn:
+                    raise ValueError(f"Journal was written by {entry.get('identity_arn')}, not {identity_arn}")
+                continue
+            result = entry["result"]
+            entries[(entry["group"], result["permission"])] = result
+    return entries
+
+
+class ShardOutput:
+    """
+    Machine-readable output of one --shard run (JSON Lines), combined by merge.
+
+    The header names the shard and the permissions list it was cut from. Each
+    reported result follows as {"order": [...], "result": {...}}, where order
+    (role, service, region, chunk, sequence) restores the order an unsharded
+    run reports in; DENIED results are written at
+    finish() so they carry their CloudTrail diagnostics. The footer holds the
+    identity, config and CloudTrail scans and marks the shard complete.
+    """
+
+    def __init__(self, file_path: Path, shard: tuple, digest: str, positions: dict,
+                 regions: list, roles: list):
+        self.file_path = file_path
+        self.positions = positions
+        self.region_ranks = {"global": 0, **{region: rank for rank, region in enumerate(regions, 1)}}
+        self.role_ranks = {role: rank for rank, role in enumerate(roles)}
+        self.sequence = 0
+        self.denied = []
+        self._file = open(file_path, "w", encoding="utf-8")
+        self._write({
+            "shard": list(shard),
+            "format": SHARD_FORMAT_VERSION,
+            "permissions": digest,
+            "multi_region": len(regions) > 1,
+            "multi_role": len(roles) > 1,
+            "started": datetime.now(timezone.utc).isoformat(),
+        })
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, default=str) + "\n")
+
+    def add(self, r: dict) -> None:
+        """Record one reported result (kept by reference until finish() if DENIED)."""
+        service_index, chunk_index = self.positions[r["service"]]
+        order = [self.role_ranks.get(r.get("role"), 0), service_index, self.region_ranks.get(r["region"], 0),
+                 chunk_index, self.sequence]
+        entry = {"order": order, "result": r}
+        self.sequence += 1
+        if r["status"] == "DENIED":
+            self.denied.append(entry)
+        else:
+            self._write(entry)
+
+    def finish(self, identity: dict, config: dict, cloudtrail_scans: tuple = ()) -> Path:
+        for entry in self.denied:
+            self._write(entry)
+        self._write({
+            "identity": identity,
+            "config": config,
+            "cloudtrail_scans": [scan.summary() for scan in cloudtrail_scans],
+            "finished": datetime.now(timezone.utc).isoformat(),
+        })
+        self._file.close()
+        return self.file_path
+
+
+def load_shards(file_paths: list) -> dict:
+    """
+    Read the ShardOutput files of one sharded run, checking that they fit together.
+
+    Returns {"identity", "config", "multi_region", "multi_role", "cloudtrail_scans",
+    "results"} with results (a ResultTable) in the order of the full permissions
+    list. Raises ValueError for a missing, duplicate, unfinished or mismatched shard.
+    """
+    shards = {}
+    merged = {"cloudtrail_scans": []}
+    table, order = ResultTable(), []
+    for file_path in file_paths:
+        header = footer = None
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "result" in entry:
+                    order.append((entry["order"], table.append(entry["result"])))
+                elif "shard" in entry:
+                    header = entry
+                else:
+                    footer = entry
+        if header is None or header.get("format") != SHARD_FORMAT_VERSION:
+            raise ValueError(f"{file_path} is not a shard output (format {SHARD_FORMAT_VERSION})")
+        if footer is None:
+            raise ValueError(f"{file_path} is incomplete - shard {header['shard'][0]}/{header['shard'][1]} "
+                             f"did not finish")
+        index, count = header["shard"]
+        first = next(iter(shards.values()), None)
+        if first and (header["shard"][1], header["permissions"]) != (first[0]["shard"][1], first[0]["permissions"]):
+            raise ValueError(f"{file_path} belongs to a different sharded run (permissions list or shard count)")
+        if first and footer["identity"].get("arn") != first[1]["identity"].get("arn"):
+            raise ValueError(f"{file_path} was validated as {footer['identity'].get('arn')}, "
+                             f"not {first[1]['identity'].get('arn')}")
+        if index in shards:
+            raise ValueError(f"Shard {index}/{count} given twice")
+        shards[index] = (header, footer)
+        merged["cloudtrail_scans"].extend(footer["cloudtrail_scans"])
+
+    count = next(iter(shards.values()))[0]["shard"][1]
+    missing = [str(i) for i in range(1, count + 1) if i not in shards]
+    if missing:
+        raise ValueError(f"Missing shard(s) {', '.join(missing)} of {count}")
+
+    header, footer = shards[1]
+    order.sort()
+    merged["results"] = ResultTable()
+    for _, row in order:
+        merged["results"].append(table.row(row))
+    merged["cloudtrail_scans"] = [CloudTrailIndex.from_summary(s) for s in merged["cloudtrail_scans"]]
+    merged["multi_region"] = any(h["multi_region"] for h, _ in shards.values())
+    merged["multi_role"] = any(h["multi_role"] for h, _ in shards.values())
+    merged["identity"] = footer["identity"]
+    merged["config"] = footer["config"]
+    return merged
+
+
+def journal_denial_counts(file_paths: list) -> dict:
+    """Return {(service, permission): [probes, denials]} counted from ResultJournal files."""
+    counts = {}
+    for file_path in file_paths:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        result = json.loads(line).get("result")
+                    except json.JSONDecodeError:
+                        continue
+                    if result and not result.get("cached"):
+                        entry = counts.setdefault((result["service"], result["permission"]), [0, 0])
+                        entry[0] += 1
+                        entry[1] += result["status"] == "DENIED"
+        except OSError:
+            continue
+    return counts
+
+
+def denial_likelihood(counts: Optional[list]) -> float:
+    """
+    Smoothed share of probes denied, (denials + 1) / (probes + 2).
+
+    A permission without history scores 0.5, above any that has passed
+    repeatedly, so newly added permissions are probed early.
+    """
+    probes, denials = counts or (0, 0)
+    return (denials + 1) / (probes + 2)
+
+
+def get_caller_identity(region: str, profile: Optional[str] = None) -> dict:
+    """Get the current AWS caller identity."""
+    try:
+        client = get_boto3_client("sts", region, profile)
+        identity = client.get_caller_identity()
+        return {
+            "account": identity.get("Account"),
+            "arn": identity.get("Arn"),
+            "user_id": identity.get("UserId"),
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def service_status(counts: Counter) -> str:
+    """Roll a group's status counts up into OK/ISSUES/ERRORS/PARTIAL."""
+    if counts["DENIED"] > 0:
+        return "ISSUES"
+    if counts["ERROR"] > 0:
+        return "ERRORS"
+    if counts["NOT_TESTED"] > 0:
+        return "PARTIAL"
+    if counts["PASSED"] == sum(counts.values()) - counts["SKIPPED"]:
+        return "OK"
+    return "PARTIAL"
+
+
+class ReportWriter:
+    """
+    Streaming markdown report builder.
+
+    add() updates the counts incrementally and appends the result's Detailed
+    Results row to a partial report on disk, so a partial report survives a
+    crash. Only what the summary sections need stays in memory: DENIED,
+    NOT_TESTED and ERROR results (a compact ResultTable), the role matrix
+    statuses, per-service latencies and the slowest calls. finish() writes the
+    final report from those and copies the detailed rows from the partial file.
+    """
+
+    def __init__(self, output_dir: Path, multi_region: bool = False, multi_role: bool = False):
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.output_file = output_dir / f"validation-report-{timestamp}.md"
+        # The PID keeps runs that share the output directory and start in the same second
+        # (--shard workers, a --watch restart) from appending to and deleting each other's file
+        self.partial_file = output_dir / f"validation-report-{timestamp}-{os.getpid()}.partial.md"
+        self.multi_region = multi_region
+        self.multi_role = multi_role
+
+        self.totals = Counter()
+        self.services = {}
+        self.cells = {}
+        self.regions = {}
+        self.roles = {}
+        self.throttling = {}
+        self.cached = 0
+        self.results = ResultTable()
+        self.role_statuses = {}
+        self.latencies = {}
+        self.slowest = []
+        self._count = 0
+
+        self._partial = open(self.partial_file, "w", encoding="utf-8")
+        self._partial.write("# AWS Permissions Validation Report (partial)\n\n")
+        self._partial.write("Rows are appended as results arrive; the full report replaces this file when the run finishes.\n\n")
+        self._partial.write("## Detailed Results\n\n")
+        self._partial.write("| Service | Permission | Status | Details |\n")
+        self._partial.write("|---------|------------|--------|--------|\n")
+        self._partial.flush()
+        self._rows_start = self._partial.tell()
+
+    def _label(self, r: dict, with_role: bool = True) -> str:
+        """Service label, qualified with region / role on multi-region / multi-role runs."""
+        label = f"{r['service']} ({r['region']})" if self.multi_region else r["service"]
+        return f"{label} [{r['role']}]" if with_role and self.multi_role else label
+
+    def _detail_row(self, r: dict) -> str:
+        """The result's Detailed Results table row."""
+        status_icon = STATUS_ICONS.get(r["status"], "?")
+        if r.get("cached"):
+            status_icon = f"{status_icon} (cached {r.get('checked_at', '')})"
+
+        data = r.get("data", {})
+        if r["status"] == "PASSED":
+            details = data.get("details", "")
+            if data.get("sample"):
+                details = f"{details} ({data.get('sample')})" if details else data.get("sample")
+        else:
+            details = r.get("message", "")[:100]
+
+        return f"| {self._label(r)} | {r['permission']} | {status_icon} | {details} |\n"
+
+    def add(self, r: dict) -> None:
+        """Fold one result into the counts and summaries and append its detailed row to disk."""
+        status = r["status"]
+        self.totals[status] += 1
+        self.services.setdefault(r["service"], Counter())[status] += 1
+
+        if self.multi_region and r.get("region"):
+            self.regions.setdefault(r["region"], None)
+            self.cells.setdefault((r["service"], r["region"]), Counter())[status] += 1
+
+        if self.multi_role and r.get("role"):
+            self.roles.setdefault(r["role"], None)
+            self.role_statuses.setdefault((self._label(r, with_role=False), r["permission"]), {})[r["role"]] = status
+
+        if r.get("retries"):
+            svc = self.throttling.setdefault(r["service"], [0, 0, 0, 0.0])
+            svc[0] += 1
+            svc[1] += r.get("throttles", 0)
+            svc[2] += r["retries"]
+            svc[3] += r.get("retry_delay", 0.0)
+
+        if r.get("cached"):
+            self.cached += 1
+        elif r.get("latency") is not None:
+            self.latencies.setdefault(r["service"], array("d")).append(r["latency"])
+            # Min-heap of the slowest calls; ties go to the later result
+            call = (r["latency"], self._count, self._label(r), r["permission"], r.get("retries", 0), r.get("bytes", 0))
+            if len(self.slowest) < SLOWEST_CALLS_REPORTED:
+                heapq.heappush(self.slowest, call)
+            else:
+                heapq.heappushpop(self.slowest, call)
+        self._count += 1
+
+        if status in ("DENIED", "NOT_TESTED", "ERROR"):
+            # DENIED results are kept by reference: CloudTrail diagnostics are attached after validation
+            self.results.append(r, keep=status == "DENIED")
+        self._partial.write(self._detail_row(r))
+        self._partial.flush()
+
+    def finish(self, identity: dict, config: dict, cloudtrail_scans: tuple = ()) -> Path:
+        """Write the final report and remove the partial file. cloudtrail_scans are CloudTrailIndex objects."""
+        self._partial.close()
+
+        passed = self.totals["PASSED"]
+        denied = self.totals["DENIED"]
+        skipped = self.totals["SKIPPED"]
+        not_tested = self.totals["NOT_TESTED"]
+        errors = self.totals["ERROR"]
+        total = sum(self.totals.values())
+
+        with open(self.output_file, "w", encoding="utf-8") as f:
+            f.write("# AWS Permissions Validation Report\n\n")
+            f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+            # Configuration & Identity section (combined)
+            f.write("## Configuration\n\n")
+            f.write(f"| Setting | Value |\n")
+            f.write(f"|---------|-------|\n")
+            f.write(f"| Region | {config.get('region', 'us-east-1')} |\n")
+            if len(config.get("regions", [])) > 1:
+                f.write(f"| Regions | {', '.join(config['regions'])} |\n")
+            if config.get("assume_roles"):
+                f.write(f"| Assumed Roles | {', '.join(config['assume_roles'])} |\n")
+            f.write(f"| Profile | {config.get('profile', 'default')} |\n")
+            if config.get('description'):
+                f.write(f"| Description | {config.get('description')} |\n")
+            f.write(f"\n")
+
+            # Identity section - shows actual user/role from credentials
+            f.write("## AWS Identity (Detected)\n\n")
+            if "error" in identity:
+                f.write(f"Error getting identity: {identity['error']}\n\n")
+            else:
+                # Parse ARN to determine if it's a user or role
+                arn = identity.get('arn', '')
+                if ':user/' in arn:
+                    identity_type = "IAM User"
+                    identity_name = arn.split(':user/')[-1]
+                elif ':assumed-role/' in arn:
+                    identity_type = "Assumed Role"
+                    identity_name = arn.split(':assumed-role/')[-1].split('/')[0]
+                elif ':role/' in arn:
+                    identity_type = "IAM Role"
+                    identity_name = arn.split(':role/')[-1]
+                else:
+                    identity_type = "Unknown"
+                    identity_name = arn
+
+                f.write(f"| Property | Value |\n")
+                f.write(f"|----------|-------|\n")
+                f.write(f"| Account | {identity.get('account')} |\n")
+                f.write(f"| Identity Type | {identity_type} |\n")
+                f.write(f"| Identity Name | {identity_name} |\n")
+                f.write(f"| Full ARN | {arn} |\n")
+                f.write(f"| User ID | {identity.get('user_id')} |\n\n")
+
+            # Summary section
+            f.write("## Summary\n\n")
+            f.write(f"| Status | Count | Percentage |\n")
+            f.write(f"|--------|-------|------------|\n")
+            f.write(f"| PASSED | {passed} | {passed*100//total if total else 0}% |\n")
+            f.write(f"| DENIED | {denied} | {denied*100//total if total else 0}% |\n")
+            f.write(f"| NOT_TESTED | {not_tested} | {not_tested*100//total if total else 0}% |\n")
+            f.write(f"| SKIPPED | {skipped} | {skipped*100//total if total else 0}% |\n")
+            f.write(f"| ERROR | {errors} | {errors*100//total if total else 0}% |\n")
+            f.write(f"| **Total** | **{total}** | **100%** |\n\n")
+            if self.cached:
+                f.write(f"{self.cached} of {total} results were reused from the result store (marked \"cached\" below).\n\n")
+
+            # Service Matrix
+            f.write("## Service Permission Matrix\n\n")
+            f.write("| Service | Total | Passed | Denied | NotTested | Skipped | Error | Status |\n")
+            f.write("|---------|-------|--------|--------|-----------|---------|-------|--------|\n")
+
+            for svc_name in sorted(self.services.keys()):
+                counts = self.services[svc_name]
+                f.write(f"| {svc_name} | {sum(counts.values())} | {counts['PASSED']} | {counts['DENIED']} | "
+                        f"{counts['NOT_TESTED']} | {counts['SKIPPED']} | {counts['ERROR']} | {service_status(counts)} |\n")
+
+            f.write("\n")
+
+            # Region x Service matrix (multi-region runs only)
+            regions = sorted(self.regions, key=lambda region: region == "global")
+            if len(regions) > 1:
+                f.write("## Region Matrix\n\n")
+                f.write("Passed/total per service and region. Global APIs are probed once, under \"global\".\n\n")
+                f.write(f"| Service | {' | '.join(regions)} |\n")
+                f.write(f"|---------|{'|'.join('-' * (len(region) + 2) for region in regions)}|\n")
+                for svc_name in sorted(self.services.keys()):
+                    cells = []
+                    for region in regions:
+                        counts = self.cells.get((svc_name, region))
+                        if counts:
+                            cells.append(f"{counts['PASSED']}/{sum(counts.values())} {service_status(counts)}")
+                        else:
+                            cells.append("-")
+                    f.write(f"| {svc_name} | {' | '.join(cells)} |\n")
+                f.write("\n")
+
+            # Permission x Role matrix and differences (multi-role runs only)
+            roles = list(self.roles)
+            if len(roles) > 1:
+                role_matrix = self.role_statuses
+
+                def write_role_rows(rows: list) -> None:
+                    f.write(f"| Service | Permission | {' | '.join(roles)} |\n")
+                    f.write(f"|---------|------------|{'|'.join('-' * (len(role) + 2) for role in roles)}|\n")
+                    for (label, permission), statuses in rows:
+                        cells = [STATUS_ICONS.get(statuses.get(role), "-") for role in roles]
+                        f.write(f"| {label} | {permission} | {' | '.join(cells)} |\n")
+                    f.write("\n")
+
+                f.write("## Role Matrix\n\n")
+                write_role_rows(list(role_matrix.items()))
+
+                f.write("## Role Differences\n\n")
+                differences = [
+                    (key, statuses) for key, statuses in role_matrix.items()
+                    if len({statuses.get(role) for role in roles}) > 1
+                ]
+                if differences:
+                    f.write("Permissions whose result is not the same for every role.\n\n")
+                    write_role_rows(differences)
+                else:
+                    f.write("All roles have identical results.\n\n")
+
+            # Denied permissions (most important)
+            if denied > 0:
+                f.write("## Denied Permissions\n\n")
+                f.write("These permissions were denied and may need to be added to your role/policy.\n\n")
+                f.write("| Service | Permission | Error Code | CloudTrail |\n")
+                f.write("|---------|------------|------------|------------|\n")
+                for row in self.results.where("status", "DENIED"):
+                    r = self.results.row(row)
+                    ct = r.get("cloudtrail", {})
+                    ct_info = ct.get("message", ct.get("error", "N/A"))
+                    f.write(f"| {self._label(r)} | {r['permission']} | {r.get('error_code', 'N/A')} | {ct_info} |\n")
+                f.write("\n")
+
+                if cloudtrail_scans:
+                    f.write(f"CloudTrail lookup (one LookupEvents scan per principal and region, "
+                            f"last {cloudtrail_scans[0].minutes_back} min):\n\n")
+                    f.write("| Region | Filter | Pages | Events | Time (s) | Note |\n")
+                    f.write("|--------|--------|-------|--------|----------|------|\n")
+                    for scan in cloudtrail_scans:
+                        if scan.lookup_attribute:
+                            key, value = scan.lookup_attribute
+                            lookup = f"{key} ...{value[-4:]}" if key == "AccessKeyId" else f"{key} {value}"
+                        else:
+                            lookup = "none"
+                        note = scan.error or (f"stopped after {CLOUDTRAIL_MAX_PAGES} pages" if scan.truncated else "")
+                        f.write(f"| {scan.region} | {lookup} | {scan.pages} | {scan.event_count} | "
+                                f"{scan.elapsed:.1f} | {note} |\n")
+                    f.write("\n")
+
+            # Not Tested section (needs parameter mapping)
+            if not_tested > 0:
+                f.write("## Not Tested (Needs Parameter Mapping)\n\n")
+                f.write("These permissions require parameters but don't have mappings. Add to PERMISSION_REQUIRED_PARAMS.\n\n")
+                f.write("| Service | Permission | Reason |\n")
+                f.write("|---------|------------|--------|\n")
+                for row in self.results.where("status", "NOT_TESTED"):
+                    r = self.results.row(row)
+                    f.write(f"| {self._label(r)} | {r['permission']} | {r['message'][:80]} |\n")
+                f.write("\n")
+
+            # Errors section
+            if errors > 0:
+                f.write("## Errors\n\n")
+                f.write("| Service | Permission | Error |\n")
+                f.write("|---------|------------|-------|\n")
+                for row in self.results.where("status", "ERROR"):
+                    r = self.results.row(row)
+                    f.write(f"| {self._label(r)} | {r['permission']} | {r['message'][:60]} |\n")
+                f.write("\n")
+
+            # Throttling section (rate limiter retries)
+            if self.throttling:
+                f.write("## Throttling\n\n")
+                f.write("Calls the rate limiter had to retry. Throttles slow the service down adaptively.\n\n")
+                f.write("| Service | Calls Retried | Throttles | Retries | Retry Delay (s) |\n")
+                f.write("|---------|---------------|-----------|---------|-----------------|\n")
+                for svc_name in sorted(self.throttling):
+                    calls, throttles, retries, delay = self.throttling[svc_name]
+                    f.write(f"| {svc_name} | {calls} | {throttles} | {retries} | {delay:.1f} |\n")
+                f.write("\n")
+
+            # Performance section (per-call hooks, probes made this run)
+            if self.latencies:
+                f.write("## Performance\n\n")
+                f.write("API latency per probe, including rate-limiter retries (not backoff sleeps).\n\n")
+                f.write("| Service | Calls | p50 (ms) | p95 (ms) | p99 (ms) | Max (ms) |\n")
+                f.write("|---------|-------|----------|----------|----------|----------|\n")
+                for svc_name in sorted(self.latencies):
+                    values = sorted(self.latencies[svc_name])
+                    p50, p95, p99 = (percentile(values, pct) * 1000 for pct in (50, 95, 99))
+                    f.write(f"| {svc_name} | {len(values)} | {p50:.0f} | {p95:.0f} | {p99:.0f} | {values[-1] * 1000:.0f} |\n")
+                f.write("\n")
+
+                slowest = sorted(self.slowest, reverse=True)
+                f.write(f"Slowest {len(slowest)} calls:\n\n")
+                f.write("| Service | Permission | Latency (ms) | Retries | Bytes |\n")
+                f.write("|---------|------------|--------------|---------|-------|\n")
+                for latency, _, label, permission, retries, size in slowest:
+                    f.write(f"| {label} | {permission} | {latency * 1000:.0f} | {retries} | {size} |\n")
+                f.write("\n")
+
+            # Detailed Results with Data
+            f.write("## Detailed Results\n\n")
+            f.write("| Service | Permission | Status | Details |\n")
+            f.write("|---------|------------|--------|--------|\n")
+            with open(self.partial_file, encoding="utf-8") as partial:
+                partial.seek(self._rows_start)
+                for line in partial:
+                    f.write(line)
+
+            f.write("\n")
+
+        self.partial_file.unlink()
+        return self.output_file
+
+
+def generate_report(results: list, identity: dict, config: dict, output_dir: Path) -> Path:
+    """Generate a markdown report with matrix view from a complete list of results."""
+    writer = ReportWriter(
+        output_dir,
+        multi_region=len({r.get("region") for r in results if r.get("region")}) > 1,
+        multi_role=len({r["role"] for r in results if r.get("role")}) > 1,
+    )
+    for r in results:
+        writer.add(r)
+    return writer.finish(identity, config)
+
+
+class PhaseTimer:
+    """Wall-clock time spent in each phase of a run (--timings)."""
+
+    def __init__(self, start: float):
+        self.phases = []
+        self._last = start
+
+    def mark(self, phase: str) -> None:
+        """Close the current phase under the given name."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def print_summary(self) -> None:
+        print("Timings:")
+        for phase, seconds in self.phases:
+            print(f"  {phase:<12}{seconds * 1000:8.0f} ms")
+        print(f"  {'total':<12}{sum(seconds for _, seconds in self.phases) * 1000:8.0f} ms")
+        cached = f", {MODEL_LOADER.cache_hits} from cache" if MODEL_LOADER.cache_dir else ""
+        print(f"  Models:     {MODEL_LOADER.files_loaded} file(s) loaded in "
+              f"{MODEL_LOADER.load_seconds * 1000:.0f} ms{cached}")
+
+
+def load_config(file_path: Path) -> tuple[dict, dict]:
+    """Load config and permissions from YAML file. Raises ValueError for invalid YAML."""
+    import yaml
+
+    with open(file_path, "r") as f:
+        try:
+            data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML: {e}")
+
+    config = data.get("config", {})
+    permissions = data.get("permissions", data)  # Fallback for old format
+
+    # Remove config from permissions if it exists
+    if "config" in permissions:
+        del permissions["config"]
+
+    return config, permissions
+
+
+def load_permission_list(file_path: Path) -> tuple[dict, dict]:
+    """
+    Load a validate.txt style list: one "<service> <action>" entry per line
+    (tab or space separated). Returns an empty config like load_config would.
+    """
+    permissions = {}
+    with open(file_path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise ValueError(f"{file_path}:{line_number}: expected '<service> <action>', got {line!r}")
+            permissions.setdefault(parts[0], []).append(parts[1])
+    return {}, permissions
+
+
+class OperationIndex:
+    """
+    On-disk index of botocore operations: client name -> {operation: [read_only, http_method]}.
+
+    Services are indexed the first time a wildcard needs them and the file is
+    keyed by botocore version, so later runs read one small JSON file instead
+    of loading service models.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self._services = None
+        self._session = None
+        self._dirty = False
+
+    def _load(self) -> dict:
+        if self._services is None:
+            self._services = {}
+            try:
+                data = json.loads(self.file_path.read_text())
+                if data.get("botocore_version") == botocore.__version__:
+                    self._services = data["services"]
+            except (OSError, ValueError, KeyError):
+                pass
+        return self._services
+
+    def operations(self, client_name: str) -> dict:
+        """Return {operation: [read_only, http_method]} for a boto3 client name."""
+        services = self._load()
+        if client_name not in services:
+            if self._session is None:
+                self._session = MODEL_LOADER.botocore_session()
+            try:
+                model = self._session.get_service_model(client_name)
+            except UnknownServiceError:
+                operations = {}
+            else:
+                operations = {}
+                for name in model.operation_names:
+                    method = model.operation_model(name).http.get("method")
+                    operations[name] = [is_readonly_permission(name) or method in READONLY_HTTP_METHODS, method]
+            services[client_name] = operations
+            self._dirty = True
+        return services[client_name]
+
+    def save(self) -> None:
+        """Write the index back if new services were added."""
+        if not self._dirty:
+            return
+        tmp_path = self.file_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "botocore_version": botocore.__version__,
+            "services": self._services,
+        }, separators=(",", ":")))
+        tmp_path.replace(self.file_path)
+        self._dirty = False
+
+
+def is_wildcard_entry(entry: str) -> bool:
+    """Check if a permission entry is a pattern (List*) or an HTTP verb (GET)."""
+    return any(c in entry for c in "*?[") or entry.isupper()
+
+
+def expand_permissions(permissions: dict, index: OperationIndex) -> dict:
+    """
+    Expand wildcard entries into read-only botocore operation names.
+
+    "List*" matches operation names, "GET" matches the operation's HTTP method,
+    and IAM action names (s3 ListBucket) become their API names. Other entries
+    are kept as they are.
+    """
+    expanded = {}
+    for service, entries in permissions.items():
+        names = []
+        for entry in entries or []:
+            entry = str(entry)
+            if not is_wildcard_entry(entry):
+                names.append(IAM_ACTION_API.get((service, entry), entry))
+                continue
+            operations = index.operations(SERVICE_CLIENT_MAP.get(service, service))
+            if entry.isupper():
+                matched = [op for op, (read_only, method) in operations.items() if read_only and method == entry]
+            else:
+                matched = [op for op, (read_only, _) in operations.items()
+                           if read_only and fnmatch.fnmatchcase(op, entry)]
+            if not matched:
+                print(f"WARNING: {service} {entry} matched no read-only operations")
+            names.extend(matched)
+        expanded[service] = list(dict.fromkeys(names))
+    return expanded
+
+
+def start_profiler(file_path: Path) -> None:
+    """Profile the rest of the process; stats are written and summarised at exit."""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+
+    def finish() -> None:
+        profiler.disable()
+        profiler.dump_stats(str(file_path))
+        print(f"\nProfile written: {file_path}  (python -m pstats {file_path})")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_SUMMARY_LINES)
+
+    atexit.register(finish)
+    profiler.enable()
+
+
+def print_summary(totals: Counter) -> None:
+    """Print the status counts that close a run."""
+    print()
+    print("=" * 60)
+    print("Summary")
+    print("=" * 60)
+    print(f"  PASSED:     {totals['PASSED']}")
+    print(f"  DENIED:     {totals['DENIED']}")
+    print(f"  NOT_TESTED: {totals['NOT_TESTED']}")
+    print(f"  SKIPPED:    {totals['SKIPPED']}")
+    print(f"  ERRORS:     {totals['ERROR']}")
+
+
+def exit_with_status(totals: Counter) -> None:
+    """Print the closing verdict and exit 1 if anything was denied."""
+    if totals["DENIED"] > 0:
+        print(f"WARNING: {totals['DENIED']} permission(s) were denied!")
+        sys.exit(1)
+
+    if totals["NOT_TESTED"] > 0:
+        print(f"NOTE: {totals['NOT_TESTED']} permission(s) need parameter mappings to be fully tested.")
+
+    print("All checked permissions passed!")
+    sys.exit(0)
+
+
+def merge_main(argv: list) -> None:
+    """The merge subcommand: combine the outputs of a --shard run into one report."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} merge",
+        description="Combine the shard outputs of a --shard i/N run into one report",
+    )
+    parser.add_argument(
+        "shards",
+        nargs="+",
+        help="Shard outputs (validation-shard-<i>-of-<N>.jsonl), one per shard",
+    )
+    parser.add_argument(
+        "--output-dir", "-o",
+        default=".",
+        help="Output directory for the merged report (default: current directory)",
+    )
+    args = parser.parse_args(argv)
+
+    output_dir = Path(args.output_dir)
+    if not output_dir.is_absolute():
+        output_dir = Path(__file__).parent / output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        merged = load_shards([Path(p) for p in args.shards])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERROR: Cannot merge shards: {e}")
+        sys.exit(1)
+
+    report = ReportWriter(output_dir, multi_region=merged["multi_region"], multi_role=merged["multi_role"])
+    for r in merged["results"]:
+        report.add(r)
+    report_path = report.finish(merged["identity"], merged["config"], merged["cloudtrail_scans"])
+    print(f"Merged {len(args.shards)} shard(s), {len(merged['results'])} results")
+    print(f"Report saved to: {report_path}")
+
+    print_summary(report.totals)
+    print()
+    exit_with_status(report.totals)
 
 
 def main():
+    if sys.argv[1:2] == ["merge"]:
+        merge_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Validate AWS read-only permissions for the current user/role",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -776,6 +3525,21 @@ Examples:
   python validate-read-only-aws-permissions.py --profile my-profile # Override profile
   python validate-read-only-aws-permissions.py --service ec2        # Validate only EC2
   python validate-read-only-aws-permissions.py --service ec2 s3     # Validate EC2 and S3
+  python validate-read-only-aws-permissions.py --workers 16         # Validate on 16 threads
+  python validate-read-only-aws-permissions.py --plan plan.json     # Reuse compiled call plan
+  python validate-read-only-aws-permissions.py --mode simulate      # Batched policy simulation
+  python validate-read-only-aws-permissions.py --regions us-east-1 eu-west-1 -w 16  # Several regions
+  python validate-read-only-aws-permissions.py --assume-roles RoleA RoleB          # Compare roles
+  python validate-read-only-aws-permissions.py --incremental        # Re-probe only stale/failed/new
+  python validate-read-only-aws-permissions.py --resume validation-journal-<ts>.jsonl  # Continue a run
+  python validate-read-only-aws-permissions.py -f validate.txt      # Expand List*/GET entries and validate
+  python validate-read-only-aws-permissions.py -f validate.txt --expand  # Print the expanded list
+  python validate-read-only-aws-permissions.py -s ec2 --model-cache --timings  # Fast start for CI
+  python validate-read-only-aws-permissions.py -s ec2 --profile-out run.prof   # Profile with cProfile
+  python validate-read-only-aws-permissions.py --shard 2/4          # Validate one quarter of the list
+  python validate-read-only-aws-permissions.py merge validation-shard-*-of-4.jsonl  # One report from shards
+  python validate-read-only-aws-permissions.py --watch 300 -w 8     # Re-validate every 5 min, serve metrics
+  python validate-read-only-aws-permissions.py --fail-fast          # CI: riskiest first, stop at first DENIED
         """
     )
     parser.add_argument(
@@ -790,7 +3554,30 @@ Examples:
     parser.add_argument(
         "--permissions-file", "-f",
         default="permissions-list.yaml",
-        help="Path to permissions YAML file (default: permissions-list.yaml)",
+        help="Path to permissions YAML file, or a validate.txt style list "
+             "(default: permissions-list.yaml)",
+    )
+    parser.add_argument(
+        "--expand",
+        action="store_true",
+        help="Print the permissions with wildcards expanded (as YAML) and exit",
+    )
+    parser.add_argument(
+        "--model-cache",
+        action="store_true",
+        help=f"Keep marshalled copies of parsed botocore models in <output-dir>/{DEFAULT_MODEL_CACHE_DIR} "
+             "for faster starts",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print how long each phase of the run took (startup, config, identity, ...)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="PATH",
+        help="Profile the run with cProfile, write the stats to PATH (for pstats/snakeviz) "
+             "and print the top functions. Probes run on one thread",
     )
     parser.add_argument(
         "--output-dir", "-o",
@@ -802,8 +3589,130 @@ Examples:
         action="store_true",
         help="Skip CloudTrail queries for denied permissions",
     )
+    parser.add_argument(
+        "--regions", "-r",
+        nargs="+",
+        help="Validate these regions concurrently; global APIs are probed once (default: YAML region)",
+    )
+    parser.add_argument(
+        "--assume-roles",
+        nargs="+",
+        help="Assume each role (ARN or name in the caller's account) and compare results "
+             "across roles (default: YAML assume_roles, if any)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse stored results younger than --cache-ttl; only stale, DENIED/ERROR "
+             "and new permissions are probed (probe mode only)",
+    )
+    parser.add_argument(
+        "--results-db",
+        help=f"SQLite result store (default: {DEFAULT_RESULTS_DB} in the output directory; "
+             f"written whenever this, --incremental or --fail-fast is given)",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL_HOURS,
+        help=f"Hours a stored result stays fresh for --incremental (default: {DEFAULT_CACHE_TTL_HOURS})",
+    )
+    parser.add_argument(
+        "--journal",
+        help="JSON Lines journal recording each result as it completes "
+             "(relative to the output directory; default: validation-journal-<timestamp>.jsonl; probe mode only)",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="JOURNAL",
+        help="Continue an interrupted run: skip permissions recorded in JOURNAL (relative to the "
+             "output directory), merge them into the report and keep appending to it",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("probe", "simulate"),
+        default="probe",
+        help="probe: call each API with test resources; simulate: evaluate policies with "
+             "iam:SimulatePrincipalPolicy (default: probe)",
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        help="Number of permissions to validate concurrently "
+             "(default: 1, serial; with several --regions, --max-per-service per region)",
+    )
+    parser.add_argument(
+        "--max-per-service",
+        type=int,
+        default=DEFAULT_MAX_PER_SERVICE,
+        help=f"Max concurrent calls per service when --workers > 1 (default: {DEFAULT_MAX_PER_SERVICE})",
+    )
+    parser.add_argument(
+        "--max-pool-connections",
+        type=int,
+        help=f"HTTP connections kept per client (default: {DEFAULT_MAX_POOL_CONNECTIONS} "
+             f"or --max-per-service, whichever is larger)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=DEFAULT_RATE_PER_SERVICE,
+        help=f"Starting/maximum requests per second per service and region; halves on throttling "
+             f"and recovers on success, 0 disables (default: {DEFAULT_RATE_PER_SERVICE:g})",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=MAX_RETRIES,
+        help=f"Retries for throttled or transient errors (default: {MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--plan",
+        help="Compiled plan JSON to load (compiled and written here if missing or stale)",
+    )
+    parser.add_argument(
+        "--no-keepalive",
+        action="store_true",
+        help="Disable TCP keep-alive on pooled connections",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="Validate only shard I of N (service-balanced, the same on every machine) and write "
+             "validation-shard-<I>-of-<N>.jsonl for the merge subcommand",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help=f"Probe the permissions most often denied before (result store and recent journals) first, "
+             f"concurrently, and stop at the first DENIED (probe mode only; default workers: {FAIL_FAST_WORKERS})",
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="SECONDS",
+        help="Keep running: re-validate every SECONDS (with jitter), failing and recently changed "
+             "permissions first, and serve Prometheus metrics instead of writing a report (probe mode only)",
+    )
+    parser.add_argument(
+        "--watch-batch",
+        type=int,
+        help=f"Steady permissions re-probed per --watch cycle, least recently probed first "
+             f"(default: a full sweep every {WATCH_SWEEP_CYCLES} cycles)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=DEFAULT_METRICS_PORT,
+        help=f"Local port for --watch metrics at http://127.0.0.1:<port>/metrics (default: {DEFAULT_METRICS_PORT})",
+    )
 
     args = parser.parse_args()
+    timer = PhaseTimer(MODULE_START)
+    timer.mark("startup")
+    if args.profile_out:
+        start_profiler(Path(args.profile_out))
 
     # Resolve paths
     script_dir = Path(__file__).parent
@@ -824,16 +3733,61 @@ Examples:
 
     print(f"Loading config from: {permissions_file}")
     try:
-        config, all_permissions = load_config(permissions_file)
+        if permissions_file.suffix == ".txt":
+            config, all_permissions = load_permission_list(permissions_file)
+        else:
+            config, all_permissions = load_config(permissions_file)
     except FileNotFoundError:
         print(f"ERROR: Permissions file not found: {permissions_file}")
         sys.exit(1)
-    except yaml.YAMLError as e:
-        print(f"ERROR: Invalid YAML: {e}")
+    except ValueError as e:
+        print(f"ERROR: {e}")
         sys.exit(1)
 
+    # Filter services if specified (before expansion, so only their models are loaded)
+    if args.service:
+        services_to_check = {s: all_permissions[s] for s in args.service if s in all_permissions}
+        missing = [s for s in args.service if s not in all_permissions]
+        if missing:
+            print(f"WARNING: Services not found: {missing}")
+    else:
+        services_to_check = all_permissions
+
+    if args.model_cache:
+        MODEL_LOADER.configure(output_dir / DEFAULT_MODEL_CACHE_DIR)
+
+    # Expand wildcard entries (List*, GET) against the botocore operation index
+    if any(is_wildcard_entry(str(e)) for entries in services_to_check.values() for e in entries or []):
+        start = time.perf_counter()
+        operation_index = OperationIndex(output_dir / DEFAULT_OPERATION_INDEX)
+        entry_count = sum(len(entries or []) for entries in services_to_check.values())
+        services_to_check = expand_permissions(services_to_check, operation_index)
+        operation_index.save()
+        print(f"Expanded {entry_count} entries into {sum(len(p) for p in services_to_check.values())} "
+              f"permissions ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    # Keep only this shard's slice of the (expanded) list
+    if args.shard:
+        shard_digest = permissions_digest(services_to_check)
+        full_count = sum(len(p or []) for p in services_to_check.values())
+        services_to_check, shard_positions = shard_permissions(services_to_check, *args.shard)
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {sum(len(p) for p in services_to_check.values())} "
+              f"of {full_count} permissions ({len(services_to_check)} services)")
+    timer.mark("config")
+
+    if args.expand:
+        import yaml
+
+        print()
+        print(yaml.safe_dump({"permissions": services_to_check}, sort_keys=False), end="")
+        if args.timings:
+            timer.print_summary()
+        sys.exit(0)
+
     # Get settings from config (with CLI overrides)
     region = config.get("region", "us-east-1")
+    regions = list(dict.fromkeys(args.regions)) if args.regions else [region]
+    region = regions[0]
     profile = args.profile or config.get("profile", "default")
     if profile == "default":
         profile = None  # Use default credentials chain
@@ -843,23 +3797,35 @@ Examples:
     if args.skip_cloudtrail:
         check_cloudtrail = False
 
-    print(f"Region: {region}")
+    print(f"Region: {', '.join(regions)}")
     print(f"Profile: {profile or 'default'}")
     print(f"Check CloudTrail: {check_cloudtrail}")
+    print(f"Mode: {args.mode}")
+    roles = args.assume_roles or config.get("assume_roles") or []
+    if roles:
+        print(f"Assume Roles: {', '.join(roles)}")
+    max_per_service = max(1, args.max_per_service)
+    fanout = len(regions) * max(1, len(roles))
+    workers = args.workers or (max_per_service * fanout if fanout > 1 else 1)
+    if args.fail_fast and not args.workers:
+        workers = max(workers, FAIL_FAST_WORKERS)
+    if args.profile_out and workers > 1:
+        # cProfile only sees the thread that enabled it
+        print(f"Workers: 1 (--profile-out; {workers} without profiling)")
+        workers = 1
+    else:
+        print(f"Workers: {workers}")
+
+    # Size connection pools so each service lane can hold its own connection
+    max_pool_connections = args.max_pool_connections or max(DEFAULT_MAX_POOL_CONNECTIONS, max_per_service)
+    CLIENT_REGISTRY.configure(max_pool_connections, tcp_keepalive=not args.no_keepalive)
+    RATE_LIMITER.configure(args.rate_limit, max(0, args.max_retries))
+    PARAM_SYNTHESIZER.configure(output_dir / DEFAULT_PARAM_CACHE)
 
     # Set AWS profile environment variable if specified
     if profile:
         os.environ["AWS_PROFILE"] = profile
 
-    # Filter services if specified
-    if args.service:
-        services_to_check = {s: all_permissions[s] for s in args.service if s in all_permissions}
-        missing = [s for s in args.service if s not in all_permissions]
-        if missing:
-            print(f"WARNING: Services not found: {missing}")
-    else:
-        services_to_check = all_permissions
-
     # Get caller identity
     print("\nGetting AWS identity...")
     identity = get_caller_identity(region, profile)
@@ -868,74 +3834,276 @@ Examples:
     else:
         print(f"Account: {identity['account']}")
         print(f"ARN: {identity['arn']}")
+    timer.mark("identity")
+
+    # Assume each role once; every role gets its own plan (its account fills ACCOUNT_ID)
+    role_identities = {}
+    if roles:
+        print("\nAssuming roles...")
+        for role_name, role_identity in assume_roles(roles, identity.get("account"), region, profile).items():
+            if "error" in role_identity:
+                print(f"WARNING: Could not assume {role_name}: {role_identity['error']}")
+            else:
+                print(f"  {role_name}: {role_identity['arn']}")
+                role_identities[role_name] = role_identity
+        if not role_identities:
+            print("ERROR: None of the roles could be assumed")
+            sys.exit(1)
+        role_plans = {
+            role_name: compile_plan(services_to_check, regions, role_identity["account"])
+            for role_name, role_identity in role_identities.items()
+        }
+        config = {**config, "assume_roles": list(role_identities)}
+    else:
+        # Compile the call plan once (or reuse a saved one for this region/account)
+        role_plans = {None: prepare_plan(services_to_check, regions, identity.get("account"),
+                                         Path(args.plan) if args.plan else None)}
+
+    # Merge role plans into one so all roles are validated in parallel
+    plan = {}
+    group_profiles = {}
+    group_roles = {}
+    for role_name, role_plan in role_plans.items():
+        for group, specs in role_plan.items():
+            role_group = f"{group} [{role_name}]" if role_name else group
+            plan[role_group] = specs
+            group_roles[role_group] = role_name
+            if role_name:
+                group_profiles[role_group] = role_identities[role_name]["key"]
+    PARAM_SYNTHESIZER.save()
+    timer.mark("plan")
+    if PARAM_SYNTHESIZER.synthesized:
+        print(f"Synthesized parameters from botocore shapes for {PARAM_SYNTHESIZER.synthesized} probe(s)")
+
+    # Reuse fresh results from earlier runs (--incremental)
+    group_identity_arns = {
+        group: role_identities[role_name]["arn"] if role_name else identity.get("arn")
+        for group, role_name in group_roles.items()
+    }
+    store = None
+    cached_results = {}
+    if (args.incremental or args.results_db or args.fail_fast) and args.mode == "probe":
+        if "error" in identity:
+            print("WARNING: Result store disabled - caller identity unknown")
+        else:
+            db_path = Path(args.results_db or DEFAULT_RESULTS_DB)
+            if not db_path.is_absolute():
+                db_path = output_dir / db_path
+            store = ResultStore(db_path)
+            if args.incremental:
+                fresh_by_arn = {
+                    arn: store.load_fresh(arn, args.cache_ttl * 3600)
+                    for arn in set(group_identity_arns.values())
+                }
+                for group, specs in plan.items():
+                    fresh = fresh_by_arn[group_identity_arns[group]]
+                    for spec in specs:
+                        cached = fresh.get((spec.region, spec.service, spec.permission))
+                        if cached is not None:
+                            cached_results[(group, spec.permission)] = cached
+                print(f"\nReusing {len(cached_results)} stored result(s) from {db_path} (TTL {args.cache_ttl:g}h)")
+
+    # Watch mode: validate in cycles until interrupted, with metrics instead of a report
+    if (args.watch or args.fail_fast) and args.mode != "probe":
+        print(f"ERROR: {'--watch' if args.watch else '--fail-fast'} needs --mode probe")
+        sys.exit(1)
+    if args.watch:
+        permission_count = sum(len(specs) for specs in plan.values())
+        batch = args.watch_batch or -(-permission_count // WATCH_SWEEP_CYCLES)
+        metrics = WatchMetrics()
+        try:
+            server = serve_metrics(metrics, args.metrics_port)
+        except OSError as e:
+            print(f"ERROR: Cannot serve metrics on port {args.metrics_port}: {e}")
+            sys.exit(1)
+        print(f"\nWatching {permission_count} permissions every {args.watch:g}s, {batch} steady ones per cycle")
+        print(f"Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
+        if check_cloudtrail:
+            print(f"Policy changes: CloudTrail IAM events in {IAM_EVENTS_REGION}")
+        print()
 
-    # Validate permissions
-    print(f"\nValidating {sum(len(p) for p in services_to_check.values())} permissions across {len(services_to_check)} services...")
-    print()
-
-    results = []
-
-    for service, permissions in services_to_check.items():
-        print(f"[{service}]")
-
-        for permission in permissions:
-            result = validate_permission(service, permission, region, profile)
-
-            # Query CloudTrail for denied permissions
-            if result["status"] == "DENIED" and check_cloudtrail:
-                result["cloudtrail"] = query_cloudtrail(service, permission, region, profile)
-
-            results.append(result)
+        def on_watch_result(group: str, result: dict) -> None:
+            if store:
+                store.add(group_identity_arns[group], result)
 
-            # Print inline status with data
-            status_symbol = {
-                "PASSED": "[OK]",
-                "DENIED": "[X]",
-                "NOT_TESTED": "[N/T]",
-                "SKIPPED": "[--]",
-                "ERROR": "[!]",
-            }.get(result["status"], "[?]")
+        try:
+            watch_services(
+                plan, profile, args.watch, batch, metrics,
+                workers=workers, max_per_service=max_per_service, group_profiles=group_profiles,
+                cached_results=cached_results, on_result=on_watch_result,
+                on_cycle=store.flush if store else None,
+                change_check=PolicyChangeWatch(profile).check if check_cloudtrail else None,
+            )
+        except KeyboardInterrupt:
+            print(f"\nStopped after {metrics.cycles} cycle(s)")
+        finally:
+            server.shutdown()
+            if store:
+                store.close()
+        sys.exit(0)
+
+    # Checkpoint journal: resume from an earlier one and/or record this run's results
+    journal = None
+    if args.mode == "probe":
+        # Relative journal paths are in the output directory, like --results-db, so
+        # --resume reads the same file it keeps appending to
+        journal_path = Path(args.journal or args.resume or
+                            f"validation-journal-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl")
+        if not journal_path.is_absolute():
+            journal_path = output_dir / journal_path
+        if args.resume:
+            resume_path = Path(args.resume)
+            if not resume_path.is_absolute():
+                resume_path = output_dir / resume_path
+            try:
+                resumed = load_journal(resume_path, identity.get("arn"))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"ERROR: Cannot resume from {resume_path}: {e}")
+                sys.exit(1)
+            resumed = {key: r for key, r in resumed.items() if key[0] in plan}
+            print(f"\nResuming: {len(resumed)} result(s) already recorded in {resume_path}")
+            cached_results.update(resumed)
+        else:
+            resumed = {}
+
+        journal = ResultJournal(journal_path, identity.get("arn"))
+        print(f"Journal: {journal_path}")
+
+        # Results reused from the store count as done for a later --resume too
+        for (group, permission), r in cached_results.items():
+            if (group, permission) not in resumed:
+                journal.record(group, r)
+
+    # Fail-fast: rank permissions by how often they were denied before
+    likelihood = {}
+    if args.fail_fast:
+        journal_paths = sorted(output_dir.glob("validation-journal-*.jsonl"), key=lambda p: p.stat().st_mtime)
+        counts = journal_denial_counts(journal_paths[-FAIL_FAST_JOURNALS:])
+        if store:
+            counts.update(store.denial_counts(set(group_identity_arns.values())))
+        for specs in plan.values():
+            for spec in specs:
+                likelihood[(spec.service, spec.permission)] = denial_likelihood(counts.get((spec.service, spec.permission)))
+        known = sum(1 for key in likelihood if key in counts)
+        print(f"Fail-fast: denial history for {known} of {len(likelihood)} permissions, riskiest probed first")
+
+    # Stream each result into the store and the report as it arrives
+    report = ReportWriter(output_dir, multi_region=len(regions) > 1, multi_role=len(role_identities) > 1)
+    print(f"\nPartial report: {report.partial_file}")
+    shard_output = None
+    if args.shard:
+        shard_path = output_dir / f"validation-shard-{args.shard[0]}-of-{args.shard[1]}.jsonl"
+        shard_output = ShardOutput(shard_path, args.shard, shard_digest, shard_positions,
+                                   regions, list(role_identities))
+        print(f"Shard output: {shard_path}")
+
+    # Denied probes by (credentials, region, principal ARN), explained from CloudTrail after validation
+    denied_probes = {}
+
+    def on_result(group: str, result: dict) -> None:
+        if check_cloudtrail and args.mode == "probe" and result["status"] == "DENIED":
+            lookup_key = (group_profiles.get(group, profile), result["region"], group_identity_arns[group])
+            denied_probes.setdefault(lookup_key, []).append(result)
+        if store:
+            store.add(group_identity_arns[group], result)
+        if role_identities:
+            result["role"] = group_roles[group]
+        if len(regions) > 1 and is_global_permission(result["service"], result["permission"]):
+            result["region"] = "global"
+        report.add(result)
+        if shard_output:
+            shard_output.add(result)
 
-            details = result.get("data", {}).get("details", "")
-            if details:
-                print(f"  {status_symbol} {permission}: {result['status']} - {details}")
-            else:
-                print(f"  {status_symbol} {permission}: {result['status']}")
+    # Validate permissions
+    print(f"\nValidating {sum(len(p) for p in plan.values())} permissions across {len(services_to_check)} services...")
+    print()
 
-        print()
+    try:
+        if args.mode == "simulate":
+            for role_name, role_plan in role_plans.items():
+                role_identity = role_identities.get(role_name, identity)
+                if "error" in role_identity:
+                    print("ERROR: Policy simulation needs the caller identity")
+                    sys.exit(1)
+                # Simulated with the caller's credentials (PolicySourceArn names the role), so
+                # target roles need no IAM permissions; IAM only simulates principals of the
+                # caller's account, so roles elsewhere simulate with their own credentials
+                same_account = role_identity.get("account") == identity.get("account")
+                simulate_services(
+                    role_plan, role_identity, region, profile if same_account else role_identity.get("key", profile),
+                    on_result=lambda group, result, role_name=role_name:
+                        on_result(f"{group} [{role_name}]" if role_name else group, result),
+                )
+        elif args.fail_fast:
+            not_probed = fail_fast_services(
+                plan, profile, likelihood,
+                workers=workers, max_per_service=max_per_service, group_profiles=group_profiles,
+                cached_results=cached_results, on_result=on_result,
+                on_complete=journal.record if journal else None,
+            )
+            if not_probed:
+                print(f"\nFail-fast: stopped at the first DENIED, {not_probed} permission(s) not probed\n")
+        else:
+            validate_services(
+                plan, profile,
+                workers=workers, max_per_service=max_per_service, group_profiles=group_profiles,
+                cached_results=cached_results, on_result=on_result,
+                on_complete=journal.record if journal else None,
+            )
+    finally:
+        if store:
+            store.close()
+        if journal:
+            journal.close()
+    timer.mark("validation")
+
+    # Explain denials from CloudTrail: one paginated scan per principal and region
+    cloudtrail_scans = []
+    if denied_probes:
+        print("Scanning CloudTrail for denied calls...")
+
+        def scan_cloudtrail(lookup_key: tuple) -> CloudTrailIndex:
+            lookup_profile, lookup_region, identity_arn = lookup_key
+            return CloudTrailIndex(lookup_region).scan(
+                lookup_profile, cloudtrail_lookup_attribute(lookup_profile, identity_arn))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(denied_probes)))) as executor:
+            cloudtrail_scans = list(executor.map(scan_cloudtrail, denied_probes))
+        for scan, denied_results in zip(cloudtrail_scans, denied_probes.values()):
+            for r in denied_results:
+                r["cloudtrail"] = scan.lookup(r["permission"])
+            print(f"  {scan.region}: {scan.pages} page(s), {scan.event_count} events in {scan.elapsed:.1f}s"
+                  + (f" - {scan.error}" if scan.error else ""))
+        timer.mark("cloudtrail")
+
+    if len(regions) > 1:
+        config = {**config, "region": region, "regions": regions}
 
     # Generate report
     print("Generating report...")
-    report_path = generate_report(results, identity, config, output_dir)
+    report_path = report.finish(identity, config, cloudtrail_scans)
     print(f"Report saved to: {report_path}")
+    if shard_output:
+        print(f"Shard output saved to: {shard_output.finish(identity, config, cloudtrail_scans)}")
+    timer.mark("report")
 
     # Summary
-    passed = sum(1 for r in results if r["status"] == "PASSED")
-    denied = sum(1 for r in results if r["status"] == "DENIED")
-    not_tested = sum(1 for r in results if r["status"] == "NOT_TESTED")
-    skipped = sum(1 for r in results if r["status"] == "SKIPPED")
-    errors = sum(1 for r in results if r["status"] == "ERROR")
-
-    print()
-    print("=" * 60)
-    print("Summary")
-    print("=" * 60)
-    print(f"  PASSED:     {passed}")
-    print(f"  DENIED:     {denied}")
-    print(f"  NOT_TESTED: {not_tested}")
-    print(f"  SKIPPED:    {skipped}")
-    print(f"  ERRORS:     {errors}")
+    print_summary(report.totals)
+    client_stats = CLIENT_REGISTRY.stats()
+    print(f"  Clients:    {client_stats['clients_created']} created for {client_stats['api_calls']} API calls")
+    throttle_stats = RATE_LIMITER.stats()
+    if throttle_stats:
+        print(f"  Throttled:  {sum(s['throttles'] for s in throttle_stats.values())} times, "
+              f"{sum(s['retries'] for s in throttle_stats.values())} retries, "
+              f"{sum(s['retry_delay'] for s in throttle_stats.values()):.1f}s backing off")
+        for service, stats in sorted(throttle_stats.items()):
+            print(f"    {service}: {stats['throttles']} throttles, rate now {stats.get('rate', 0):.1f}/s")
     print()
+    if args.timings:
+        timer.print_summary()
+        print()
 
-    if denied > 0:
-        print(f"WARNING: {denied} permission(s) were denied!")
-        sys.exit(1)
-
-    if not_tested > 0:
-        print(f"NOTE: {not_tested} permission(s) need parameter mappings to be fully tested.")
-
-    print("All checked permissions passed!")
-    sys.exit(0)
+    exit_with_status(report.totals)
 
 
 if __name__ == "__main__":